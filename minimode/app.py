@@ -1,9 +1,17 @@
-from quart import Quart, request, jsonify, make_response
+from quart import Quart, Response, request, jsonify, make_response
 from quart_cors import cors
 import logging
 import os
 from pathlib import Path
-from market_analysis_crew import get_report_generator, create_reports
+from market_analysis_crew import get_report_generator, write_reports, run_report_job
+from jobs import JobManager, JOB_DONE, JOB_FAILED
+from coalesce import RequestCoalescer, request_key
+from report_catalog import get_report_catalog, list_reports
+from report_search import get_report_search
+from report_delivery import delivery_body, plan_delivery, plan_stored_delivery
+from report_store import get_report_store
+from report_versions import get_report_versions
+import asyncio
 import time
 
 app = Quart(__name__)
@@ -21,6 +29,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Background report jobs; identical in-flight requests share one crew
+job_manager = JobManager(coalescer=RequestCoalescer())
+
+# Index of generated reports behind /api/reports; create_reports adds to it
+report_catalog = get_report_catalog()
+
+# Full-text index behind /api/reports/search; create_reports adds to it too
+report_search = get_report_search()
+
+# Delta chains of repeated reports behind /api/reports/versions and /api/reports/diff
+report_versions = get_report_versions()
+
+@app.before_serving
+async def backfill_report_catalog():
+    """Index reports written before the catalog existed, then search-index them in the background"""
+    loop = asyncio.get_running_loop()
+    directories = [os.getcwd(), os.path.join(os.getcwd(), 'reports')]
+    await loop.run_in_executor(None, report_catalog.startup_backfill, directories)
+    loop.run_in_executor(None, report_search.startup_backfill, report_catalog)
+
 # Update route handlers to be async
 @app.route('/api/report-content/<filename>', methods=['GET', 'OPTIONS'])
 async def get_report_content(filename):
@@ -37,22 +65,23 @@ async def get_report_content(filename):
                 'message': 'Invalid filename'
             }), 400
             
-        # Look for the file in both the current directory and reports directory
-        file_path = os.path.join(os.getcwd(), filename)
-        reports_dir = os.path.join(os.getcwd(), 'reports')
-        
-        if os.path.exists(file_path):
-            target_path = file_path
-        elif os.path.exists(os.path.join(reports_dir, filename)):
-            target_path = os.path.join(reports_dir, filename)
-        else:
-            return jsonify({
-                'status': 'error',
-                'message': 'Report not found'
-            }), 404
-            
-        with open(target_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Catalogued reports are found by filename (and read from the report store when only stored there);
+        # /api/reports/<filename>/raw streams them instead
+        content = await asyncio.get_running_loop().run_in_executor(None, report_catalog.read_report, filename)
+        if content is None:
+            # Files that aren't catalogued, in the current or reports directory
+            target_path = None
+            for directory in (os.getcwd(), os.path.join(os.getcwd(), 'reports')):
+                if os.path.exists(os.path.join(directory, filename)):
+                    target_path = os.path.join(directory, filename)
+                    break
+            if not target_path:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Report not found'
+                }), 404
+            with open(target_path, 'r', encoding='utf-8') as f:
+                content = f.read()
             
         return jsonify({
             'status': 'success',
@@ -69,42 +98,23 @@ async def get_report_content(filename):
 
 @app.route('/api/reports', methods=['GET', 'OPTIONS'])
 async def get_reports():
-    """Get all generated reports"""
+    """List generated reports from the report catalog (page/limit/offset, company, report_type, detail_level, sort, order)"""
     if request.method == 'OPTIONS':
         response = await make_response()
         return response
 
     try:
-        # Get all report files from the directory
-        report_files = []
-        current_dir = os.getcwd()
-        
-        # Function to process files in a directory
-        def process_directory(directory):
-            for file in os.listdir(directory):
-                if file.endswith('_report.md'):
-                    # Parse filename to get metadata
-                    parts = file.replace('_report.md', '').split('_')
-                    company_name = parts[0]
-                    report_type = '_'.join(parts[1:-2]) if len(parts) > 3 else parts[1]
-                    timestamp = '_'.join(parts[-2:])
-                    
-                    report_files.append({
-                        'company_name': company_name,
-                        'report_type': report_type,
-                        'timestamp': timestamp,
-                        'filename': file
-                    })
-        
-        # Check both current directory and reports directory
-        process_directory(current_dir)
-        reports_dir = os.path.join(current_dir, 'reports')
-        if os.path.exists(reports_dir):
-            process_directory(reports_dir)
-        
+        try:
+            page = list_reports(report_catalog, request.args)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': f"Invalid query parameter: {str(e)}"
+            }), 400
+
         response = jsonify({
             'status': 'success',
-            'reports': sorted(report_files, key=lambda x: x['timestamp'], reverse=True)
+            **page
         })
         
         # Add CORS headers
@@ -119,6 +129,175 @@ async def get_reports():
             'message': str(e)
         }), 500
 
+@app.route('/api/reports/search', methods=['GET', 'OPTIONS'])
+async def search_reports():
+    """Full-text search over generated reports: q, plus optional limit, company, report_type and exhaustive.
+
+    Broad queries rank only the newest matching sections (REPORT_SEARCH_MAX_CANDIDATES);
+    truncated says when that happened, and exhaustive=true ranks every match.
+    """
+    if request.method == 'OPTIONS':
+        response = await make_response()
+        return response
+
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({
+            'status': 'error',
+            'message': 'Query parameter q is required'
+        }), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'limit must be a number'
+        }), 400
+
+    # Read filters here: the request context doesn't follow the call into the executor thread
+    company, report_type = request.args.get('company'), request.args.get('report_type')
+    exhaustive = request.args.get('exhaustive', '').lower() in ('1', 'true', 'yes')
+    start = time.perf_counter()
+    hits, truncated = await asyncio.get_running_loop().run_in_executor(
+        None, lambda: report_search.query(q, limit=limit, company=company, report_type=report_type,
+                                          exhaustive=exhaustive)
+    )
+    return jsonify({
+        'status': 'success',
+        'query': q,
+        'hits': hits,
+        'truncated': truncated,
+        'took_ms': round((time.perf_counter() - start) * 1000, 2)
+    })
+
+@app.route('/api/reports/versions', methods=['GET', 'OPTIONS'])
+async def list_report_versions():
+    """Stored versions of one company's report type: company and report_type are required"""
+    if request.method == 'OPTIONS':
+        response = await make_response()
+        return response
+
+    company, report_type = request.args.get('company'), request.args.get('report_type')
+    if not company or not report_type:
+        return jsonify({
+            'status': 'error',
+            'message': 'company and report_type are required'
+        }), 400
+
+    versions = await asyncio.get_running_loop().run_in_executor(
+        None, report_versions.versions, company, report_type
+    )
+    return jsonify({
+        'status': 'success',
+        'company': company,
+        'report_type': report_type,
+        'versions': versions
+    })
+
+@app.route('/api/reports/versions/<int:version>', methods=['GET', 'OPTIONS'])
+async def get_report_version(version):
+    """One stored version's markdown, rebuilt from its snapshot and deltas"""
+    if request.method == 'OPTIONS':
+        response = await make_response()
+        return response
+
+    company, report_type = request.args.get('company'), request.args.get('report_type')
+    if not company or not report_type:
+        return jsonify({
+            'status': 'error',
+            'message': 'company and report_type are required'
+        }), 400
+
+    content = await asyncio.get_running_loop().run_in_executor(
+        None, report_versions.text, company, report_type, version
+    )
+    if content is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Version not found'
+        }), 404
+    return jsonify({
+        'status': 'success',
+        'version': version,
+        'content': content
+    })
+
+@app.route('/api/reports/diff', methods=['GET', 'OPTIONS'])
+async def diff_report_versions():
+    """Unified diff between two versions: company, report_type, from and to (defaults: the last two)"""
+    if request.method == 'OPTIONS':
+        response = await make_response()
+        return response
+
+    company, report_type = request.args.get('company'), request.args.get('report_type')
+    if not company or not report_type:
+        return jsonify({
+            'status': 'error',
+            'message': 'company and report_type are required'
+        }), 400
+
+    loop = asyncio.get_running_loop()
+    try:
+        old_version, new_version = request.args.get('from'), request.args.get('to')
+        if old_version is None or new_version is None:
+            versions = await loop.run_in_executor(None, report_versions.versions, company, report_type)
+            numbers = [v['version'] for v in versions]
+            new_version = int(new_version) if new_version is not None else (numbers[-1] if numbers else 0)
+            old_version = int(old_version) if old_version is not None else new_version - 1
+        old_version, new_version = int(old_version), int(new_version)
+        context = int(request.args.get('context', 3))
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'from, to and context must be numbers'
+        }), 400
+
+    diff = await loop.run_in_executor(
+        None, report_versions.diff, company, report_type, old_version, new_version, context
+    )
+    if diff is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Version not found'
+        }), 404
+    return jsonify({
+        'status': 'success',
+        **diff
+    })
+
+@app.route('/api/reports/<filename>/raw', methods=['GET', 'OPTIONS'])
+async def download_report(filename):
+    """Stream a report file, with content-hash ETags, Range support and pre-compressed variants"""
+    if request.method == 'OPTIONS':
+        response = await make_response()
+        return response
+
+    if '/' in filename or '..' in filename:
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid filename'
+        }), 400
+
+    loop = asyncio.get_running_loop()
+    report = await asyncio.to_thread(report_catalog.find, filename)
+    if report and report.get('content_ref'):
+        # Stored bodies go out as their compressed object, or decompressed on the fly
+        delivery = await loop.run_in_executor(
+            None, plan_stored_delivery, get_report_store(), report['content_ref'], report.get('report_size'),
+            request.headers, filename, report.get('report_path')
+        )
+    else:
+        path = await asyncio.to_thread(report_catalog.path_for, filename)
+        if not path or not await asyncio.to_thread(os.path.exists, path):
+            return jsonify({
+                'status': 'error',
+                'message': 'Report not found'
+            }), 404
+        delivery = await loop.run_in_executor(None, plan_delivery, path, request.headers, filename)
+
+    body = delivery_body(delivery)
+    return Response(body, status=delivery.status, headers=delivery.headers)
+
 @app.route('/api/generate-report', methods=['POST', 'OPTIONS'])
 async def generate_report():
     """Endpoint for generating any type of report"""
@@ -190,37 +369,25 @@ async def generate_report():
                     'message': f'Missing required fields: {", ".join(missing)}'
                 }), 400
 
-        logger.info(f"Starting {report_type} for {inputs['company_name']}")
-        
-        # Generate report using the report generator
-        generator = get_report_generator()
-        result = generator.generate_report(report_type, inputs)
-        
-        # Create report files
-        validation_file, report_file = create_reports(result, inputs, report_type)
-        
-        # Read the generated files
-        with open(validation_file, 'r') as f:
-            validation_report = f.read()
-            
-        with open(report_file, 'r') as f:
-            analysis_report = f.read()
-            
+        logger.info(f"Queueing {report_type} for {inputs['company_name']}")
+
+        # Run the crew in the background and hand back a job ID
+        job = job_manager.submit(
+            'report',
+            run_report_job,
+            report_type,
+            inputs,
+            coalesce_key=request_key({'report_type': report_type, 'inputs': inputs}, fields=None),
+            params={
+                'company_name': inputs['company_name'],
+                'report_type': report_type
+            }
+        )
+
         return jsonify({
             'status': 'success',
-            'validation_report': validation_report,
-            'analysis_report': analysis_report,
-            'summary': {
-                'company': inputs['company_name'],
-                'report_type': report_type,
-                'industry': inputs.get('industry', ''),
-                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
-                'analysis_type': inputs.get('analysis_type', ''),
-                'metrics': inputs.get('metrics', {}),
-                'focus_areas': inputs.get('focus_areas', []),
-                'market_region': inputs.get('market_region', 'global')
-            }
-        })
+            'job': job.to_dict()
+        }), 202
 
     except Exception as e:
         logger.error(f"Error generating report: {str(e)}")
@@ -229,6 +396,59 @@ async def generate_report():
             'message': str(e)
         }), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET', 'OPTIONS'])
+async def get_job(job_id):
+    """Get the status of a report job"""
+    if request.method == 'OPTIONS':
+        response = await make_response()
+        return response
+
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({
+            'status': 'error',
+            'message': 'Job not found'
+        }), 404
+
+    return jsonify({
+        'status': 'success',
+        'job': job.to_dict()
+    })
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET', 'OPTIONS'])
+async def get_job_result(job_id):
+    """Get the result of a finished report job"""
+    if request.method == 'OPTIONS':
+        response = await make_response()
+        return response
+
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({
+            'status': 'error',
+            'message': 'Job not found'
+        }), 404
+
+    status = job.status
+    if status == JOB_FAILED:
+        return jsonify({
+            'status': 'error',
+            'message': job.error,
+            'job': job.to_dict()
+        }), 500
+
+    if status != JOB_DONE:
+        return jsonify({
+            'status': 'pending',
+            'message': f'Job is {status}',
+            'job': job.to_dict()
+        }), 202
+
+    return jsonify({
+        'status': 'success',
+        **job.result
+    })
+
 @app.route('/api/market-analysis', methods=['POST', 'OPTIONS'])
 async def analyze_market():
     """Legacy endpoint for market analysis"""
@@ -253,25 +473,20 @@ async def analyze_market():
 
         logger.info(f"Starting market analysis for {user_inputs['company_name']}")
         
-        # Get the generator and start analysis
-        try:
+        def run_market_analysis():
             generator = get_report_generator()
             result = generator.generate_report('market_analysis', user_inputs)
-            
-            # Generate reports
-            validation_file, report_file = create_reports(result, user_inputs, 'market_analysis')
-            
-            # Read the reports
-            with open(validation_file, 'r') as f:
-                validation_report = f.read()
-            
-            with open(report_file, 'r') as f:
-                analysis_report = f.read()
-                
+            return write_reports(result, user_inputs, 'market_analysis', files=generator.files)
+
+        # Legacy clients wait for the report in this response, so the crew runs in a
+        # worker thread rather than on the event loop
+        try:
+            written = await asyncio.to_thread(run_market_analysis)
+
             return jsonify({
                 'status': 'success',
-                'validation_report': validation_report,
-                'analysis_report': analysis_report,
+                'validation_report': written['validation_report'],
+                'analysis_report': written['analysis_report'],
                 'summary': {
                     'company': user_inputs['company_name'],
                     'industry': user_inputs['industry'],
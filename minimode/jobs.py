@@ -0,0 +1,180 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+# Set in process pool workers (see crew_executor) so jobs can tell the parent when they start
+_start_queue = None
+
+
+def bind_start_queue(queue) -> None:
+    """Worker initializer hook: report job starts to the parent on queue"""
+    global _start_queue
+    _start_queue = queue
+
+
+def _run_in_worker(job_id: str, func: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> Any:
+    """Runs in a pool worker process: note the real start time for the parent, then run the job"""
+    if _start_queue is not None:
+        _start_queue.put((job_id, time.time()))
+    return func(*args, **kwargs)
+
+
+class Job:
+    """A unit of background work tracked by the JobManager"""
+
+    def __init__(self, job_id: str, kind: str, params: Optional[Dict[str, Any]] = None):
+        self.job_id = job_id
+        self.kind = kind
+        self.params = params or {}
+        self.future = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Number of duplicate requests that attached to this job
+        self.attached = 0
+
+    @property
+    def status(self) -> str:
+        # finished_at is written last, after result or error, so a finished job is always complete
+        if self.finished_at is not None:
+            return JOB_FAILED if self.error is not None else JOB_DONE
+        return JOB_RUNNING if self.started_at is not None else JOB_QUEUED
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status summary safe to return from the API"""
+        status = self.status
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'status': status,
+            'params': self.params,
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.created_at)),
+            'started_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at)) if self.started_at else None,
+            'finished_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.finished_at)) if self.finished_at else None,
+            'error': self.error,
+            'attached_requests': self.attached
+        }
+
+
+class JobManager:
+    """Runs long report jobs off the event loop and tracks their status"""
+
+    def __init__(self, executor: Optional[Executor] = None, max_workers: Optional[int] = None,
+                 retention_seconds: int = 3600, coalescer=None):
+        if executor is None:
+            max_workers = max_workers or int(os.getenv('REPORT_JOB_WORKERS', '8'))
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report-job')
+        self.executor = executor
+        self.retention_seconds = retention_seconds
+        self.coalescer = coalescer
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        # Process pools from crew_executor report job starts on this queue; threads mark them directly
+        self._start_queue = getattr(executor, 'start_queue', None)
+        if self._start_queue is not None:
+            threading.Thread(target=self._watch_starts, name='job-starts', daemon=True).start()
+
+    def submit(self, kind: str, func: Callable[..., Any], *args, params: Optional[Dict[str, Any]] = None,
+               job_id: Optional[str] = None, coalesce_key: Optional[str] = None, **kwargs) -> Job:
+        """Queue func(*args, **kwargs) and return its Job immediately.
+
+        With a coalesce_key and a coalescer, a duplicate of a job that is still
+        running (or just finished) returns that job instead of starting another.
+        """
+        self._prune()
+        with self._submit_lock:
+            if coalesce_key and self.coalescer:
+                existing = self.coalescer.lookup(coalesce_key)
+                if existing is not None:
+                    existing.attached += 1
+                    logger.info(f"Attached duplicate {kind} request to job {existing.job_id}")
+                    return existing
+
+            job = Job(job_id or uuid.uuid4().hex, kind, params)
+            with self._lock:
+                self._jobs[job.job_id] = job
+            if self._start_queue is not None:
+                job.future = self.executor.submit(_run_in_worker, job.job_id, func, args, kwargs)
+            else:
+                job.future = self.executor.submit(self._run, job, func, args, kwargs)
+            job.future.add_done_callback(lambda future: self._finish(job, future))
+            if coalesce_key and self.coalescer:
+                self.coalescer.register(coalesce_key, job)
+
+        logger.info(f"Queued {kind} job {job.job_id}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> list:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _run(self, job: Job, func: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> Any:
+        self._mark_started(job, time.time())
+        return func(*args, **kwargs)
+
+    def _mark_started(self, job: Job, started_at: float) -> None:
+        with self._lock:
+            if job.started_at is None and job.finished_at is None:
+                job.started_at = started_at
+
+    def _watch_starts(self) -> None:
+        while True:
+            job_id, started_at = self._start_queue.get()
+            if job_id is None:
+                return
+            job = self.get(job_id)
+            if job is not None:
+                self._mark_started(job, started_at)
+
+    def _finish(self, job: Job, future) -> None:
+        result, error = None, None
+        try:
+            result = future.result()
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+        with self._lock:
+            job.result = result
+            job.error = error
+            finished_at = time.time()
+            if job.started_at is None:
+                job.started_at = finished_at
+            # Set last: from here on the job reads as done or failed
+            job.finished_at = finished_at
+        if error is None:
+            logger.info(f"Job {job.job_id} completed")
+        else:
+            logger.error(f"Job {job.job_id} failed: {error}")
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than the retention window"""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if self.coalescer:
+            self.coalescer.prune()
+
+    def shutdown(self, wait: bool = False) -> None:
+        self.executor.shutdown(wait=wait)
+        if self._start_queue is not None:
+            self._start_queue.put((None, None))
@@ -1,16 +1,20 @@
 from crewai import Agent, Task, Crew, Process
 from langchain_openai import ChatOpenAI
 from langchain.tools import Tool
-from langchain_community.tools import WriteFileTool
-from langchain_community.utilities import GoogleSerperAPIWrapper
+from search_cache import get_shared_search
+from job_files import JobFileSystem, atomic_write, parse_write_input
+from report_catalog import get_report_catalog
+from report_search import get_report_search
+from report_delivery import precompress
+from report_store import get_report_store, keep_markdown, store_enabled, validation_reference
 from typing import Any, Dict, Optional
 import os
 import time
 from pathlib import Path
 
 def create_search_tool() -> Tool:
-    """Create a search tool using GoogleSerperAPIWrapper."""
-    search = GoogleSerperAPIWrapper()
+    """Create a search tool backed by the shared, cached Serper search."""
+    search = get_shared_search()
     
     return Tool(
         name="Search",
@@ -23,6 +27,8 @@ class ReportGenerator:
     def __init__(self):
         self.search_tool = create_search_tool()
         
+        # Writer output stays in memory until create_reports persists it
+        self.files = JobFileSystem()
         self.write_file_tool = Tool(
             name="Write File",
             description="Write content to a file. Input should be a dictionary with 'file_path' and 'text' keys.",
@@ -32,9 +38,9 @@ class ReportGenerator:
 
     def write_file_tool_wrapper(self, file_input: Any) -> Any:
         try:
-            if isinstance(file_input, str):
-                file_input = {"file_path": "report.md", "text": file_input}
-            return WriteFileTool().run(file_input)
+            file_path, text, append = parse_write_input(file_input)
+            path = self.files.write(file_path, text, append=append)
+            return f"File written successfully to {path}."
         except Exception as e:
             return {
                 "error": f"File write failed: {str(e)}",
@@ -115,32 +121,99 @@ class ReportGenerator:
         crew = self.create_market_analysis_crew(inputs)
         return crew.kickoff()
 
-def create_reports(result: Any, inputs: Dict[str, Any], report_type: str) -> tuple[str, str]:
+def write_reports(result: Any, inputs: Dict[str, Any], report_type: str,
+                  files: Optional[JobFileSystem] = None) -> Dict[str, str]:
+    """Write the validation and report files; returns their paths and contents, so callers needn't read them back"""
     timestamp = time.strftime('%Y%m%d_%H%M%S')
     base_name = f"{inputs['company_name']}_{report_type}_{timestamp}"
     
     validation_file = f"{base_name}_validation.txt"
     report_file = f"{base_name}_report.md"
 
-    # Create reports directory if it doesn't exist
     reports_dir = Path('reports')
-    reports_dir.mkdir(exist_ok=True)
-
-    # Create validation report
-    with open(reports_dir / validation_file, 'w') as f:
-        f.write(f"Validation Report for {inputs['company_name']}\n")
-        f.write(f"Report Type: {report_type}\n")
-        f.write(f"Generated on: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-        f.write(str(result))
-
-    # Create main report
-    with open(reports_dir / report_file, 'w') as f:
-        f.write(f"# {report_type.replace('_', ' ').title()} Report\n\n")
-        f.write(f"## Overview\n")
-        f.write(f"Company: {inputs['company_name']}\n")
-        f.write(str(result))
-
-    return str(reports_dir / validation_file), str(reports_dir / report_file)
+
+    analysis_report = (
+        f"# {report_type.replace('_', ' ').title()} Report\n\n"
+        f"## Overview\n"
+        f"Company: {inputs['company_name']}\n"
+        f"{result}"
+    )
+    ref = get_report_store().put(
+        analysis_report, chain=(inputs['company_name'], report_type),
+        report_path=str((reports_dir / report_file).resolve())
+    ) if store_enabled() else None
+
+    # Create validation report; a stored body is only referenced
+    validation_header = (
+        f"Validation Report for {inputs['company_name']}\n"
+        f"Report Type: {report_type}\n"
+        f"Generated on: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+    )
+    validation_report = f"{validation_header}{result}"
+    atomic_write(reports_dir / validation_file,
+                 validation_header + validation_reference(ref, report_file) if ref else validation_report)
+
+    # Create main report; stored bodies are already compressed for downloads
+    if ref is None or keep_markdown():
+        atomic_write(reports_dir / report_file, analysis_report)
+    if ref is None:
+        precompress(str(reports_dir / report_file))
+
+    # Files the writer agent saved through the Write File tool
+    if files is not None and len(files):
+        files.persist(reports_dir / f"{base_name}_files")
+
+    try:
+        get_report_catalog().add(
+            inputs['company_name'], report_type, str((reports_dir / report_file).resolve()),
+            str((reports_dir / validation_file).resolve()),
+            detail_level=inputs.get('detail_level'), industry=inputs.get('industry'),
+            content_ref=ref, report_size=len(analysis_report.encode('utf-8'))
+        )
+    except Exception as e:
+        print(f"Could not add {report_file} to the report catalog: {str(e)}")
+
+    try:
+        get_report_search().add(str((reports_dir / report_file).resolve()), analysis_report,
+                                inputs['company_name'], report_type)
+    except Exception as e:
+        print(f"Could not add {report_file} to the search index: {str(e)}")
+
+    return {
+        'validation_file': str(reports_dir / validation_file),
+        'report_file': str(reports_dir / report_file),
+        'validation_report': validation_report,
+        'analysis_report': analysis_report
+    }
+
+def create_reports(result: Any, inputs: Dict[str, Any], report_type: str,
+                   files: Optional[JobFileSystem] = None) -> tuple[str, str]:
+    written = write_reports(result, inputs, report_type, files=files)
+    return written['validation_file'], written['report_file']
+
+def run_report_job(report_type: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate a report and its files; returns plain data for the job API"""
+    generator = get_report_generator()
+    result = generator.generate_report(report_type, inputs)
+    written = write_reports(result, inputs, report_type, files=generator.files)
+
+    return {
+        'validation_report': written['validation_report'],
+        'analysis_report': written['analysis_report'],
+        'report_file': written['report_file'],
+        'validation_file': written['validation_file'],
+        'report_url': f"/api/reports/{os.path.basename(written['report_file'])}/raw",
+        'summary': {
+            'company': inputs['company_name'],
+            'report_type': report_type,
+            'industry': inputs.get('industry', ''),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'analysis_type': inputs.get('analysis_type', ''),
+            'metrics': inputs.get('metrics', {}),
+            'focus_areas': inputs.get('focus_areas', []),
+            'market_region': inputs.get('market_region', 'global')
+        }
+    }
 
 def get_report_generator() -> ReportGenerator:
     return ReportGenerator()
\ No newline at end of file
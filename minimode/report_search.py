@@ -0,0 +1,295 @@
+from disk_cache import CACHE_DIR
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# bm25() column weights: a match in a section heading counts more than one in its body
+HEADING_WEIGHT = float(os.getenv('REPORT_SEARCH_HEADING_WEIGHT', '4.0'))
+BODY_WEIGHT = 1.0
+
+# Sections shown per report in search results
+SECTIONS_PER_HIT = 3
+
+# Broad queries rank only this many of their newest matching sections (BM25 statistics stay corpus-wide)
+MAX_CANDIDATES = int(os.getenv('REPORT_SEARCH_MAX_CANDIDATES', '2000'))
+
+_HEADING = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+_shared_index = None
+_shared_index_lock = threading.Lock()
+
+
+def split_sections(markdown: str) -> List[Tuple[str, str]]:
+    """(heading path, body) for each section of a markdown report.
+
+    The heading path joins the enclosing headings ('Competitive Analysis >
+    Pricing'), so a query can match a subsection by its parent's name too.
+    Text before the first heading is a section with an empty heading.
+    """
+    sections, stack, body = [], [], []
+    in_fence = False
+
+    def flush():
+        text = '\n'.join(body).strip()
+        if text or stack:
+            sections.append((' > '.join(title for _, title in stack), text))
+
+    for line in markdown.splitlines():
+        if line.lstrip().startswith('```'):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING.match(line)
+        if not match:
+            body.append(line)
+            continue
+        flush()
+        body = []
+        level = len(match.group(1))
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        stack.append((level, match.group(2).strip('*_ ')))
+    flush()
+    return [(heading, text) for heading, text in sections if heading or text]
+
+
+def fts_query(q: str) -> str:
+    """A MATCH expression requiring every word of q; quoted phrases stay phrases"""
+    parts = []
+    for phrase, word in re.findall(r'"([^"]+)"|(\S+)', q):
+        tokens = _TOKEN.findall(phrase or word)
+        if not tokens:
+            continue
+        if phrase:
+            parts.append(_phrase(' '.join(tokens)))
+        else:
+            parts.extend(_phrase(token) for token in tokens)
+    return ' '.join(parts)
+
+
+def _phrase(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+def _filter_token(field: str, value: Optional[str]) -> str:
+    """One token per filter value ('reporttypemarketanalysis'); anything but [a-z0-9] would split it"""
+    return field + re.sub(r'[^a-z0-9]+', '', (value or '').strip().lower())
+
+
+class ReportSearchIndex:
+    """SQLite FTS5 index over the sections of generated reports, ranked by BM25.
+
+    Each markdown section is its own row, so hits point at the section that
+    matched and its heading is weighted above its body. create_reports adds
+    each new report; re-indexing a report replaces its rows.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            Path(CACHE_DIR).mkdir(parents=True, exist_ok=True)
+            path = os.getenv('REPORT_SEARCH_PATH') or os.path.join(CACHE_DIR, 'report_search.sqlite3')
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS sections USING fts5(
+                heading, body, company, report_type,
+                report_id UNINDEXED, section UNINDEXED,
+                tokenize = 'porter unicode61'
+            );
+            CREATE TABLE IF NOT EXISTS indexed_reports (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                report_path TEXT NOT NULL UNIQUE,
+                filename TEXT NOT NULL,
+                company_name TEXT,
+                company_key TEXT,
+                report_type TEXT,
+                created_at REAL,
+                section_count INTEGER,
+                indexed_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_indexed_company ON indexed_reports (company_key);
+            CREATE INDEX IF NOT EXISTS idx_indexed_type ON indexed_reports (report_type);
+        """)
+        self._conn.commit()
+
+    def add(self, report_path: str, text: str, company_name: Optional[str] = None,
+            report_type: Optional[str] = None, created_at: Optional[float] = None) -> int:
+        """Index (or re-index) one report; returns how many sections it has"""
+        sections = split_sections(text)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT id FROM indexed_reports WHERE report_path = ?', (str(report_path),)
+            ).fetchone()
+            if row:
+                self._conn.execute('DELETE FROM sections WHERE report_id = ?', (row['id'],))
+                self._conn.execute('DELETE FROM indexed_reports WHERE id = ?', (row['id'],))
+            cursor = self._conn.execute("""
+                INSERT INTO indexed_reports (report_path, filename, company_name, company_key, report_type,
+                                             created_at, section_count, indexed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                str(report_path), os.path.basename(str(report_path)), company_name,
+                (company_name or '').strip().lower(), report_type, created_at or time.time(),
+                len(sections), time.time()
+            ))
+            report_id = cursor.lastrowid
+            company_token = _filter_token('company', company_name)
+            type_token = _filter_token('reporttype', report_type)
+            self._conn.executemany(
+                'INSERT INTO sections (heading, body, company, report_type, report_id, section) VALUES (?, ?, ?, ?, ?, ?)',
+                [(heading, body, company_token, type_token, report_id, index)
+                 for index, (heading, body) in enumerate(sections)]
+            )
+            self._conn.commit()
+        return len(sections)
+
+    def remove(self, report_path: str):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT id FROM indexed_reports WHERE report_path = ?', (str(report_path),)
+            ).fetchone()
+            if row:
+                self._conn.execute('DELETE FROM sections WHERE report_id = ?', (row['id'],))
+                self._conn.execute('DELETE FROM indexed_reports WHERE id = ?', (row['id'],))
+                self._conn.commit()
+
+    def search(self, q: str, limit: int = 20, company: Optional[str] = None,
+               report_type: Optional[str] = None, exhaustive: bool = False) -> List[Dict[str, Any]]:
+        """Reports matching every word of q, best first, each with its best-matching sections"""
+        return self.query(q, limit, company, report_type, exhaustive)[0]
+
+    def query(self, q: str, limit: int = 20, company: Optional[str] = None,
+              report_type: Optional[str] = None, exhaustive: bool = False) -> Tuple[List[Dict[str, Any]], bool]:
+        """search's hits, and whether ranking was cut down to the newest MAX_CANDIDATES sections.
+
+        Scoring every match of a query like 'market' would grow with the
+        corpus, so when more than MAX_CANDIDATES sections match only the
+        newest MAX_CANDIDATES are ranked, unless exhaustive is set.
+        """
+        match = fts_query(q)
+        if not match:
+            return [], False
+        # Only the text columns answer the query, so it can't hit a filter token
+        match = f'{{heading body}} : ({match})'
+        # Filters are FTS tokens too, so they narrow the match instead of being checked row by row
+        if company:
+            match += f' AND {_phrase(_filter_token("company", company))}'
+        if report_type:
+            match += f' AND {_phrase(_filter_token("reporttype", report_type))}'
+
+        with self._lock:
+            # Walking matches newest-first stops after MAX_CANDIDATES rows, so this is cheap either way
+            cutoff = None if exhaustive else self._conn.execute(
+                'SELECT rowid FROM sections WHERE sections MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?',
+                (match, MAX_CANDIDATES)
+            ).fetchone()
+            # Rank without snippets first: snippet() would otherwise run for every candidate
+            rows = self._conn.execute("""
+                SELECT rowid, report_id, heading, section, bm25(sections, ?, ?, 0, 0) AS score
+                FROM sections WHERE sections MATCH ? AND rowid > ?
+                ORDER BY score
+                LIMIT ?
+            """, (HEADING_WEIGHT, BODY_WEIGHT, match, cutoff[0] if cutoff else 0,
+                  limit * SECTIONS_PER_HIT * 4)).fetchall()
+
+        grouped: Dict[int, List[sqlite3.Row]] = {}
+        for row in rows:
+            if row['report_id'] not in grouped and len(grouped) >= limit:
+                continue
+            grouped.setdefault(row['report_id'], [])
+            if len(grouped[row['report_id']]) < SECTIONS_PER_HIT:
+                grouped[row['report_id']].append(row)
+        truncated = cutoff is not None
+        if not grouped:
+            return [], truncated
+
+        shown = [row['rowid'] for section_rows in grouped.values() for row in section_rows]
+        with self._lock:
+            reports = {row['id']: row for row in self._conn.execute(
+                f"SELECT * FROM indexed_reports WHERE id IN ({','.join('?' * len(grouped))})", list(grouped)
+            )}
+            snippets = dict(self._conn.execute(
+                f"SELECT rowid, snippet(sections, 1, '**', '**', '…', 16) FROM sections "
+                f"WHERE sections MATCH ? AND rowid IN ({','.join('?' * len(shown))})", [match] + shown
+            ).fetchall())
+
+        hits = []
+        for report_id, section_rows in grouped.items():
+            report = reports.get(report_id)
+            if report is None:
+                continue
+            hits.append({
+                'filename': report['filename'],
+                'company_name': report['company_name'],
+                'report_type': report['report_type'],
+                'created_at': report['created_at'],
+                # FTS5's bm25() is lower-is-better; flip it so higher scores rank first
+                'score': round(-section_rows[0]['score'], 4),
+                'sections': [{
+                    'heading': row['heading'],
+                    'section': row['section'],
+                    'snippet': snippets.get(row['rowid'], '')
+                } for row in section_rows]
+            })
+        return hits, truncated
+
+    def is_indexed(self, report_path: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                'SELECT 1 FROM indexed_reports WHERE report_path = ?', (str(report_path),)
+            ).fetchone() is not None
+
+    def backfill(self, catalog) -> int:
+        """Index catalogued reports that aren't in the index yet; returns how many"""
+        added, offset = 0, 0
+        while True:
+            reports, _ = catalog.query(sort='created_at', order='asc', limit=500, offset=offset)
+            if not reports:
+                break
+            offset += len(reports)
+            for report in reports:
+                if self.is_indexed(report['report_path']):
+                    continue
+                try:
+                    text = catalog.read_report(report['filename'])
+                except Exception as e:
+                    logger.warning(f"Could not read {report['filename']} for the search index: {e}")
+                    continue
+                if text is None:
+                    continue
+                self.add(report['report_path'], text, report['company_name'], report['report_type'],
+                         report['created_at'])
+                added += 1
+        if added:
+            logger.info(f"Report search index backfilled {added} reports")
+        return added
+
+    def startup_backfill(self, catalog) -> int:
+        """REPORT_SEARCH_BACKFILL (default true) indexes catalogued reports the index is missing"""
+        if os.getenv('REPORT_SEARCH_BACKFILL', 'true').lower() not in ('1', 'true', 'yes'):
+            return 0
+        return self.backfill(catalog)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            reports = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(section_count), 0) FROM indexed_reports').fetchone()
+        return {'path': self.path, 'reports': reports[0], 'sections': reports[1]}
+
+
+def get_report_search() -> ReportSearchIndex:
+    """Report search index shared by the whole process"""
+    global _shared_index
+    with _shared_index_lock:
+        if _shared_index is None:
+            _shared_index = ReportSearchIndex()
+        return _shared_index
@@ -1,11 +1,27 @@
-from quart import Quart, request, jsonify, make_response
+from quart import Quart, Response, request, jsonify, make_response
 from quart_cors import cors
-from main import get_questions_by_report_type
-from market import ReportGenerator, create_reports
+from main import aget_questions_by_report_type
+from market import ReportGenerator, create_reports, run_report_job, run_streaming_report_job
+from jobs import JobManager, JOB_DONE, JOB_FAILED
+from coalesce import RequestCoalescer, request_key
+from crew_executor import create_executor, prewarm
+from orchestrator import prepare_analysis
+from progress import ProgressEmitter, format_sse
+from website_store import get_website_store
+from content_digest import get_digester
+from checkpoint import get_checkpoint_store
+from research_store import get_research_store
+from report_catalog import get_report_catalog, list_reports
+from report_search import get_report_search
+from report_delivery import delivery_body, plan_delivery, plan_stored_delivery
+from report_store import get_report_store
+from report_versions import get_report_versions
+import asyncio
 import logging
 import time
 import os
 import json
+import uuid
 
 app = Quart(__name__)
 
@@ -22,6 +38,45 @@ logger = logging.getLogger(__name__)
 # Initialize report generator
 generator = ReportGenerator()
 
+# Multi-page website crawling for /api/analyze-website (clients may pass "crawl")
+SITE_CRAWL_DEFAULT = os.getenv('SITE_CRAWL', 'true').lower() in ('1', 'true', 'yes')
+
+# Scraped text and profiles by content hash, so clients can send website_ref instead of website_data
+website_store = get_website_store()
+
+# Background report jobs (thread or process pool, see CREW_EXECUTOR)
+job_manager = JobManager(executor=create_executor(), coalescer=RequestCoalescer())
+
+# Streamed reports need a live emitter, so their crews run on threads of their own rather
+# than on the job executor (possibly a process pool) or the loop's default executor
+stream_executor = create_executor('thread', pool_size=int(os.getenv('CREW_STREAM_POOL_SIZE', '4')))
+
+# Index of generated reports behind /api/reports; create_reports adds to it
+report_catalog = get_report_catalog()
+
+# Full-text index behind /api/reports/search; create_reports adds to it too
+report_search = get_report_search()
+
+# Delta chains of repeated reports behind /api/reports/versions and /api/reports/diff
+report_versions = get_report_versions()
+
+@app.before_serving
+async def start_crew_workers():
+    """Spin up crew worker processes before the first request"""
+    await asyncio.get_running_loop().run_in_executor(None, prewarm, job_manager.executor)
+
+@app.before_serving
+async def backfill_report_catalog():
+    """Index reports written before the catalog existed, then search-index them in the background"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, report_catalog.startup_backfill, [os.getcwd()])
+    loop.run_in_executor(None, report_search.startup_backfill, report_catalog)
+
+@app.after_serving
+async def stop_crew_workers():
+    job_manager.shutdown()
+    stream_executor.shutdown(wait=False)
+
 @app.route('/api/detail-levels', methods=['GET'])
 async def get_detail_levels():
     """Get available detail levels and their descriptions"""
@@ -85,15 +140,21 @@ async def analyze_website():
         website_url = data.get('website_url')
         company_name = data.get('company_name', 'Unknown Company')
 
-        # Use the scrape_company_website method
-        website_data = generator.scrape_company_website(website_url)
+        # Crawl the landing page plus /about, /pricing, ... unless the client opts out
+        if data.get('crawl', SITE_CRAWL_DEFAULT):
+            website_data = await generator.acrawl_company_website(website_url)
+        else:
+            website_data = await asyncio.to_thread(generator.scrape_company_website, website_url)
         if website_data:
-            analysis = generator.analyze_website_content(website_data, company_name)
+            website_ref = website_store.put(website_data, website_url)
+            website_profile = await generator.abuild_website_profile(website_data, company_name)
             return jsonify({
                 'status': 'success',
                 'data': {
-                    'analysis': analysis,
-                    'website_data': website_data
+                    'analysis': website_profile.analysis(),
+                    'website_profile': website_profile.to_dict(),
+                    'website_data': website_data,
+                    'website_ref': website_ref
                 }
             })
         else:
@@ -106,6 +167,55 @@ async def analyze_website():
             'message': str(e)
         }), 500
 
+@app.route('/api/prepare-analysis', methods=['POST'])
+async def prepare_analysis_endpoint():
+    """Analyze the website and generate questions concurrently, with a timing breakdown"""
+    try:
+        data = await request.json
+        if not data:
+            return jsonify({'status': 'error', 'message': 'No data provided'}), 400
+
+        required_fields = ['report_type', 'detail_level', 'company_name', 'industry']
+        missing_fields = [field for field in required_fields if field not in data]
+
+        if missing_fields:
+            return jsonify({
+                'status': 'error',
+                'message': f'Missing required fields: {", ".join(missing_fields)}'
+            }), 400
+
+        if not website_store.resolve(data):
+            return jsonify({'status': 'error', 'message': 'Unknown or expired website_ref'}), 404
+
+        prepared = await prepare_analysis(
+            generator,
+            company_name=data['company_name'],
+            industry=data['industry'],
+            report_type=data['report_type'],
+            detail_level=data['detail_level'],
+            website_url=data.get('website_url'),
+            website_data=data.get('website_data'),
+            crawl=data.get('crawl', SITE_CRAWL_DEFAULT)
+        )
+        website_profile = prepared['website_profile']
+        website_ref = website_store.put(prepared['website_data'], data.get('website_url')) if prepared['website_data'] else None
+
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'analysis': website_profile.analysis(),
+                'website_profile': website_profile.to_dict(),
+                'website_data': prepared['website_data'],
+                'website_ref': website_ref,
+                'questions': prepared['questions'],
+                'timings': prepared['timings']
+            }
+        })
+
+    except Exception as e:
+        logger.error(f"Analysis preparation error: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @app.route('/api/generate-questions', methods=['POST'])
 async def generate_questions():
     """Generate analysis questions"""
@@ -123,12 +233,16 @@ async def generate_questions():
                 'message': f'Missing required fields: {", ".join(missing_fields)}'
             }), 400
 
-        questions = get_questions_by_report_type(
+        if not website_store.resolve(data):
+            return jsonify({'status': 'error', 'message': 'Unknown or expired website_ref'}), 404
+
+        questions = await aget_questions_by_report_type(
             report_type=data['report_type'],
             detail_level=data['detail_level'],
             company_name=data['company_name'],
             industry=data['industry'],
-            website_data=data.get('website_data')
+            website_data=data.get('website_data'),
+            website_profile=data.get('website_profile')
         )
 
         return jsonify({
@@ -158,36 +272,323 @@ async def generate_report():
                 'message': f'Missing required fields: {", ".join(missing_fields)}'
             }), 400
 
-        # Generate report
-        result = generator.generate_report(data['report_type'], data)
-        
-        # Create report files
-        validation_file, report_file = create_reports(result, data, data['report_type'])
+        if not website_store.resolve(data):
+            return jsonify({'status': 'error', 'message': 'Unknown or expired website_ref'}), 404
 
-        # Read report content
-        with open(report_file, 'r') as f:
-            report_content = f.read()
+        # Queue report generation so the crew runs off the event loop;
+        # identical in-flight requests share one crew
+        job_id = uuid.uuid4().hex
+        job = job_manager.submit(
+            'report',
+            run_report_job,
+            data['report_type'],
+            data,
+            job_id=job_id,
+            checkpoint_id=job_id,
+            coalesce_key=request_key(data),
+            params={
+                'company_name': data['company_info'].get('company_name'),
+                'report_type': data['report_type'],
+                'detail_level': data['detail_level']
+            }
+        )
 
         return jsonify({
             'status': 'success',
-            'data': {
-                'report_content': report_content,
-                'report_file': report_file,
-                'validation_file': validation_file
-            }
-        })
+            'data': job.to_dict()
+        }), 202
 
     except Exception as e:
         logger.error(f"Report generation error: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/generate-report/stream', methods=['POST'])
+async def generate_report_stream():
+    """Generate a report, streaming crew progress and writer tokens as Server-Sent Events"""
+    try:
+        data = await request.json
+        if not data:
+            return jsonify({'status': 'error', 'message': 'No data provided'}), 400
+
+        required_fields = ['company_info', 'report_type', 'detail_level', 'answers']
+        missing_fields = [field for field in required_fields if field not in data]
+
+        if missing_fields:
+            return jsonify({
+                'status': 'error',
+                'message': f'Missing required fields: {", ".join(missing_fields)}'
+            }), 400
+
+        if not website_store.resolve(data):
+            return jsonify({'status': 'error', 'message': 'Unknown or expired website_ref'}), 404
+
+        # Callbacks need a live emitter, so streamed crews always run in a thread
+        loop = asyncio.get_running_loop()
+        emitter = ProgressEmitter(loop)
+        loop.run_in_executor(stream_executor, run_streaming_report_job, data['report_type'], data, emitter)
+
+        async def event_stream():
+            async for event in emitter.events():
+                yield format_sse(event)
+
+        response = await make_response(event_stream(), 200, {
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        response.timeout = None
+        return response
+
+    except Exception as e:
+        logger.error(f"Report stream error: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+async def get_job(job_id):
+    """Get the status of a report job"""
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+
+    return jsonify({
+        'status': 'success',
+        'data': job.to_dict()
+    })
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+async def get_job_result(job_id):
+    """Get the result of a finished report job"""
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+
+    status = job.status
+    if status == JOB_FAILED:
+        return jsonify({'status': 'error', 'message': job.error, 'data': job.to_dict()}), 500
+    if status != JOB_DONE:
+        return jsonify({
+            'status': 'pending',
+            'message': f'Job is {status}',
+            'data': job.to_dict()
+        }), 202
+
+    return jsonify({
+        'status': 'success',
+        'data': job.result
+    })
+
+@app.route('/api/jobs/<job_id>/resume', methods=['POST'])
+async def resume_job(job_id):
+    """Re-run a failed or interrupted report job, skipping the tasks it already finished"""
+    checkpoint = get_checkpoint_store().get(job_id)
+    if not checkpoint:
+        return jsonify({'status': 'error', 'message': 'No checkpoint found for this job'}), 404
+
+    existing = job_manager.get(job_id)
+    if existing and existing.status not in (JOB_DONE, JOB_FAILED):
+        return jsonify({'status': 'error', 'message': 'Job is still running', 'data': existing.to_dict()}), 409
+
+    context = checkpoint['context']
+    job = job_manager.submit(
+        'report',
+        run_report_job,
+        checkpoint['report_type'],
+        context,
+        checkpoint_id=job_id,
+        params={
+            'company_name': (context.get('company_info') or {}).get('company_name'),
+            'report_type': checkpoint['report_type'],
+            'detail_level': context.get('detail_level'),
+            'resumed_from': job_id,
+            'completed_tasks': len(checkpoint['tasks'])
+        }
+    )
+
+    return jsonify({
+        'status': 'success',
+        'data': job.to_dict()
+    }), 202
+
+@app.route('/api/reports', methods=['GET'])
+async def get_reports():
+    """List generated reports from the report catalog (page/limit/offset, company, report_type, detail_level, sort, order)"""
+    try:
+        page = list_reports(report_catalog, request.args)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': f"Invalid query parameter: {str(e)}"
+        }), 400
+
+    return jsonify({
+        'status': 'success',
+        **page
+    })
+
+@app.route('/api/reports/search', methods=['GET'])
+async def search_reports():
+    """Full-text search over generated reports: q, plus optional limit, company, report_type and exhaustive.
+
+    Broad queries rank only the newest matching sections (REPORT_SEARCH_MAX_CANDIDATES);
+    truncated says when that happened, and exhaustive=true ranks every match.
+    """
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({
+            'status': 'error',
+            'message': 'Query parameter q is required'
+        }), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'limit must be a number'
+        }), 400
+
+    # Read filters here: the request context doesn't follow the call into the executor thread
+    company, report_type = request.args.get('company'), request.args.get('report_type')
+    exhaustive = request.args.get('exhaustive', '').lower() in ('1', 'true', 'yes')
+    start = time.perf_counter()
+    hits, truncated = await asyncio.get_running_loop().run_in_executor(
+        None, lambda: report_search.query(q, limit=limit, company=company, report_type=report_type,
+                                          exhaustive=exhaustive)
+    )
+    return jsonify({
+        'status': 'success',
+        'query': q,
+        'hits': hits,
+        'truncated': truncated,
+        'took_ms': round((time.perf_counter() - start) * 1000, 2)
+    })
+
+@app.route('/api/reports/versions', methods=['GET'])
+async def list_report_versions():
+    """Stored versions of one company's report type: company and report_type are required"""
+    company, report_type = request.args.get('company'), request.args.get('report_type')
+    if not company or not report_type:
+        return jsonify({
+            'status': 'error',
+            'message': 'company and report_type are required'
+        }), 400
+
+    versions = await asyncio.get_running_loop().run_in_executor(
+        None, report_versions.versions, company, report_type
+    )
+    return jsonify({
+        'status': 'success',
+        'company': company,
+        'report_type': report_type,
+        'versions': versions
+    })
+
+@app.route('/api/reports/versions/<int:version>', methods=['GET'])
+async def get_report_version(version):
+    """One stored version's markdown, rebuilt from its snapshot and deltas"""
+    company, report_type = request.args.get('company'), request.args.get('report_type')
+    if not company or not report_type:
+        return jsonify({
+            'status': 'error',
+            'message': 'company and report_type are required'
+        }), 400
+
+    content = await asyncio.get_running_loop().run_in_executor(
+        None, report_versions.text, company, report_type, version
+    )
+    if content is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Version not found'
+        }), 404
+    return jsonify({
+        'status': 'success',
+        'version': version,
+        'content': content
+    })
+
+@app.route('/api/reports/diff', methods=['GET'])
+async def diff_report_versions():
+    """Unified diff between two versions: company, report_type, from and to (defaults: the last two)"""
+    company, report_type = request.args.get('company'), request.args.get('report_type')
+    if not company or not report_type:
+        return jsonify({
+            'status': 'error',
+            'message': 'company and report_type are required'
+        }), 400
+
+    loop = asyncio.get_running_loop()
+    try:
+        old_version, new_version = request.args.get('from'), request.args.get('to')
+        if old_version is None or new_version is None:
+            versions = await loop.run_in_executor(None, report_versions.versions, company, report_type)
+            numbers = [v['version'] for v in versions]
+            new_version = int(new_version) if new_version is not None else (numbers[-1] if numbers else 0)
+            old_version = int(old_version) if old_version is not None else new_version - 1
+        old_version, new_version = int(old_version), int(new_version)
+        context = int(request.args.get('context', 3))
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'from, to and context must be numbers'
+        }), 400
+
+    diff = await loop.run_in_executor(
+        None, report_versions.diff, company, report_type, old_version, new_version, context
+    )
+    if diff is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Version not found'
+        }), 404
+    return jsonify({
+        'status': 'success',
+        **diff
+    })
+
+@app.route('/api/reports/<filename>/raw', methods=['GET'])
+async def download_report(filename):
+    """Stream a report file, with content-hash ETags, Range support and pre-compressed variants"""
+    if '/' in filename or '..' in filename:
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid filename'
+        }), 400
+
+    loop = asyncio.get_running_loop()
+    report = await asyncio.to_thread(report_catalog.find, filename)
+    if report and report.get('content_ref'):
+        # Stored bodies go out as their compressed object, or decompressed on the fly
+        delivery = await loop.run_in_executor(
+            None, plan_stored_delivery, get_report_store(), report['content_ref'], report.get('report_size'),
+            request.headers, filename, report.get('report_path')
+        )
+    else:
+        path = await asyncio.to_thread(report_catalog.path_for, filename)
+        if not path or not await asyncio.to_thread(os.path.exists, path):
+            return jsonify({
+                'status': 'error',
+                'message': 'Report not found'
+            }), 404
+        delivery = await loop.run_in_executor(None, plan_delivery, path, request.headers, filename)
+
+    body = delivery_body(delivery)
+    return Response(body, status=delivery.status, headers=delivery.headers)
+
 @app.route('/api/health', methods=['GET'])
 async def health_check():
     """API health check endpoint"""
     return jsonify({
         'status': 'success',
         'message': 'Market Analysis API is running',
-        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'llm_cache': generator.question_generator.stats(),
+        'search_cache': generator.search.stats(),
+        'website_store': website_store.stats(),
+        'digest_cache': get_digester().stats(),
+        'research_store': get_research_store().stats(),
+        'report_catalog': report_catalog.stats(),
+        'report_search': report_search.stats(),
+        'report_versions': report_versions.stats()
     })
 
 if __name__ == '__main__':
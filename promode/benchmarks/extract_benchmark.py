@@ -0,0 +1,143 @@
+"""Compare full-document extraction with streaming, byte-capped extraction.
+
+Modes: 'full' (BeautifulSoup get_text), 'stream' (VisibleTextParser),
+'ranked' (ContentBlockParser, what fetch_visible_text runs by default, since
+SCRAPE_RANK_CONTENT is on) and 'full_ranked' (extract_main_content over the
+whole document, the non-streaming ranked path).
+
+Usage:
+    python benchmarks/extract_benchmark.py path/to/saved_pages [--repeat 5]
+    python benchmarks/extract_benchmark.py --synthetic 20
+
+Each mode runs in its own subprocess so the peak RSS figures don't bleed
+into each other. Pages are read from disk in 16KB chunks to mimic a
+streamed download; 'bytes read' is how much of each page a mode consumed.
+"""
+from pathlib import Path
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+CHUNK_SIZE = 16384
+MAX_CHARS = 5000
+
+
+def extract_full(path: Path):
+    from bs4 import BeautifulSoup
+
+    html = path.read_text(encoding='utf-8', errors='replace')
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)[:MAX_CHARS], len(html)
+
+
+def extract_full_ranked(path: Path):
+    from content_extract import extract_main_content
+
+    html = path.read_text(encoding='utf-8', errors='replace')
+    return extract_main_content(html, max_chars=MAX_CHARS), len(html)
+
+
+def extract_stream(path: Path, ranked: bool = False):
+    from content_extract import ContentBlockParser
+    from html_stream import VisibleTextParser
+
+    parser = ContentBlockParser(MAX_CHARS) if ranked else VisibleTextParser(MAX_CHARS)
+    read = 0
+    with open(path, encoding='utf-8', errors='replace') as f:
+        while not parser.done:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            read += len(chunk)
+            parser.feed(chunk)
+    parser.close()
+    return parser.text(), read
+
+
+MODES = {
+    'full': extract_full,
+    'stream': extract_stream,
+    'ranked': lambda path: extract_stream(path, ranked=True),
+    'full_ranked': extract_full_ranked
+}
+
+
+def run_mode(mode: str, paths, repeat: int) -> dict:
+    extract = MODES[mode]
+    timings, bytes_read = [], 0
+    for _ in range(repeat):
+        for path in paths:
+            start = time.perf_counter()
+            text, read = extract(path)
+            timings.append((time.perf_counter() - start) * 1000)
+            bytes_read += read
+    return {
+        'mode': mode,
+        'pages': len(paths),
+        'median_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(sorted(timings)[int(len(timings) * 0.95) - 1], 2),
+        'bytes_read_per_repeat': bytes_read // repeat,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def synthetic_corpus(count: int) -> Path:
+    """Marketing-style pages: big inline scripts and nav, then body copy"""
+    directory = Path(tempfile.mkdtemp(prefix='extract_bench_'))
+    script = '<script>' + 'var x = {"a": [1, 2, 3]};' * 20000 + '</script>'
+    nav = '<nav>' + ''.join(f'<a href="/p{i}">Link {i}</a>' for i in range(500)) + '</nav>'
+    body = ''.join(f'<section><h2>Feature {i}</h2><p>{"Our platform helps teams ship faster. " * 30}</p></section>'
+                   for i in range(400))
+    for i in range(count):
+        (directory / f'page_{i}.html').write_text(
+            f'<html><head><style>{"body{margin:0}" * 5000}</style>{script}</head>'
+            f'<body>{nav}{body}{script}</body></html>', encoding='utf-8'
+        )
+    return directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', nargs='?', help='directory of saved .html pages')
+    parser.add_argument('--synthetic', type=int, default=0, help='generate N synthetic heavy pages instead')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--mode', choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    corpus = Path(args.corpus) if args.corpus else synthetic_corpus(args.synthetic or 10)
+    paths = sorted(corpus.glob('*.htm*'))
+    if not paths:
+        sys.exit(f"No .html files found in {corpus}")
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, paths, args.repeat)))
+        return
+
+    total_mb = sum(p.stat().st_size for p in paths) / (1024 * 1024)
+    print(f"Corpus: {len(paths)} pages, {total_mb:.1f} MB ({corpus})\n")
+    print(f"{'mode':<13}{'median ms':>12}{'p95 ms':>10}{'MB read':>10}{'peak RSS MB':>14}")
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, __file__, str(corpus), '--repeat', str(args.repeat), '--mode', mode],
+            capture_output=True, text=True, check=True, env=dict(os.environ)
+        ).stdout
+        result = json.loads(output)
+        print(f"{mode:<13}{result['median_ms']:>12}{result['p95_ms']:>10}"
+              f"{result['bytes_read_per_repeat'] / (1024 * 1024):>10.1f}{result['peak_rss_mb']:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Measure the report search index against scanning every report.
+
+Usage:
+    python benchmarks/search_benchmark.py --reports 10000 100000
+    python benchmarks/search_benchmark.py --reports 10000 --scan
+
+Synthetic reports are built from the section layout the writers produce
+(headings per report type, a few paragraphs each) with a Zipf-like word
+mix, plus a handful of rare terms ('anthropic', 'pricing') so that
+selective and common queries can both be timed. --scan also times a
+substring scan over the same texts, held in memory, i.e. a best case for
+grepping the report files.
+"""
+from pathlib import Path
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+COMPANIES = ['google', 'openai', 'amazon', 'microsoft', 'meta', 'nvidia', 'apple', 'salesforce', 'stripe', 'shopify']
+REPORT_TYPES = ['market_analysis', 'competitor_analysis', 'market_assessment', 'gap_analysis', 'icp_report']
+HEADINGS = ['Executive Summary', 'Market Overview', 'Competitive Analysis', 'Pricing Strategy',
+            'Market Drivers and Inhibitors', 'Strategic Recommendations', 'Risk Analysis']
+COMMON = ('market growth revenue customers product strategy share segment enterprise cloud platform '
+          'competition pricing demand adoption investment regulation risk opportunity channel brand').split()
+FILLER = [f"term{i}" for i in range(5000)]
+
+QUERIES = [
+    ('rare', 'anthropic pricing'),
+    ('phrase', '"enterprise cloud"'),
+    ('common', 'market growth'),
+    ('heading', 'risk analysis'),
+    ('filtered', 'pricing', {'company': 'openai'})
+]
+
+
+def synthetic_report(rng: random.Random, company: str, report_type: str) -> str:
+    lines = [f"# {company.title()} {report_type.replace('_', ' ').title()} Report"]
+    for heading in rng.sample(HEADINGS, 5):
+        lines.append(f"\n## {heading}\n")
+        for _ in range(3):
+            words = [rng.choice(COMMON) if rng.random() < 0.4 else FILLER[int(rng.paretovariate(1.2)) % len(FILLER)]
+                     for _ in range(60)]
+            if rng.random() < 0.01:
+                words.insert(rng.randrange(len(words)), 'anthropic')
+            lines.append('- ' + ' '.join(words).capitalize() + '.')
+    return '\n'.join(lines)
+
+
+def percentile(values, q):
+    return round(sorted(values)[max(0, int(len(values) * q) - 1)], 2)
+
+
+def run(count: int, repeat: int, scan: bool):
+    from report_search import ReportSearchIndex
+
+    rng = random.Random(count)
+    directory = tempfile.mkdtemp(prefix='search_bench_')
+    index = ReportSearchIndex(os.path.join(directory, 'search.sqlite3'))
+    texts = []
+
+    start = time.perf_counter()
+    for i in range(count):
+        company, report_type = rng.choice(COMPANIES), rng.choice(REPORT_TYPES)
+        text = synthetic_report(rng, company, report_type)
+        index.add(f"/reports/{company}_{report_type}_{i}_report.md", text, company, report_type)
+        if scan:
+            texts.append(text)
+    build_seconds = time.perf_counter() - start
+    size_mb = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / (1024 * 1024)
+    print(f"\n{count} reports: indexed in {build_seconds:.1f}s "
+          f"({count / build_seconds:.0f} reports/s, one commit each), index {size_mb:.0f} MB")
+    print(f"{'query':<10}{'q':<22}{'hits':>6}{'median ms':>12}{'p95 ms':>10}" + (f"{'scan ms':>12}" if scan else ''))
+
+    for name, q, *filters in QUERIES:
+        kwargs = filters[0] if filters else {}
+        timings = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            hits = index.search(q, limit=20, **kwargs)
+            timings.append((time.perf_counter() - t) * 1000)
+        row = f"{name:<10}{q:<22}{len(hits):>6}{statistics.median(timings):>12.2f}{percentile(timings, 0.95):>10}"
+        if scan:
+            words = [w.strip('"').lower() for w in q.split()]
+            t = time.perf_counter()
+            sum(1 for text in texts if all(w in text.lower() for w in words))
+            row += f"{(time.perf_counter() - t) * 1000:>12.1f}"
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reports', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--scan', action='store_true', help='also time an in-memory scan of every report')
+    args = parser.parse_args()
+    for count in args.reports:
+        run(count, args.repeat, args.scan)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+from disk_cache import DiskCache
+from typing import Any, Dict, Iterable, List, Optional
+import hashlib
+import os
+import threading
+import time
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def task_fingerprint(task, prefetched: Iterable[str] = ()) -> str:
+    """Identifies a task by its agent and description, so a changed crew never resumes from stale output.
+
+    prefetched are texts pasted into the description from a prefetch stage
+    (search briefs, competitor research). They are left out, so prefetch
+    results that differ on resume don't invalidate the job's checkpoints.
+    """
+    role = task.agent.role if task.agent else ''
+    description = task.description
+    for text in prefetched:
+        if text:
+            description = description.replace(text, '')
+    return hashlib.sha256(f"{role}\n{description}".encode('utf-8')).hexdigest()[:16]
+
+
+class CheckpointStore:
+    """Finished task outputs of a report job, keyed by job ID.
+
+    Each entry holds the request context, so a job can be resumed after a
+    restart, and one record per finished task with its output and the
+    tool calls made while it ran.
+    """
+
+    def __init__(self, cache: Optional[DiskCache] = None):
+        self.cache = cache or DiskCache(
+            'crew_checkpoints',
+            ttl=float(os.getenv('CHECKPOINT_TTL', str(3 * 24 * 3600))),
+            max_entries=int(os.getenv('CHECKPOINT_MAX_ENTRIES', '1000'))
+        )
+        self._lock = threading.Lock()
+
+    def start(self, job_id: str, report_type: str, context: Dict[str, Any]):
+        """Record a job's request, keeping any tasks it already finished"""
+        with self._lock:
+            entry = self.cache.get(job_id) or {'tasks': {}, 'created_at': time.time()}
+            entry.update({'job_id': job_id, 'report_type': report_type, 'context': context,
+                          'updated_at': time.time()})
+            self.cache.set(job_id, entry)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.cache.get(job_id) if job_id else None
+
+    def save_task(self, job_id: str, index: int, agent: Optional[str], fingerprint: str, output: str,
+                  tool_calls: List[Dict[str, Any]]):
+        with self._lock:
+            entry = self.cache.get(job_id)
+            if entry is None:
+                return
+            entry['tasks'][str(index)] = {
+                'agent': agent,
+                'fingerprint': fingerprint,
+                'output': output,
+                'tool_calls': tool_calls,
+                'finished_at': time.time()
+            }
+            entry['updated_at'] = time.time()
+            self.cache.set(job_id, entry)
+
+    def save_fanout(self, job_id: str, name: str, output: str):
+        """Save one fan-out sub-task's output, such as a single competitor's research"""
+        with self._lock:
+            entry = self.cache.get(job_id)
+            if entry is None:
+                return
+            entry.setdefault('fanout', {})[name] = output
+            entry['updated_at'] = time.time()
+            self.cache.set(job_id, entry)
+
+    def fanout(self, job_id: str) -> Dict[str, str]:
+        entry = self.get(job_id)
+        return dict(entry.get('fanout') or {}) if entry else {}
+
+    def completed_tasks(self, job_id: str, fingerprints: List[str]) -> List[Dict[str, Any]]:
+        """Checkpoints for the leading run of tasks that already finished, in order"""
+        entry = self.get(job_id)
+        if not entry:
+            return []
+        completed = []
+        for index, fingerprint in enumerate(fingerprints):
+            saved = entry['tasks'].get(str(index))
+            if not saved or saved['fingerprint'] != fingerprint:
+                break
+            completed.append(saved)
+        return completed
+
+    def clear(self, job_id: str):
+        self.cache.delete(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+def get_checkpoint_store() -> CheckpointStore:
+    """Checkpoint store shared by every ReportGenerator in this process"""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = CheckpointStore()
+        return _shared_store
@@ -0,0 +1,77 @@
+from typing import Any, Dict, Iterable, Optional
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Request fields that determine a report's content; a refresh_research request
+# must not attach to a job that reused stored research, nor a section_writer
+# request to a single-writer job
+REPORT_KEY_FIELDS = ('company_info', 'report_type', 'detail_level', 'answers',
+                     'refresh_research', 'reuse_research', 'section_writer')
+
+
+def _canonical(value: Any, ignore: Iterable[str]) -> Any:
+    """Normalise a JSON-like value so equal requests serialise identically"""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v, ignore) for k, v in value.items() if k not in ignore}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v, ignore) for v in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def request_key(data: Dict[str, Any], fields: Optional[Iterable[str]] = REPORT_KEY_FIELDS,
+                ignore: Iterable[str] = ('timestamp',)) -> str:
+    """Canonical hash of the parts of a request that affect its result"""
+    ignore = tuple(ignore)
+    if fields is not None:
+        data = {field: data.get(field) for field in fields}
+    payload = json.dumps(_canonical(data, ignore), sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RequestCoalescer:
+    """Maps request keys to the job serving them.
+
+    A key resolves to its job while that job is queued or running, and for
+    window_seconds after it finishes successfully so late duplicates get the
+    finished result instead of starting another crew.
+    """
+
+    def __init__(self, window_seconds: Optional[float] = None):
+        if window_seconds is None:
+            window_seconds = float(os.getenv('REPORT_COALESCE_WINDOW', '120'))
+        self.window_seconds = window_seconds
+        self._jobs: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def lookup(self, key: str):
+        """Return the job to attach to for key, or None to start a new one"""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                return None
+            if job.finished_at is not None:
+                expired = time.time() - job.finished_at > self.window_seconds
+                if job.error is not None or expired:
+                    del self._jobs[key]
+                    return None
+            self.hits += 1
+            return job
+
+    def register(self, key: str, job) -> None:
+        with self._lock:
+            self._jobs[key] = job
+
+    def prune(self) -> None:
+        """Drop finished entries that are past the reuse window"""
+        cutoff = time.time() - self.window_seconds
+        with self._lock:
+            expired = [key for key, job in self._jobs.items()
+                       if job.finished_at is not None and (job.error is not None or job.finished_at < cutoff)]
+            for key in expired:
+                del self._jobs[key]
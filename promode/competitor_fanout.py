@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Placeholder create_competitor_tracking_crew uses when no competitors are known
+PLACEHOLDER = 'identified through'
+
+
+def competitor_list(inputs: Dict[str, Any], profile=None, limit: Optional[int] = None) -> List[str]:
+    """Named competitors from the request, falling back to the website profile"""
+    limit = limit or int(os.getenv('COMPETITOR_FANOUT_MAX', '10'))
+    names = [c for c in (inputs.get('competitors') or []) if c and PLACEHOLDER not in c]
+    if not names and profile is not None:
+        names = [c for c in (profile.competitors or []) if c and 'likely competitor' not in c.lower()]
+    # Keep order, drop case-insensitive duplicates and the company itself
+    company = (inputs.get('company_name') or '').strip().lower()
+    seen, result = set(), []
+    for name in names:
+        key = str(name).strip().lower()
+        if key and key not in seen and key != company:
+            seen.add(key)
+            result.append(str(name).strip())
+    return result[:limit]
+
+
+def fanout_enabled(competitors: List[str]) -> bool:
+    """COMPETITOR_FANOUT (default true) turns per-competitor research on; one competitor isn't worth it"""
+    if os.getenv('COMPETITOR_FANOUT', 'true').lower() not in ('1', 'true', 'yes'):
+        return False
+    return len(competitors) >= 2
+
+
+class CompetitorFanout:
+    """Researches each competitor in its own single-task crew, a few at a time.
+
+    All sub-crews share the generator's search tool and so the shared search
+    cache. Briefs already known (from a checkpoint) are not researched again.
+    """
+
+    def __init__(self, build_crew: Callable[[str], Any], max_workers: Optional[int] = None):
+        self.build_crew = build_crew
+        self.max_workers = max_workers or int(os.getenv('COMPETITOR_CONCURRENCY', '5'))
+
+    def _research(self, competitor: str) -> str:
+        return str(self.build_crew(competitor).kickoff())
+
+    def run(self, competitors: List[str], known: Optional[Dict[str, str]] = None,
+            on_done: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+        """Research every competitor not in known; returns briefs in competitor order, timings and failures.
+
+        A competitor whose research raised is left out of briefs and counted
+        in errors (name -> message) rather than in researched.
+        """
+        start = time.perf_counter()
+        briefs = {name: known[name] for name in competitors if known and known.get(name)}
+        reused = len(briefs)
+        pending = [name for name in competitors if name not in briefs]
+        errors = {}
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as pool:
+                futures = {pool.submit(self._research, name): name for name in pending}
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        briefs[name] = future.result()
+                    except Exception as e:
+                        logger.warning(f"Competitor research failed for {name}: {e}")
+                        errors[name] = str(e) or e.__class__.__name__
+                        continue
+                    if on_done:
+                        on_done(name, briefs[name])
+
+        return {
+            'briefs': {name: briefs[name] for name in competitors if name in briefs},
+            'researched': len(briefs) - reused,
+            'reused': reused,
+            'errors': {name: errors[name] for name in competitors if name in errors},
+            'elapsed': round(time.perf_counter() - start, 3)
+        }
+
+
+def merge_section(briefs: Dict[str, str]) -> str:
+    """Per-competitor research block for the merge task description"""
+    return '\n\n'.join(f"### {name}\n{brief}" for name, brief in briefs.items())
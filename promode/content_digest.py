@@ -0,0 +1,167 @@
+from concurrent.futures import ThreadPoolExecutor
+from langchain_community.chat_models import ChatOpenAI
+from disk_cache import DiskCache
+from typing import Any, Dict, List, Optional
+import hashlib
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Rough size of a token in English web copy; close enough for chunk budgeting
+CHARS_PER_TOKEN = 4
+
+# Bump when the prompts change so cached summaries from the old prompt aren't reused
+PROMPT_VERSION = 1
+
+CHUNK_PROMPT = """Summarize this excerpt from {company}'s website for a market analyst.
+Keep concrete facts: products, pricing, customers, markets, competitors, numbers and claims.
+Drop navigation, legal text and calls to action. Use at most {max_chars} characters.
+
+Excerpt:
+{chunk}"""
+
+REDUCE_PROMPT = """Combine these notes about {company}'s website into one digest for a market analyst.
+Merge duplicates, keep every concrete fact, and order from most to least important.
+Use at most {max_chars} characters.
+
+Notes:
+{notes}"""
+
+_shared_digester = None
+_shared_digester_lock = threading.Lock()
+
+
+def split_chunks(text: str, chunk_tokens: int = 800) -> List[str]:
+    """Split text into chunks of about chunk_tokens, breaking at paragraphs, then sentences, then words"""
+    limit = chunk_tokens * CHARS_PER_TOKEN
+    pieces = []
+    for paragraph in re.split(r'\n\s*\n|\n(?=\[Page: )', text):
+        paragraph = paragraph.strip()
+        if len(paragraph) <= limit:
+            pieces.append(paragraph)
+            continue
+        for sentence in re.split(r'(?<=[.!?])\s+', paragraph):
+            while len(sentence) > limit:
+                cut = sentence.rfind(' ', 0, limit)
+                cut = cut if cut > 0 else limit
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:].strip()
+            pieces.append(sentence)
+
+    chunks, current = [], ''
+    for piece in filter(None, pieces):
+        if current and len(current) + len(piece) + 1 > limit:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class ContentDigester:
+    """Map-reduce summarizer that turns long website text into a fixed-size digest.
+
+    Chunks are summarized in parallel with a small model and each summary is
+    cached by the chunk's hash, so a re-crawl only pays for chunks whose text
+    changed. Text already within the digest size is returned untouched.
+    """
+
+    def __init__(self, llm: Optional[Any] = None, cache: Optional[DiskCache] = None,
+                 digest_chars: Optional[int] = None, chunk_tokens: Optional[int] = None,
+                 max_workers: Optional[int] = None):
+        self.model_name = os.getenv('DIGEST_MODEL', 'gpt-4o-mini')
+        self._llm = llm
+        self._llm_lock = threading.Lock()
+        self.cache = cache or DiskCache(
+            'chunk_summaries',
+            ttl=float(os.getenv('DIGEST_CACHE_TTL', str(30 * 24 * 3600))),
+            max_entries=int(os.getenv('DIGEST_CACHE_MAX_ENTRIES', '20000'))
+        )
+        self.digest_chars = digest_chars or int(os.getenv('DIGEST_CHARS', '3000'))
+        self.chunk_tokens = chunk_tokens or int(os.getenv('DIGEST_CHUNK_TOKENS', '800'))
+        self.max_workers = max_workers or int(os.getenv('DIGEST_WORKERS', '6'))
+
+    @property
+    def llm(self) -> Any:
+        with self._llm_lock:
+            if self._llm is None:
+                self._llm = ChatOpenAI(model_name=self.model_name, temperature=0)
+            return self._llm
+
+    def _key(self, kind: str, text: str, max_chars: int) -> str:
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        return f"{kind}:v{PROMPT_VERSION}:{self.model_name}:{max_chars}:{digest}"
+
+    def _complete(self, kind: str, prompt: str, source: str, max_chars: int) -> str:
+        key = self._key(kind, source, max_chars)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        result = self.llm.invoke(prompt).content.strip()
+        self.cache.set(key, result)
+        return result
+
+    def summarize_chunk(self, chunk: str, company: str, max_chars: int) -> str:
+        prompt = CHUNK_PROMPT.format(company=company, chunk=chunk, max_chars=max_chars)
+        return self._complete('chunk', prompt, chunk, max_chars)
+
+    def digest(self, text: str, company_name: str = '') -> str:
+        """Fixed-size digest of text covering all of it, not just its beginning.
+
+        Raises if a summary call fails; summaries that did succeed stay cached.
+        """
+        if not text or len(text) <= self.digest_chars:
+            return text or ''
+
+        company = company_name or 'the company'
+        cached = self.cache.get(self._key('digest', text, self.digest_chars))
+        if cached is not None:
+            return cached
+
+        chunks = split_chunks(text, self.chunk_tokens)
+        # Give each chunk a share of the final budget, with room for the reduce step to merge
+        per_chunk = max(300, 2 * self.digest_chars // len(chunks))
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as pool:
+            summaries = list(pool.map(lambda chunk: self.summarize_chunk(chunk, company, per_chunk), chunks))
+
+        notes = '\n\n'.join(summaries)
+        if len(notes) <= self.digest_chars:
+            result = notes
+        else:
+            prompt = REDUCE_PROMPT.format(company=company, notes=notes, max_chars=self.digest_chars)
+            result = self._complete('reduce', prompt, notes, self.digest_chars)
+
+        result = result[:self.digest_chars]
+        self.cache.set(self._key('digest', text, self.digest_chars), result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+def get_digester() -> ContentDigester:
+    """Digester shared by every ReportGenerator in this process"""
+    global _shared_digester
+    with _shared_digester_lock:
+        if _shared_digester is None:
+            _shared_digester = ContentDigester()
+        return _shared_digester
+
+
+def website_digest(text: Optional[str], company_name: str = '') -> str:
+    """Digest of website text, falling back to its first DIGEST_CHARS if summarizing fails"""
+    if not text:
+        return ''
+    if os.getenv('WEBSITE_DIGEST', 'true').lower() not in ('1', 'true', 'yes'):
+        return text
+    digester = get_digester()
+    try:
+        return digester.digest(text, company_name)
+    except Exception as e:
+        logger.warning(f"Website digest failed: {e}")
+        return text[:digester.digest_chars]
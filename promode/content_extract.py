@@ -0,0 +1,202 @@
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+import re
+
+from html_stream import SKIPPED_TAGS
+
+# Tags that end one text block and start the next
+BLOCK_TAGS = {
+    'p', 'div', 'section', 'article', 'main', 'header', 'footer', 'aside', 'li', 'ul', 'ol',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'table', 'tr', 'td', 'th', 'blockquote', 'pre',
+    'form', 'dl', 'dt', 'dd', 'figure', 'figcaption', 'br', 'hr'
+}
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+# Structural hints from tag names and class/id attributes
+POSITIVE_HINTS = re.compile(r'main|article|content|about|hero|product|pricing|feature|solution|mission|story|body|text')
+NEGATIVE_HINTS = re.compile(r'nav|menu|footer|cookie|consent|banner|sidebar|breadcrumb|social|share|newsletter|'
+                            r'modal|popup|subscribe|login|signup|legal|copyright|widget|ad-|promo')
+BOILERPLATE_HINTS = re.compile(r'cookie|consent|gdpr')
+POSITIVE_TAGS = {'main', 'article'}
+NEGATIVE_TAGS = {'footer', 'aside', 'form', 'header'}
+
+
+@dataclass
+class TextBlock:
+    text: str
+    index: int
+    link_chars: int = 0
+    heading: Optional[str] = None
+    hint: float = 0.0
+    boilerplate: bool = False
+
+    @property
+    def link_density(self) -> float:
+        return min(self.link_chars / max(len(self.text), 1), 1.0)
+
+    def score(self) -> float:
+        """Readability-style value: long, comma-rich, link-poor text scores highest"""
+        if self.boilerplate:
+            return 0.0
+        length = len(self.text)
+        score = min(length, 1000) / 10 + self.text.count(',') * 3 + self.text.count('. ') * 2
+        if length < 25:
+            score *= 0.3
+        score *= (1 - self.link_density) ** 2
+        if self.heading:
+            score += 15
+        return score * (1 + self.hint)
+
+    def render(self) -> str:
+        return f"{self.heading}: {self.text}" if self.heading else self.text
+
+
+class ContentBlockParser(HTMLParser):
+    """Incremental parser that splits a page into scored text blocks.
+
+    Same feed/done/text interface as VisibleTextParser. It stops once it has
+    gathered `candidate_chars` of text (several times the budget, so there is
+    something to choose from), then text() returns the best blocks first.
+    """
+
+    def __init__(self, max_chars: int = 5000, candidate_chars: Optional[int] = None):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.candidate_chars = candidate_chars or max_chars * 4
+        self.blocks: List[TextBlock] = []
+        self.length = 0
+        self._skip_depth = 0
+        self._link_depth = 0
+        self._stack: List[Tuple[str, float, bool]] = []
+        self._parts: List[str] = []
+        self._link_chars = 0
+        self._heading_level = 0
+        self._pending_heading: Optional[str] = None
+        self._seen = set()
+
+    @property
+    def done(self) -> bool:
+        return self.length >= self.candidate_chars
+
+    def _hint(self, tag: str, attrs) -> Tuple[float, bool]:
+        names = ' '.join(value or '' for key, value in attrs if key in ('class', 'id', 'role')).lower()
+        hint = 0.0
+        if tag in POSITIVE_TAGS or (names and POSITIVE_HINTS.search(names)):
+            hint += 0.25
+        if tag in NEGATIVE_TAGS or (names and NEGATIVE_HINTS.search(names)):
+            hint -= 0.8
+        return hint, bool(names and BOILERPLATE_HINTS.search(names))
+
+    def _flush(self):
+        text = ' '.join(self._parts)
+        link_chars, heading_level = self._link_chars, self._heading_level
+        self._parts, self._link_chars, self._heading_level = [], 0, 0
+        if not text:
+            return
+
+        if heading_level and len(text) < 200:
+            # Headings are attached to the block that follows them
+            if self._pending_heading:
+                self._add(TextBlock(self._pending_heading, len(self.blocks), hint=self._context_hint()[0]))
+            self._pending_heading = text
+            return
+
+        if text in self._seen:
+            # Repeated menus and link lists add nothing the second time
+            return
+        self._seen.add(text)
+        hint, boilerplate = self._context_hint()
+        self._add(TextBlock(text, len(self.blocks), link_chars=link_chars, heading=self._pending_heading,
+                            hint=hint, boilerplate=boilerplate))
+        self._pending_heading = None
+
+    def _context_hint(self) -> Tuple[float, bool]:
+        hint = sum(entry[1] for entry in self._stack)
+        boilerplate = any(entry[2] for entry in self._stack)
+        return max(hint, -0.95), boilerplate
+
+    def _add(self, block: TextBlock):
+        self.blocks.append(block)
+        self.length += len(block.text) + 1
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in HEADING_TAGS:
+            self._heading_level = HEADING_TAGS[tag]
+        if tag == 'a':
+            self._link_depth += 1
+        if tag not in VOID_TAGS:
+            self._stack.append((tag, *self._hint(tag, attrs)))
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS and not self._skip_depth:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+            return
+        if self._skip_depth:
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag == 'a' and self._link_depth:
+            self._link_depth -= 1
+        # Pop back to the matching open tag; stray end tags are ignored
+        for position in range(len(self._stack) - 1, -1, -1):
+            if self._stack[position][0] == tag:
+                del self._stack[position:]
+                break
+
+    def handle_data(self, data):
+        if self._skip_depth or self.done:
+            return
+        text = ' '.join(data.split())
+        if text:
+            self._parts.append(text)
+            if self._link_depth:
+                self._link_chars += len(text)
+
+    def close(self):
+        super().close()
+        self._flush()
+        if self._pending_heading:
+            self._add(TextBlock(self._pending_heading, len(self.blocks)))
+            self._pending_heading = None
+
+    def ranked_blocks(self) -> List[TextBlock]:
+        return sorted(self.blocks, key=lambda block: (-block.score(), block.index))
+
+    def text(self) -> str:
+        """The highest-value blocks first, up to max_chars"""
+        selected, total = [], 0
+        for block in self.ranked_blocks():
+            if block.score() <= 0:
+                break
+            rendered = block.render()
+            if total + len(rendered) > self.max_chars:
+                if total == 0:
+                    selected.append(rendered[:self.max_chars])
+                    total = self.max_chars
+                # A shorter block further down may still fit
+                continue
+            selected.append(rendered)
+            total += len(rendered) + 1
+        return '\n'.join(selected)
+
+
+def extract_main_content(html: str, max_chars: int = 5000) -> str:
+    """Rank a whole page's text blocks and return the best max_chars of them"""
+    parser = ContentBlockParser(max_chars, candidate_chars=len(html))
+    parser.feed(html)
+    parser.close()
+    return parser.text()
@@ -0,0 +1,118 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from jobs import bind_start_queue
+from typing import Iterable, Optional, Set
+import importlib
+import importlib.util
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Modules imported once per worker process so jobs never pay the crewai/langchain import cost
+DEFAULT_WARM_MODULES = ('crewai', 'langchain', 'langchain_community', 'market')
+
+
+def _warm_worker(modules: Iterable[str]) -> None:
+    """Process pool initializer: import heavy modules before the first job arrives"""
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning(f"Could not pre-import {name} in worker {os.getpid()}: {e}")
+
+
+# Set in each worker by _init_worker; prewarm's pings meet here
+_warm_barrier = None
+
+
+def _init_worker(modules: Iterable[str], start_queue, warm_barrier) -> None:
+    """Process pool initializer: report job starts to the parent, then pre-import modules"""
+    global _warm_barrier
+    _warm_barrier = warm_barrier
+    bind_start_queue(start_queue)
+    _warm_worker(modules)
+
+
+def _ping(timeout: float) -> int:
+    """Hold this worker until every worker has a ping, so no worker can take two"""
+    try:
+        _warm_barrier.wait(timeout)
+    except threading.BrokenBarrierError:
+        pass
+    return os.getpid()
+
+
+def _slim_main() -> None:
+    """Have spawned workers run this module as their __main__ instead of the parent's script.
+
+    Under `python app.py`, spawn re-runs app.py in every worker, which builds
+    another ReportGenerator and JobManager there. Workers import __main__ by
+    its spec name when it has one, so a script without one is given this
+    module's; jobs never live in the script, so nothing they need is lost.
+    """
+    main = sys.modules.get('__main__')
+    if main is not None and getattr(main, '__spec__', None) is None and getattr(main, '__file__', None):
+        main.__spec__ = importlib.util.find_spec(__name__)
+
+
+def create_executor(kind: Optional[str] = None, pool_size: Optional[int] = None,
+                    max_jobs_per_worker: Optional[int] = None,
+                    warm_modules: Iterable[str] = DEFAULT_WARM_MODULES) -> Executor:
+    """Create the executor that runs crew jobs.
+
+    kind is 'thread' (default) or 'process'; each setting falls back to the
+    CREW_EXECUTOR, CREW_POOL_SIZE and CREW_MAX_JOBS_PER_WORKER environment variables.
+    """
+    kind = (kind or os.getenv('CREW_EXECUTOR', 'thread')).lower()
+    pool_size = pool_size or int(os.getenv('CREW_POOL_SIZE', '0'))
+
+    if kind == 'thread':
+        return ThreadPoolExecutor(max_workers=pool_size or 8, thread_name_prefix='crew')
+
+    if kind != 'process':
+        raise ValueError(f"Invalid crew executor: {kind}")
+
+    pool_size = pool_size or os.cpu_count() or 1
+    if max_jobs_per_worker is None:
+        max_jobs_per_worker = int(os.getenv('CREW_MAX_JOBS_PER_WORKER', '0')) or None
+
+    # spawn keeps workers free of the parent's event loop and locks, and is
+    # required for per-worker recycling via max_tasks_per_child
+    context = multiprocessing.get_context('spawn')
+    _slim_main()
+    start_queue = context.SimpleQueue()
+    warm_barrier = context.Barrier(pool_size)
+    executor = ProcessPoolExecutor(
+        max_workers=pool_size,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(tuple(warm_modules), start_queue, warm_barrier),
+        max_tasks_per_child=max_jobs_per_worker
+    )
+    # JobManager reads when each job really starts from here
+    executor.start_queue = start_queue
+    executor.warm_barrier = warm_barrier
+    logger.info(f"Crew process pool: {pool_size} workers, recycle after {max_jobs_per_worker or 'unlimited'} jobs")
+    return executor
+
+
+def prewarm(executor: Executor, timeout: float = 120) -> Set[int]:
+    """Start every worker process up front instead of on the first report; returns their pids.
+
+    Each ping waits on a barrier sized to the pool, so it keeps its worker
+    busy until all workers hold one and the pool has to start every worker.
+    """
+    warm_barrier = getattr(executor, 'warm_barrier', None)
+    if not isinstance(executor, ProcessPoolExecutor) or warm_barrier is None:
+        return set()
+    futures = [executor.submit(_ping, timeout) for _ in range(warm_barrier.parties)]
+    done, _ = wait(futures, timeout=timeout)
+    pids = {future.result() for future in done if future.exception() is None}
+    if len(pids) < warm_barrier.parties:
+        logger.warning(f"Only {len(pids)} of {warm_barrier.parties} crew workers started within {timeout}s")
+    else:
+        logger.info(f"Crew process pool warm: {len(pids)} workers")
+    return pids
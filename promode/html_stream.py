@@ -0,0 +1,74 @@
+from html.parser import HTMLParser
+from typing import Iterable, List, Optional
+
+# Subtrees whose text never reaches the analysis; the parser drops them as it goes
+SKIPPED_TAGS = {'script', 'style', 'nav', 'noscript', 'svg', 'template', 'iframe'}
+
+
+class VisibleTextParser(HTMLParser):
+    """Incremental HTML parser that keeps only visible text.
+
+    Feed it the body chunk by chunk; no tree is built, and text inside
+    SKIPPED_TAGS is discarded without being stored. `done` turns True once
+    max_chars of text have been collected, so the caller can stop reading.
+    """
+
+    def __init__(self, max_chars: int = 5000):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.length = 0
+        self._skip_depth = 0
+
+    @property
+    def done(self) -> bool:
+        return self.length >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        # <svg/> and friends open and close in one go
+        pass
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if self._skip_depth or self.done:
+            return
+        text = ' '.join(data.split())
+        if text:
+            self.parts.append(text)
+            self.length += len(text) + 1
+
+    def text(self) -> str:
+        return ' '.join(self.parts)[:self.max_chars]
+
+
+class LinkCollector(HTMLParser):
+    """Incremental parser that collects the href of every <a> it reads"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.links.append(href.strip())
+
+
+def extract_visible_text(chunks: Iterable[str], max_chars: int = 5000,
+                         parser: Optional[VisibleTextParser] = None) -> str:
+    """Feed text chunks to a VisibleTextParser until it has max_chars of text"""
+    parser = parser or VisibleTextParser(max_chars)
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.done:
+            break
+    parser.close()
+    return parser.text()
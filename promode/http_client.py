@@ -0,0 +1,243 @@
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+from urllib3.util.retry import Retry
+from disk_cache import DiskCache
+from html_stream import LinkCollector, VisibleTextParser
+from content_extract import ContentBlockParser
+from typing import Any, Callable, Dict, Optional, Tuple
+import codecs
+import hashlib
+import os
+import re
+import threading
+import time
+import requests
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+_CHARSET = re.compile(rb'''<meta[^>]+charset\s*=\s*["']?([\w.:-]+)''', re.IGNORECASE)
+_BOMS = ((codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def stream_encoding(content_type: str, first_chunk: bytes) -> str:
+    """Charset for a streamed body: the Content-Type's, else a BOM or <meta charset> in the first chunk, else UTF-8"""
+    match = re.search(r'charset\s*=\s*["\']?([\w.:-]+)', content_type or '', re.IGNORECASE)
+    candidate = match.group(1) if match else None
+    if candidate is None:
+        candidate = next((name for bom, name in _BOMS if first_chunk.startswith(bom)), None)
+    if candidate is None:
+        meta = _CHARSET.search(first_chunk[:4096])
+        candidate = meta.group(1).decode('ascii') if meta else None
+    try:
+        return codecs.lookup(candidate).name if candidate else 'utf-8'
+    except LookupError:
+        return 'utf-8'
+
+
+class FetchResult:
+    """A fetched (or cached) page"""
+
+    def __init__(self, url: str, entry: Dict[str, Any], from_cache: bool, revalidated: bool = False):
+        self.url = url
+        self.entry = entry
+        self.from_cache = from_cache
+        self.revalidated = revalidated
+
+    @property
+    def text(self) -> str:
+        return self.entry['body']
+
+    @property
+    def status(self) -> int:
+        return self.entry['status']
+
+    @property
+    def body_hash(self) -> str:
+        return self.entry['body_hash']
+
+
+class ScrapeClient:
+    """Pooled HTTP client with an on-disk cache and conditional revalidation.
+
+    Pages younger than `freshness` seconds are served straight from the cache.
+    Older ones are revalidated with If-None-Match / If-Modified-Since, so an
+    unchanged page costs a 304 instead of a full download. At most
+    `max_per_host` requests run against one host at a time.
+    """
+
+    def __init__(self, freshness: Optional[float] = None, max_per_host: Optional[int] = None,
+                 timeout: float = 10, cache: Optional[DiskCache] = None, pool_size: int = 20):
+        self.freshness = float(os.getenv('SCRAPE_CACHE_FRESHNESS', '3600')) if freshness is None else freshness
+        self.max_per_host = max_per_host or int(os.getenv('SCRAPE_MAX_PER_HOST', '4'))
+        self.timeout = timeout
+        self.cache = cache or DiskCache(
+            'http_pages',
+            max_entries=int(os.getenv('SCRAPE_CACHE_MAX_ENTRIES', '2000'))
+        )
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504))
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_lock = threading.Lock()
+
+    def _host_limit(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc.lower()
+        with self._host_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_limits[host]
+
+    def fetch(self, url: str, max_age: Optional[float] = None) -> FetchResult:
+        """GET url, using the cache when fresh and revalidating when stale"""
+        max_age = self.freshness if max_age is None else max_age
+        entry = self.cache.get(url)
+        if entry and time.time() - entry['fetched_at'] < max_age:
+            return FetchResult(url, entry, from_cache=True)
+
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        with self._host_limit(url):
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304 and entry:
+            entry['fetched_at'] = time.time()
+            self.cache.set(url, entry)
+            return FetchResult(url, entry, from_cache=True, revalidated=True)
+
+        response.raise_for_status()
+        body = response.text
+        entry = {
+            'status': response.status_code,
+            'final_url': response.url,
+            'content_type': response.headers.get('Content-Type', ''),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body': body,
+            'body_hash': hashlib.sha256(body.encode('utf-8')).hexdigest(),
+            'fetched_at': time.time(),
+            'extracted': {}
+        }
+        self.cache.set(url, entry)
+        return FetchResult(url, entry, from_cache=False)
+
+    def fetch_text(self, url: str, extractor: Callable[[str], str], name: str = 'text') -> str:
+        """Fetch url and run extractor over the body, caching the extracted text with the page"""
+        return self.fetch_page(url, extractor, name)[1]
+
+    def fetch_page(self, url: str, extractor: Callable[[str], str], name: str = 'text') -> Tuple[FetchResult, str]:
+        """Like fetch_text, but also returns the FetchResult"""
+        result = self.fetch(url)
+        extracted = result.entry.setdefault('extracted', {})
+        if name not in extracted:
+            extracted[name] = extractor(result.text)
+            self.cache.set(url, result.entry)
+        return result, extracted[name]
+
+    def fetch_visible_text(self, url: str, max_chars: int = 5000, max_bytes: Optional[int] = None,
+                           chunk_size: int = 16384, ranked: bool = False) -> str:
+        """Stream url through VisibleTextParser, stopping at max_chars of text or max_bytes of body.
+
+        With ranked=True a ContentBlockParser is used instead, which reads a few
+        times max_chars of text and returns the highest-value blocks first.
+        The full page is never held in memory; only the extracted text is cached.
+        """
+        return self.fetch_visible_page(url, max_chars, max_bytes, chunk_size, ranked)['text']
+
+    def fetch_visible_page(self, url: str, max_chars: int = 5000, max_bytes: Optional[int] = None,
+                           chunk_size: int = 16384, ranked: bool = False, links: bool = False,
+                           stop: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """fetch_visible_text's cached entry: text, bytes_read and final_url.
+
+        With links=True the entry also lists the href of every <a> read before
+        the text budget ran out. Setting stop ends the download at the next
+        chunk; a stopped page is returned as far as it got but not cached.
+        """
+        max_bytes = max_bytes or int(os.getenv('SCRAPE_MAX_BYTES', str(2 * 1024 * 1024)))
+        key = f"{'ranked' if ranked else 'visible'}_{'page' if links else 'text'}:{max_chars}:{url}"
+        entry = self.cache.get(key)
+        if entry and time.time() - entry['fetched_at'] < self.freshness:
+            return entry
+
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        with self._host_limit(url):
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304 and entry:
+                    entry['fetched_at'] = time.time()
+                    self.cache.set(key, entry)
+                    return entry
+
+                response.raise_for_status()
+                parser = ContentBlockParser(max_chars) if ranked else VisibleTextParser(max_chars)
+                collector = LinkCollector() if links else None
+                # Decode chunk by chunk here: response.apparent_encoding would read the whole body,
+                # and max_bytes counts body bytes, not decoded characters
+                decoder = None
+                received = 0
+                stopped = False
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if stop is not None and stop.is_set():
+                        stopped = True
+                        break
+                    chunk = chunk[:max_bytes - received]
+                    if decoder is None:
+                        encoding = stream_encoding(response.headers.get('Content-Type', ''), chunk)
+                        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+                    text = decoder.decode(chunk)
+                    parser.feed(text)
+                    if collector:
+                        collector.feed(text)
+                    received += len(chunk)
+                    if parser.done or received >= max_bytes:
+                        break
+                if decoder is not None:
+                    text = decoder.decode(b'', final=True)
+                    parser.feed(text)
+                    if collector:
+                        collector.feed(text)
+                parser.close()
+                entry = {
+                    'text': parser.text(),
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'final_url': response.url,
+                    'bytes_read': received,
+                    'fetched_at': time.time()
+                }
+                if collector:
+                    collector.close()
+                    entry['links'] = collector.links
+
+        if not stopped:
+            self.cache.set(key, entry)
+        return entry
+
+
+def get_scrape_client() -> ScrapeClient:
+    """Scrape client shared by every ReportGenerator in this process"""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = ScrapeClient()
+        return _shared_client
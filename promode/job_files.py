@@ -0,0 +1,98 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import posixpath
+import tempfile
+import threading
+
+
+def atomic_write(path, text) -> str:
+    """Write text (or bytes) to path via a temp file and rename, so readers never see a partial file"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        if isinstance(text, bytes):
+            with os.fdopen(fd, 'wb') as f:
+                f.write(text)
+        else:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+        # mkstemp creates files private to the owner; match a normal open()
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return str(path)
+
+
+class JobFileSystem:
+    """In-memory files written by one job's agents.
+
+    Each ReportGenerator gets its own, so concurrent crews never share a path
+    and the Write File tool does no disk I/O; create_reports persists the
+    files once the report is done.
+    """
+
+    def __init__(self):
+        self._files: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_path(file_path: str) -> str:
+        path = posixpath.normpath(str(file_path).replace('\\', '/')).lstrip('/')
+        if not path or path == '.' or path.startswith('..'):
+            raise ValueError(f"Invalid file path: {file_path}")
+        return path
+
+    def write(self, file_path: str, text: str, append: bool = False) -> str:
+        path = self.normalize_path(file_path)
+        with self._lock:
+            if append and path in self._files:
+                self._files[path] += text
+            else:
+                self._files[path] = text
+        return path
+
+    def read(self, file_path: str) -> Optional[str]:
+        with self._lock:
+            return self._files.get(self.normalize_path(file_path))
+
+    def list(self) -> List[str]:
+        with self._lock:
+            return sorted(self._files)
+
+    def items(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return sorted(self._files.items())
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def persist(self, directory) -> List[str]:
+        """Atomically write every file under directory; returns the written paths"""
+        return [atomic_write(Path(directory) / path, text) for path, text in self.items()]
+
+
+def parse_write_input(file_input: Any, default_path: str = 'report.md') -> Tuple[str, str, bool]:
+    """(file_path, text, append) from whatever an agent passed to the Write File tool"""
+    if isinstance(file_input, str):
+        # Agents often send the dict as a JSON string
+        try:
+            parsed = json.loads(file_input)
+            if isinstance(parsed, dict) and 'text' in parsed:
+                file_input = parsed
+        except ValueError:
+            pass
+    if isinstance(file_input, str):
+        return default_path, file_input, False
+    if not isinstance(file_input, dict):
+        raise ValueError("Input should be a dictionary with 'file_path' and 'text' keys")
+    return (
+        file_input.get('file_path') or default_path,
+        str(file_input.get('text', '')),
+        bool(file_input.get('append', False))
+    )
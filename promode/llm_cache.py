@@ -0,0 +1,106 @@
+from langchain.schema import AIMessage
+from disk_cache import DiskCache
+from typing import Any, Dict, Optional
+import asyncio
+import hashlib
+import os
+import threading
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> DiskCache:
+    """Process-wide LLM response cache (LLM_CACHE_TTL seconds, LLM_CACHE_MAX_ENTRIES entries)"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = DiskCache(
+                'llm_responses',
+                ttl=float(os.getenv('LLM_CACHE_TTL', str(7 * 24 * 3600))),
+                max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000'))
+            )
+        return _shared_cache
+
+
+class CachedChatModel:
+    """Wraps a chat model so identical prompts are answered from the disk cache.
+
+    Entries are keyed on model name, temperature and a hash of the prompt.
+    Set LLM_CACHE_BYPASS=1 (or bypass=True) to always call the model.
+    """
+
+    def __init__(self, llm, cache: Optional[DiskCache] = None, bypass: Optional[bool] = None):
+        self.llm = llm
+        self.cache = cache or get_llm_cache()
+        if bypass is None:
+            bypass = os.getenv('LLM_CACHE_BYPASS', '').lower() in ('1', 'true', 'yes')
+        self.bypass = bypass
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.llm, 'model_name', None) or getattr(self.llm, 'model', '') or ''
+
+    @property
+    def temperature(self) -> Any:
+        return getattr(self.llm, 'temperature', None)
+
+    def cache_key(self, prompt: str) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return f"{self.model_name}:{self.temperature}:{prompt_hash}"
+
+    def predict(self, prompt: str, bypass_cache: bool = False) -> str:
+        """Cached equivalent of llm.predict(prompt)"""
+        if self.bypass or bypass_cache:
+            return self.llm.predict(prompt)
+        key = self.cache_key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        response = self.llm.predict(prompt)
+        self.cache.set(key, response)
+        return response
+
+    def invoke(self, prompt: str, bypass_cache: bool = False) -> AIMessage:
+        """Cached equivalent of llm.invoke(prompt) for plain string prompts"""
+        if self.bypass or bypass_cache:
+            return self.llm.invoke(prompt)
+        key = self.cache_key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return AIMessage(content=cached)
+        response = self.llm.invoke(prompt)
+        self.cache.set(key, response.content)
+        return response
+
+    async def apredict(self, prompt: str, bypass_cache: bool = False) -> str:
+        """Async cached equivalent of llm.apredict(prompt)"""
+        if self.bypass or bypass_cache:
+            return await self.llm.apredict(prompt)
+        key = self.cache_key(prompt)
+        # DiskCache is synchronous SQLite, so it stays off the event loop
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            return cached
+        response = await self.llm.apredict(prompt)
+        await asyncio.to_thread(self.cache.set, key, response)
+        return response
+
+    async def ainvoke(self, prompt: str, bypass_cache: bool = False) -> AIMessage:
+        """Async cached equivalent of llm.ainvoke(prompt) for plain string prompts"""
+        if self.bypass or bypass_cache:
+            return await self.llm.ainvoke(prompt)
+        key = self.cache_key(prompt)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            return AIMessage(content=cached)
+        response = await self.llm.ainvoke(prompt)
+        await asyncio.to_thread(self.cache.set, key, response.content)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.cache.stats(), 'bypass': self.bypass}
+
+    def __getattr__(self, name: str) -> Any:
+        # Anything else (streaming, callbacks, ...) goes straight to the model
+        return getattr(self.llm, name)
@@ -1,120 +1,160 @@
 from market import ReportGenerator, create_reports, get_report_generator
 from typing import List, Dict, Any, Optional
+import asyncio
 import time
 import json
 from langchain_community.chat_models import ChatOpenAI
+from website_profile import coerce_profile
+from content_digest import website_digest
+from orchestrator import prepare_analysis
 
-def get_questions_by_report_type(report_type, detail_level, company_name, industry, website_data=None):
-    """Generate dynamic AI questions based on report type and detail level"""
+def build_questions_prompt(report_type, detail_level, company_name, industry, website_data=None, website_profile=None):
+    """Build the question generation prompt for a report type and detail level"""
     
-    # Initialize ChatGPT
-    question_generator = ChatOpenAI(
+    # Prefer the already-extracted website profile over raw page text
+    profile = coerce_profile(website_profile)
+    if profile is not None and profile.sections:
+        website_data = profile.summary()
+    else:
+        # Summarize the whole page instead of cutting it off at the slice below
+        website_data = website_digest(website_data, company_name)
+    
+    # Dynamic prompts based on report type
+    report_focus = {
+        'market_analysis': {
+            'quick': "core revenue metrics, immediate market position, key competitors",
+            'detailed': "comprehensive market analysis, competitive positioning, growth trajectory, market share analysis, strategic opportunities"
+        },
+        'competitor_analysis': {
+            'quick': "direct competitors, key differentiators, competitive advantages",
+            'detailed': "detailed competitor landscape, market positioning, competitive strategies, technological advantages, market share distribution"
+        },
+        'icp_report': {
+            'quick': "target customer profile, customer needs, acquisition channels",
+            'detailed': "customer segmentation, behavior patterns, lifetime value, satisfaction metrics, engagement analysis"
+        },
+        'gap_analysis': {
+            'quick': "immediate opportunities, current limitations, quick wins",
+            'detailed': "market gaps, capability assessment, resource requirements, growth opportunities, strategic positioning"
+        },
+        'market_assessment': {
+            'quick': "market size, growth rate, immediate trends",
+            'detailed': "market segmentation, growth projections, regulatory landscape, technological trends, market barriers"
+        },
+        'impact_assessment': {
+            'quick': "key performance indicators, current impact, immediate challenges",
+            'detailed': "comprehensive impact metrics, stakeholder analysis, long-term projections, measurement frameworks, optimization strategies"
+        }
+    }
+
+    # Create dynamic prompt
+    if detail_level == 'quick':
+        prompt = f"""As an expert market analyst, generate 3 highly focused, specific questions about {company_name} in the {industry} industry.
+        
+        Focus areas: {report_focus[report_type]['quick']}
+        
+        Requirements:
+        - Questions must be brief (under 15 words)
+        - Focus on quantifiable metrics where possible
+        - Be specific to their industry and business model
+        - Questions should help gather critical insights quickly
+        
+        Website Content for Context:
+        {website_data[:2000] if website_data else 'No website data available'}
+        
+        Return ONLY a JSON object with this exact format:
+        {{
+            "questions": [
+                {{"id": 1, "question": "Brief, specific question about core metrics?"}},
+                {{"id": 2, "question": "Brief question about market position?"}},
+                {{"id": 3, "question": "Brief question about immediate opportunities?"}},
+            ]
+        }}
+        """
+    else:
+        prompt = f"""As an expert market analyst, generate 5 comprehensive analytical questions about {company_name} in the {industry} industry.
+        
+        Focus areas: {report_focus[report_type]['detailed']}
+        
+        Requirements:
+        - Questions should be detailed and thought-provoking
+        - Cover multiple aspects of each focus area
+        - Include both quantitative and qualitative aspects
+        - Probe for strategic insights and long-term implications
+        
+        Website Content for Context:
+        {website_data[:3000] if website_data else 'No website data available'}
+        
+        Return ONLY a JSON object with this exact format:
+        {{
+            "questions": [
+                {{"id": 1, "question": "Comprehensive question about market position?"}},
+                {{"id": 2, "question": "Detailed question about competitive advantage?"}},
+                {{"id": 3, "question": "Strategic question about growth opportunities?"}},
+                {{"id": 4, "question": "In-depth question about market dynamics?"}},
+                {{"id": 5, "question": "Analytical question about future potential?"}}
+            ]
+        }}
+        """
+    return prompt
+
+def parse_questions(response):
+    """Parse the questions JSON returned by the model"""
+    # Clean and parse response
+    response = response.strip()
+    if response.startswith('```json'):
+        response = response[7:]
+    if response.endswith('```'):
+        response = response[:-3]
+    
+    questions_data = json.loads(response.strip())
+    
+    print("\nGenerated Questions:")
+    for q in questions_data['questions']:
+        print(f"• {q['question']}")
+        
+    return questions_data['questions']
+
+def create_question_generator():
+    return ChatOpenAI(
         model_name="gpt-4o-mini",
         temperature=0.9  # Increased for more variety
     )
+
+def get_questions_by_report_type(report_type, detail_level, company_name, industry, website_data=None, website_profile=None):
+    """Generate dynamic AI questions based on report type and detail level"""
+    
+    # Initialize ChatGPT
+    question_generator = create_question_generator()
     
     try:
-        # Dynamic prompts based on report type
-        report_focus = {
-            'market_analysis': {
-                'quick': "core revenue metrics, immediate market position, key competitors",
-                'detailed': "comprehensive market analysis, competitive positioning, growth trajectory, market share analysis, strategic opportunities"
-            },
-            'competitor_analysis': {
-                'quick': "direct competitors, key differentiators, competitive advantages",
-                'detailed': "detailed competitor landscape, market positioning, competitive strategies, technological advantages, market share distribution"
-            },
-            'icp_report': {
-                'quick': "target customer profile, customer needs, acquisition channels",
-                'detailed': "customer segmentation, behavior patterns, lifetime value, satisfaction metrics, engagement analysis"
-            },
-            'gap_analysis': {
-                'quick': "immediate opportunities, current limitations, quick wins",
-                'detailed': "market gaps, capability assessment, resource requirements, growth opportunities, strategic positioning"
-            },
-            'market_assessment': {
-                'quick': "market size, growth rate, immediate trends",
-                'detailed': "market segmentation, growth projections, regulatory landscape, technological trends, market barriers"
-            },
-            'impact_assessment': {
-                'quick': "key performance indicators, current impact, immediate challenges",
-                'detailed': "comprehensive impact metrics, stakeholder analysis, long-term projections, measurement frameworks, optimization strategies"
-            }
-        }
-
-        # Create dynamic prompt
-        if detail_level == 'quick':
-            prompt = f"""As an expert market analyst, generate 3 highly focused, specific questions about {company_name} in the {industry} industry.
-            
-            Focus areas: {report_focus[report_type]['quick']}
-            
-            Requirements:
-            - Questions must be brief (under 15 words)
-            - Focus on quantifiable metrics where possible
-            - Be specific to their industry and business model
-            - Questions should help gather critical insights quickly
-            
-            Website Content for Context:
-            {website_data[:2000] if website_data else 'No website data available'}
-            
-            Return ONLY a JSON object with this exact format:
-            {{
-                "questions": [
-                    {{"id": 1, "question": "Brief, specific question about core metrics?"}},
-                    {{"id": 2, "question": "Brief question about market position?"}},
-                    {{"id": 3, "question": "Brief question about immediate opportunities?"}},
-                ]
-            }}
-            """
-        else:
-            prompt = f"""As an expert market analyst, generate 5 comprehensive analytical questions about {company_name} in the {industry} industry.
-            
-            Focus areas: {report_focus[report_type]['detailed']}
-            
-            Requirements:
-            - Questions should be detailed and thought-provoking
-            - Cover multiple aspects of each focus area
-            - Include both quantitative and qualitative aspects
-            - Probe for strategic insights and long-term implications
-            
-            Website Content for Context:
-            {website_data[:3000] if website_data else 'No website data available'}
-            
-            Return ONLY a JSON object with this exact format:
-            {{
-                "questions": [
-                    {{"id": 1, "question": "Comprehensive question about market position?"}},
-                    {{"id": 2, "question": "Detailed question about competitive advantage?"}},
-                    {{"id": 3, "question": "Strategic question about growth opportunities?"}},
-                    {{"id": 4, "question": "In-depth question about market dynamics?"}},
-                    {{"id": 5, "question": "Analytical question about future potential?"}}
-                ]
-            }}
-            """
+        prompt = build_questions_prompt(report_type, detail_level, company_name, industry, website_data, website_profile)
 
         # Get AI response with higher temperature for more variety
         response = question_generator.invoke(prompt).content
-        
-        # Clean and parse response
-        response = response.strip()
-        if response.startswith('```json'):
-            response = response[7:]
-        if response.endswith('```'):
-            response = response[:-3]
-        
-        questions_data = json.loads(response.strip())
-        
-        print("\nGenerated Questions:")
-        for q in questions_data['questions']:
-            print(f"• {q['question']}")
-            
-        return questions_data['questions']
+        return parse_questions(response)
         
     except Exception as e:
         print(f"Error generating AI questions: {str(e)}")
         # Only use fallback questions if AI generation completely fails
         return get_default_questions(report_type, detail_level, company_name, industry)
 
+async def aget_questions_by_report_type(report_type, detail_level, company_name, industry, website_data=None, website_profile=None):
+    """Async get_questions_by_report_type, for running alongside other LLM calls"""
+    question_generator = create_question_generator()
+    
+    try:
+        # Building the prompt may digest the website text, which blocks; run it in a thread
+        prompt = await asyncio.to_thread(
+            build_questions_prompt, report_type, detail_level, company_name, industry, website_data, website_profile
+        )
+        response = await question_generator.ainvoke(prompt)
+        return parse_questions(response.content)
+        
+    except Exception as e:
+        print(f"Error generating AI questions: {str(e)}")
+        return get_default_questions(report_type, detail_level, company_name, industry)
+
 def get_default_questions(report_type, detail_level, company_name, industry):
     """Fallback questions if AI generation fails"""
     questions_by_type = {
@@ -271,15 +311,24 @@ def run_analysis():
     # STEP 4: Website Analysis
     print("\nStep 4: Website Analysis")
     website_data = None
+    website_profile = None
+    questions = None
     if website_url:
         print("\n🔍 Analyzing website content...")
         try:
             website_data = generator.scrape_company_website(website_url)
             if website_data:
                 print("✓ Website scraping complete")
-                print("\nAnalyzing content with AI...")
+                print("\nAnalyzing content and generating questions with AI...")
                 
-                analysis = generator.analyze_website_content(website_data, company_name)
+                # Website analysis and question generation don't depend on each other
+                prepared = asyncio.run(prepare_analysis(
+                    generator, company_name, industry, report_type, detail_level,
+                    website_data=website_data
+                ))
+                website_profile = prepared['website_profile']
+                questions = prepared['questions']
+                analysis = website_profile.analysis()
                 
                 print("\n=== Website Analysis Results ===")
                 print(f"Detected Industry: {analysis['industry']}")
@@ -287,6 +336,7 @@ def run_analysis():
                 print(f"Target Market: {analysis['target_market']}")
                 print(f"Main Products/Services: {', '.join(analysis['products'])}")
                 print(f"Market Focus: {analysis['market_focus']}")
+                print("Timings: " + ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in prepared['timings'].items()))
                 
                 if analysis['industry'].lower() != industry.lower():
                     print(f"\nNote: Detected industry ({analysis['industry']}) differs from provided industry ({industry})")
@@ -294,6 +344,8 @@ def run_analysis():
                     if use_detected == 'y':
                         industry = analysis['industry']
                         print(f"Updated industry to: {industry}")
+                        # Questions were written for the old industry
+                        questions = None
                 
                 proceed = input("\nProceed with these insights? (y/n): ").lower().strip()
                 if proceed != 'y':
@@ -318,6 +370,7 @@ def run_analysis():
             'website': website_url
         },
         'website_data': website_data,
+        'website_profile': website_profile,
         'report_type': report_type,
         'detail_level': detail_level
     }
@@ -326,13 +379,15 @@ def run_analysis():
     print("\nStep 5: Generating Questions")
     try:
         # Get AI-generated questions based on website data
-        questions = get_questions_by_report_type(
-            report_type=report_type,
-            detail_level=detail_level,
-            company_name=company_name,
-            industry=industry,
-            website_data=website_data
-        )
+        if questions is None:
+            questions = get_questions_by_report_type(
+                report_type=report_type,
+                detail_level=detail_level,
+                company_name=company_name,
+                industry=industry,
+                website_data=website_data,
+                website_profile=website_profile
+            )
         
         # Collect answers
         answers = {}
@@ -375,16 +430,15 @@ def run_analysis():
         
         # Create reports with context
         try:
-            validation_file, report_file = create_reports(result, context, report_type)
+            validation_file, report_file = create_reports(result, context, report_type, files=generator.files)
             
             print("\n✓ Report generated successfully!")
             print(f"Report saved to: {report_file}")
             
             # Show preview
             print("\n=== Report Preview ===")
-            with open(report_file, 'r') as f:
-                content = f.read()
-                print(content[:500] + "...\n")
+            content = str(result)
+            print(content[:500] + "...\n")
                 
             if input("Show full report? (y/n): ").lower().startswith('y'):
                 print("\n" + "="*50)
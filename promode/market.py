@@ -1,16 +1,35 @@
 from crewai import Agent, Task, Crew, Process
 from langchain_community.chat_models import ChatOpenAI
 from langchain.tools import Tool
-from langchain_community.tools import WriteFileTool
-from langchain_community.utilities import GoogleSerperAPIWrapper
+import asyncio
 import os
 import time
+import uuid
 from pathlib import Path
 import json
-import requests
 from bs4 import BeautifulSoup
 from typing import Any, Dict, Optional, Tuple
 import logging
+import threading
+from progress import TokenStreamHandler
+from llm_cache import CachedChatModel
+from search_cache import get_shared_search
+from research_prefetch import ResearchPrefetcher, prefetch_enabled
+from http_client import get_scrape_client
+from site_crawler import SiteCrawler, combine_pages
+from content_extract import extract_main_content
+from content_digest import website_digest
+from website_profile import PROFILE_PROMPT, WebsiteProfile, coerce_profile
+from website_store import content_hash, get_website_store
+from job_files import JobFileSystem, atomic_write, parse_write_input
+from checkpoint import get_checkpoint_store, task_fingerprint
+from research_store import get_research_store, research_reuse_enabled
+from competitor_fanout import CompetitorFanout, competitor_list, fanout_enabled, merge_section
+from section_writer import SectionWriter, section_writing_enabled
+from report_catalog import get_report_catalog
+from report_search import get_report_search
+from report_delivery import precompress
+from report_store import get_report_store, keep_markdown, store_enabled, validation_reference
 
 # Initialize tools and models
 openai_model = ChatOpenAI(
@@ -18,18 +37,48 @@ openai_model = ChatOpenAI(
     temperature=0.7
 )
 
+# 'stream' reads pages incrementally and stops early; 'full' parses the whole body with BeautifulSoup
+SCRAPE_EXTRACT_MODE = os.getenv('SCRAPE_EXTRACT_MODE', 'stream').lower()
+# Order page text by content value (main copy before nav, banners and footers) instead of document order
+SCRAPE_RANK_CONTENT = os.getenv('SCRAPE_RANK_CONTENT', 'true').lower() in ('1', 'true', 'yes')
+
+# Checkpoint fan-out entry holding a job's prefetched research brief
+PREFETCH_CHECKPOINT_KEY = 'prefetch:brief'
+
 class ReportGenerator:
-    def __init__(self):
-        # Create search tool using GoogleSerperAPIWrapper
-        self.search = GoogleSerperAPIWrapper()
+    def __init__(self, emitter=None, checkpoint_id=None):
+        # Optional ProgressEmitter that receives task, tool and token events
+        self.emitter = emitter
+
+        # Finished tasks are checkpointed under this ID so a retry can skip them
+        self.checkpoint_id = checkpoint_id
+        self.checkpoints = get_checkpoint_store()
+        # Competitor sub-crews search from several threads at once
+        self.tool_calls = []
+        self.tool_calls_lock = threading.Lock()
+        self.task_indices = []
+        self.task_fingerprints = []
+        self.prefetched_texts = []
+        self.task_outputs = {}
+        self.resumed_tasks = 0
+
+        # Research outputs reused across reports that differ only in answers or format
+        self.research_store = get_research_store()
+        self.reused_research = False
+
+        # Create search tool backed by the shared, cached Serper search
+        self.search = get_shared_search()
+        self.search_calls = 0
+        self.run_stats = {}
         self.search_tool = Tool(
             name="Search",
             description="Search the internet for information about companies, markets, and industries",
-            func=self.search.run,
+            func=self.run_search,
             handle_tool_error=True
         )
         
-        # Create write file tool
+        # Create write file tool; files stay in memory until create_reports persists them
+        self.files = JobFileSystem()
         self.write_file_tool = Tool(
             name="Write File",
             description="Write content to a file. Input should be a dictionary with 'file_path' and 'text' keys.",
@@ -37,18 +86,321 @@ class ReportGenerator:
             handle_tool_error=True
         )
         
-        # Initialize ChatOpenAI
-        self.question_generator = ChatOpenAI(
+        # Initialize ChatOpenAI; helper prompts are answered from the LLM response cache
+        self.question_generator = CachedChatModel(ChatOpenAI(
             model_name="gpt-4o-mini",
             temperature=0.7
+        ))
+
+        # Streaming LLM for writer agents when progress is being reported
+        self.writer_llm = None
+        if emitter:
+            self.writer_llm = ChatOpenAI(
+                model_name="gpt-4o-mini",
+                temperature=0.7,
+                streaming=True,
+                callbacks=[TokenStreamHandler(emitter, 'writer')]
+            )
+
+    def emit(self, event, **data):
+        """Send a progress event if anyone is listening"""
+        if self.emitter:
+            self.emitter.emit(event, **data)
+
+    def run_search(self, query: str) -> str:
+        """Run a search query, reporting the call as progress"""
+        with self.tool_calls_lock:
+            self.search_calls += 1
+        self.emit('tool_call', tool='Search', query=query)
+        result = self.search.run(query)
+        self.emit('tool_result', tool='Search', query=query, length=len(result or ''))
+        with self.tool_calls_lock:
+            self.tool_calls.append({'tool': 'Search', 'query': query, 'result': (result or '')[:1000]})
+        return result
+
+    def prefetch_research(self, inputs):
+        """Run the report type's searches in parallel and attach the results to the inputs"""
+        if not prefetch_enabled(inputs.get('report_type')):
+            return None
+
+        # A retry reuses this job's earlier prefetch, so its tasks see the same research
+        known = self.checkpoints.fanout(self.checkpoint_id) if self.checkpoint_id else {}
+        if PREFETCH_CHECKPOINT_KEY in known:
+            inputs['research_brief'] = known[PREFETCH_CHECKPOINT_KEY]
+            print("Reusing prefetched research from an earlier attempt of this job")
+            return {'brief': inputs['research_brief'], 'queries': [], 'completed': 0, 'elapsed': 0.0, 'reused': True}
+
+        print("\nPrefetching market research...")
+        prefetch = ResearchPrefetcher(self.search).prefetch(inputs)
+        inputs['research_brief'] = prefetch['brief']
+        if self.checkpoint_id:
+            self.checkpoints.save_fanout(self.checkpoint_id, PREFETCH_CHECKPOINT_KEY, prefetch['brief'])
+        print(f"Prefetched {prefetch['completed']}/{len(prefetch['queries'])} searches in {prefetch['elapsed']}s")
+        return prefetch
+
+    def research_competitors(self, inputs):
+        """Research each named competitor in parallel; the merge task then compares them"""
+        competitors = inputs.get('competitors') or []
+        if inputs.get('report_type') != 'competitor_analysis' or not fanout_enabled(competitors):
+            return None
+
+        print(f"\nResearching {len(competitors)} competitors in parallel...")
+        known = self.checkpoints.fanout(self.checkpoint_id) if self.checkpoint_id else {}
+
+        def on_done(name, brief):
+            self.emit('competitor_done', competitor=name, output_length=len(brief))
+            if self.checkpoint_id:
+                self.checkpoints.save_fanout(self.checkpoint_id, name, brief)
+
+        fanout = CompetitorFanout(lambda name: self.create_competitor_research_crew(inputs, name)).run(
+            competitors, known=known, on_done=on_done
+        )
+        inputs['competitor_briefs'] = fanout['briefs']
+        print(f"Competitor research finished in {fanout['elapsed']}s "
+              f"({fanout['researched']} researched, {fanout['reused']} from checkpoint, "
+              f"{len(fanout['errors'])} failed)")
+        return fanout
+
+    def create_competitor_research_crew(self, inputs, competitor):
+        """Single-task crew that researches one competitor"""
+        analyst = Agent(
+            role='Competitor Research Analyst',
+            goal=f'Profile {competitor} as a competitor of {inputs["company_name"]}',
+            backstory="Expert in competitive intelligence who produces short, factual competitor profiles.",
+            tools=[self.search_tool],
+            verbose=False
+        )
+        task = Task(
+            description=f"""Research {competitor}, a competitor of {inputs['company_name']} in the {inputs.get('industry')} industry.
+            Cover, for {inputs.get('time_period', '2024')}:
+            1. Products and pricing
+            2. Target customers and market positioning
+            3. Market share, size or growth indicators
+            4. Strengths and weaknesses relative to {inputs['company_name']}
+            5. Recent strategic moves
+            Keep it under 300 words and cite concrete figures where available.""",
+            expected_output=f"A concise, data-backed profile of {competitor}",
+            agent=analyst
+        )
+        return Crew(agents=[analyst], tasks=[task], verbose=False, process=Process.sequential)
+
+    def prefetched_sections(self, inputs):
+        """Prefetched research pasted into task descriptions, which task fingerprints leave out"""
+        if not inputs:
+            return []
+        texts = [inputs.get('research_brief')]
+        if inputs.get('competitor_briefs'):
+            texts.append(merge_section(inputs['competitor_briefs']))
+        return [text for text in texts if text]
+
+    def research_section(self, inputs):
+        """Prefetched research block for an analyst task description"""
+        if not inputs.get('research_brief'):
+            return ''
+        return f"""
+
+                PRE-FETCHED RESEARCH
+                The searches below have already been run for you. Build on these results and
+                only search again for information they do not cover.
+
+                {inputs['research_brief']}"""
+
+    def section_llm(self, section):
+        """Chat model for one report section; streams under its own name when progress is reported"""
+        if not self.emitter:
+            return openai_model
+        return ChatOpenAI(
+            model_name="gpt-4o-mini",
+            temperature=0.7,
+            streaming=True,
+            callbacks=[TokenStreamHandler(self.emitter, f'writer:{section}')]
+        )
+
+    def research_only_crew(self, crew):
+        """The crew without its writer tasks, for when SectionWriter writes the report"""
+        tasks = list(crew.tasks)
+        research = [tasks[index] for index in self.research_task_indices(tasks)]
+        agents = list(dict.fromkeys(task.agent for task in research))
+        return Crew(agents=agents, tasks=research, verbose=True, process=crew.process)
+
+    def write_report_sections(self, inputs, report_type):
+        """Write the report section by section, in parallel, from the research outputs"""
+        research = '\n\n'.join(
+            saved['output'] for _, saved in sorted(self.task_outputs.items()) if saved
+        )
+        known = self.checkpoints.fanout(self.checkpoint_id) if self.checkpoint_id else {}
+        known = {key[len('section:'):]: value for key, value in known.items() if key.startswith('section:')}
+
+        def on_done(section, text):
+            self.emit('section_done', section=section, output_length=len(text))
+            if self.checkpoint_id:
+                self.checkpoints.save_fanout(self.checkpoint_id, f'section:{section}', text)
+
+        print("\nWriting report sections in parallel...")
+        report, stats = SectionWriter(self.section_llm).write(
+            report_type,
+            inputs['company_name'],
+            research,
+            answers=self.format_answers(inputs.get('answers')),
+            detail_level=inputs.get('detail_level', 'quick'),
+            known=known,
+            on_done=on_done
+        )
+        print(f"Wrote {stats['rewritten']} of {stats['sections']} sections in {stats['total_seconds']}s")
+        return report, stats
+
+    def writer_llm_options(self):
+        """Agent kwargs that make a writer stream its tokens"""
+        return {'llm': self.writer_llm} if self.writer_llm else {}
+
+    def attach_progress(self, crew):
+        """Report task start/finish for a sequential crew and checkpoint each finished task"""
+        tasks = list(crew.tasks)
+        indices = self.task_indices or list(range(len(tasks)))
+
+        def make_callback(index):
+            def on_task_done(output):
+                task = tasks[index]
+                self.checkpoint_task(indices[index], task, output)
+                self.emit(
+                    'task_finish',
+                    index=index,
+                    agent=task.agent.role if task.agent else None,
+                    output_length=len(str(output))
+                )
+                if index + 1 < len(tasks):
+                    self.emit_task_start(tasks, index + 1)
+            return on_task_done
+
+        for index, task in enumerate(tasks):
+            task.callback = make_callback(index)
+
+        if tasks:
+            self.emit_task_start(tasks, 0)
+        return crew
+
+    def checkpoint_task(self, index, task, output):
+        """Save a finished task's output and the tool calls it made"""
+        with self.tool_calls_lock:
+            tool_calls, self.tool_calls = self.tool_calls, []
+        agent = task.agent.role if task.agent else None
+        self.task_outputs[index] = {'agent': agent, 'output': str(output)}
+        if not self.checkpoint_id:
+            return
+        try:
+            self.checkpoints.save_task(
+                self.checkpoint_id,
+                index,
+                agent,
+                self.task_fingerprints[index] if index < len(self.task_fingerprints)
+                else task_fingerprint(task, self.prefetched_texts),
+                str(output),
+                tool_calls
+            )
+        except Exception as e:
+            logging.warning(f"Could not checkpoint task {index}: {str(e)}")
+
+    def resume_crew(self, crew, inputs=None, reuse_research=False):
+        """Drop the tasks whose outputs are already known.
+
+        Tasks this job finished in an earlier attempt come from the checkpoint.
+        Failing that, with reuse_research the research tasks come from the
+        research store, so only the writer runs. Returns the crew to run and,
+        when every task is already done, the final output.
+        """
+        tasks = list(crew.tasks)
+        self.prefetched_texts = self.prefetched_sections(inputs)
+        self.task_fingerprints = [task_fingerprint(task, self.prefetched_texts) for task in tasks]
+        self.task_indices = list(range(len(tasks)))
+        self.task_outputs = {}
+        self.resumed_tasks = 0
+        self.reused_research = False
+
+        completed = []
+        if self.checkpoint_id:
+            completed = self.checkpoints.completed_tasks(self.checkpoint_id, self.task_fingerprints)
+        heading = 'COMPLETED RESEARCH (from an earlier attempt of this job)'
+
+        research_count = len(self.research_task_indices(tasks))
+        if inputs is not None and reuse_research and len(completed) < research_count:
+            stored = self.research_store.get(inputs)
+            if stored and len(stored) == research_count:
+                print(f"Reusing stored research for {inputs.get('company_name')}; only the writer will run")
+                completed = stored
+                heading = 'MARKET RESEARCH (from an earlier report with the same company, industry and period)'
+                self.reused_research = True
+
+        if not completed:
+            return crew, None
+
+        self.resumed_tasks = len(completed)
+        for index, saved in enumerate(completed):
+            self.task_outputs[index] = saved
+        print(f"Skipping {len(completed)} of {len(tasks)} tasks")
+        if len(completed) == len(tasks):
+            return crew, completed[-1]['output']
+
+        # The remaining tasks don't see skipped tasks' outputs as context, so hand them over explicitly
+        outputs = '\n\n'.join(f"--- {saved['agent']} ---\n{saved['output']}" for saved in completed)
+        remaining = tasks[len(completed):]
+        remaining[0].description += f"""
+
+                {heading}:
+                {outputs}"""
+        if self.reused_research:
+            # Answers may have changed since that research was done
+            remaining[0].description += f"""
+
+                {self.format_answers(inputs.get('answers'))}"""
+        self.task_indices = list(range(len(completed), len(tasks)))
+        return Crew(agents=crew.agents, tasks=remaining, verbose=True, process=crew.process), None
+
+    def research_task_indices(self, tasks):
+        """The leading research tasks; every crew ends with its report writer's tasks"""
+        indices = []
+        for index, task in enumerate(tasks):
+            if not task.agent or 'writer' in task.agent.role.lower():
+                break
+            indices.append(index)
+        return indices
+
+    def store_research(self, inputs, tasks):
+        """Keep this run's research outputs for later reports over the same inputs"""
+        if self.reused_research:
+            return
+        research = [self.task_outputs.get(index) for index in self.research_task_indices(tasks)]
+        if not research or not all(research):
+            return
+        try:
+            self.research_store.set(inputs, [
+                {'agent': saved['agent'], 'output': saved['output']} for saved in research
+            ])
+        except Exception as e:
+            logging.warning(f"Could not store research: {str(e)}")
+
+    def format_answers(self, answers):
+        """The user's answers to the analysis questions, for a writer task"""
+        if not answers:
+            return "No user responses provided."
+        lines = ["USER RESPONSES TO ANALYSIS QUESTIONS:"]
+        lines.extend(f"Q{qid}: {answer}" for qid, answer in answers.items())
+        return "\n".join(lines)
+
+    def emit_task_start(self, tasks, index):
+        task = tasks[index]
+        self.emit(
+            'task_start',
+            index=index,
+            total=len(tasks),
+            agent=task.agent.role if task.agent else None
         )
 
     def write_file_tool_wrapper(self, file_input: Any) -> Any:
-        """Wrapper for writing content to a file."""
+        """Wrapper for writing content to this job's in-memory files."""
         try:
-            if isinstance(file_input, str):
-                file_input = {"file_path": "report.md", "text": file_input}
-            return WriteFileTool().run(file_input)
+            file_path, text, append = parse_write_input(file_input)
+            path = self.files.write(file_path, text, append=append)
+            return f"File written successfully to {path}."
         except Exception as e:
             return {
                 "error": f"File write failed: {str(e)}",
@@ -58,35 +410,56 @@ class ReportGenerator:
     def scrape_company_website(self, url: str) -> Optional[str]:
         """Scrape content from a company website."""
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            # Make the request
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            # Parse the HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # Get text content
-            text = soup.get_text()
-            
-            # Clean up the text
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-            
-            return text[:5000]  # Return first 5000 characters
+            client = get_scrape_client()
+            if SCRAPE_EXTRACT_MODE == 'stream':
+                # Stop downloading once enough visible text has been read
+                return client.fetch_visible_text(url, max_chars=5000, ranked=SCRAPE_RANK_CONTENT)
+
+            # Pooled, cached fetch; unchanged pages are revalidated rather than re-downloaded
+            return client.fetch_text(url, self.extract_page_text, name='visible_text')
             
         except Exception as e:
             logging.error(f"Error scraping website: {str(e)}")
             return None
 
+    async def acrawl_company_website(self, url: str) -> Optional[str]:
+        """Crawl the landing page and its most useful same-site pages concurrently"""
+        try:
+            pages = await SiteCrawler(ranked=SCRAPE_RANK_CONTENT).crawl(url)
+            # Prompts see a digest of the whole crawl, so pages can be kept at full extracted length
+            return combine_pages(pages, per_page_chars=int(os.getenv('SITE_CRAWL_PAGE_CHARS', '5000')))
+
+        except Exception as e:
+            logging.error(f"Error crawling website: {str(e)}")
+            return None
+
+    def crawl_company_website(self, url: str) -> Optional[str]:
+        """Synchronous acrawl_company_website, for callers outside an event loop"""
+        return asyncio.run(self.acrawl_company_website(url))
+
+    def extract_page_text(self, html: str) -> str:
+        """Extract 5000 characters of visible text from a page"""
+        if SCRAPE_RANK_CONTENT:
+            # Highest-value blocks first, so website_data[:1000] slices keep the signal
+            return extract_main_content(html, max_chars=5000)
+
+        # Parse the HTML
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # Remove script and style elements
+        for script in soup(["script", "style"]):
+            script.decompose()
+        
+        # Get text content
+        text = soup.get_text()
+        
+        # Clean up the text
+        lines = (line.strip() for line in text.splitlines())
+        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+        text = ' '.join(chunk for chunk in chunks if chunk)
+        
+        return text[:5000]  # Return first 5000 characters
+
     def log_input_data(self, inputs):
         """Common method to log input data for all report types"""
         print("\n=== DATA PASSED TO AGENTS ===")
@@ -97,8 +470,8 @@ class ReportGenerator:
         print(f"Detail Level: {inputs.get('detail_level')}")
         
         print("\n2. Website Analysis:")
-        website_context = self.format_website_data(inputs.get('website_content', ''))
-        print(f"Website Content Length: {len(inputs.get('website_content', ''))} characters")
+        website_context = self.website_context(inputs)
+        print(f"Website Content Length: {len(inputs.get('website_content') or '')} characters")
         print("Structured Website Data:")
         print(website_context[:500] + "..." if len(website_context) > 500 else website_context)
         
@@ -126,8 +499,8 @@ class ReportGenerator:
         print(f"Detail Level: {inputs.get('detail_level')}")
         
         print("\n2. Website Analysis:")
-        website_context = self.format_website_data(inputs.get('website_content', ''))
-        print(f"Website Content Length: {len(inputs.get('website_content', ''))} characters")
+        website_context = self.website_context(inputs)
+        print(f"Website Content Length: {len(inputs.get('website_content') or '')} characters")
         print("Structured Website Data:")
         print(website_context[:500] + "..." if len(website_context) > 500 else website_context)
         
@@ -218,6 +591,7 @@ class ReportGenerator:
             tools=[self.write_file_tool],
             verbose=True,
             allow_delegation=False,
+            **self.writer_llm_options(),
             system_prompt=f"""You are a professional business report writer creating a market analysis report for {inputs['company_name']}.
 
 Create a detailed market analysis report following this structure:
@@ -269,7 +643,7 @@ Format the report in clear, professional markdown with appropriate headers, bull
                 - Current and relevant
                 - Actionable for business decisions
                 
-                You must scrape at least 5 different websites and compile their data before passing to the report writer.""",
+                You must scrape at least 5 different websites and compile their data before passing to the report writer.{self.research_section(inputs)}""",
                 expected_output="""A comprehensive market analysis containing:
                 1. Detailed market size and growth metrics
                 2. Competitive landscape analysis
@@ -314,82 +688,96 @@ Format the report in clear, professional markdown with appropriate headers, bull
             process=Process.sequential
         )
 
-    def format_website_data(self, content):
-        """Format website content into structured analysis"""
+    def build_website_profile(self, content, company_name='', industry=None):
+        """Extract every website-derived field in a single LLM pass"""
+        if not content:
+            return WebsiteProfile(company_name=company_name or '', industry=industry or 'Technology')
+
+        stored = self.stored_website_profile(content, company_name)
+        if stored is not None:
+            return stored
+
         try:
-            if not content:
-                return """
-                No website content available for analysis.
-                Using basic company information and user inputs for analysis.
-                """
-            
-            analysis_prompt = f"""Analyze this website content and provide a structured analysis in the following format:
+            print("Analyzing website content with AI...")
+            response = self.question_generator.invoke(self.website_profile_prompt(content, company_name)).content
+            profile = WebsiteProfile.from_llm_response(response, company_name or '', len(content))
+            print("Website analysis completed successfully")
+            return self.store_website_profile(content, company_name, profile)
 
-            1. Company Overview
-            - Main business focus
-            - Core offerings
-            - Company positioning
+        except Exception as e:
+            return self.default_website_profile(content, company_name, industry, e)
 
-            2. Products/Services
-            - Key offerings
-            - Features/capabilities
-            - Target solutions
+    async def abuild_website_profile(self, content, company_name='', industry=None):
+        """Async build_website_profile, for running alongside other LLM calls"""
+        if not content:
+            return WebsiteProfile(company_name=company_name or '', industry=industry or 'Technology')
 
-            3. Target Market
-            - Primary audience
-            - Market segments
-            - Geographic focus
+        stored = self.stored_website_profile(content, company_name)
+        if stored is not None:
+            return stored
 
-            4. Value Proposition
-            - Key differentiators
-            - Main benefits
-            - Unique advantages
+        try:
+            # The prompt digests the page, which may call the LLM several times; keep that off the event loop
+            prompt = await asyncio.to_thread(self.website_profile_prompt, content, company_name)
+            response = await self.question_generator.ainvoke(prompt)
+            profile = WebsiteProfile.from_llm_response(response.content, company_name or '', len(content))
+            return self.store_website_profile(content, company_name, profile)
 
-            5. Key Technologies/Solutions
-            - Core technologies
-            - Technical capabilities
-            - Platform features
+        except Exception as e:
+            return self.default_website_profile(content, company_name, industry, e)
 
-            6. Market Position
-            - Industry focus
-            - Competitive stance
-            - Market approach
+    def stored_website_profile(self, content, company_name):
+        """Profile previously built for this exact content and company, if any"""
+        try:
+            stored = get_website_store().profile(content_hash(content), company_name)
+            return WebsiteProfile.from_dict(stored) if stored else None
+        except Exception as e:
+            logging.warning(f"Website store lookup failed: {str(e)}")
+            return None
 
-            Website Content:
-            {content[:3000]}
-            """
-            
-            response = self.question_generator.predict(analysis_prompt)
-            
-            # Validate the response has actual content
-            if len(response.strip()) < 50:
-                raise ValueError("Insufficient analysis generated")
-            
-            return response.strip()
-            
+    def store_website_profile(self, content, company_name, profile):
+        try:
+            store = get_website_store()
+            store.set_profile(store.put(content), company_name, profile.to_dict())
         except Exception as e:
-            print(f"Notice: Using structured default format due to analysis error: {e}")
-            
-            # Provide a structured default analysis
-            return f"""
-            1. Company Overview
-            Based on available information, the company operates in the {inputs.get('industry', 'technology')} sector.
-            
-            2. Products/Services
-            Analysis will be based on user inputs and market research.
-            
-            3. Target Market
-            Market analysis will be conducted using industry standards and user responses.
-            
-            4. Value Proposition
-            Will be derived from market research and competitive analysis.
-            
-            5. Key Technologies/Solutions
-            Technology assessment will be based on industry trends and company focus.
-            
-            6. Market Position
-            Position analysis will use market research and competitive intelligence.
-            """
+            logging.warning(f"Website store update failed: {str(e)}")
+        return profile
+
+    def website_profile_prompt(self, content, company_name):
+        # Map-reduce digest of the whole text rather than only its first 3000 characters
+        content = website_digest(content, company_name)
+        return PROFILE_PROMPT.format(company_name=company_name or 'the company', content=content[:3000])
+
+    def default_website_profile(self, content, company_name, industry, error):
+        print(f"Notice: Using structured default format due to analysis error: {error}")
+        return WebsiteProfile(
+            company_name=company_name or '',
+            industry=industry or 'Technology',
+            source_length=len(content)
+        )
+
+    def website_context(self, inputs):
+        """Structured website analysis for a crew, built once and kept on the inputs"""
+        profile = coerce_profile(inputs.get('website_profile'))
+        if profile is None:
+            profile = self.build_website_profile(
+                inputs.get('website_content') or '',
+                inputs.get('company_name') or '',
+                inputs.get('industry')
+            )
+        inputs['website_profile'] = profile
+        return profile.structured_analysis()
+
+    def question_context(self, website_data, website_profile=None, limit=1000):
+        """Website context for question prompts: the profile summary when available"""
+        profile = coerce_profile(website_profile)
+        if profile is not None and profile.sections:
+            return profile.summary()
+        return website_digest(website_data)[:limit]
+
+    def format_website_data(self, content):
+        """Format website content into structured analysis"""
+        return self.build_website_profile(content).structured_analysis().strip()
 
     def format_user_responses(self, inputs):
         """Format user responses into structured insights"""
@@ -467,16 +855,17 @@ Format the report in clear, professional markdown with appropriate headers, bull
                 backstory="""Professional business writer specializing in competitive intelligence reports.""",
                 tools=[self.write_file_tool],
                 verbose=True,
-                allow_delegation=False
+                allow_delegation=False,
+                **self.writer_llm_options()
             )
             
             tasks = [
                 Task(
-                    description=f"""Analyze the competitive landscape for {inputs['company_name']}. Focus on:
+                    description=self.competitor_merge_description(inputs) if inputs.get('competitor_briefs') else f"""Analyze the competitive landscape for {inputs['company_name']}. Focus on:
                     1. Direct and indirect competitors
                     2. Market positioning
                     3. Competitive advantages
-                    4. Industry trends""",
+                    4. Industry trends{self.research_section(inputs)}""",
                     agent=analyst,
                     expected_output="""A comprehensive competitive analysis including:
                     - Detailed competitor profiles
@@ -513,6 +902,19 @@ Format the report in clear, professional markdown with appropriate headers, bull
             print(f"Error in competitor tracking crew creation: {e}")
             raise
 
+    def competitor_merge_description(self, inputs):
+        """Merge step over the per-competitor research from research_competitors"""
+        return f"""Build the comparative competitive analysis for {inputs['company_name']} from the
+                    per-competitor research below. Focus on:
+                    1. Direct and indirect competitors, compared side by side
+                    2. Market positioning of each competitor against {inputs['company_name']}
+                    3. Competitive advantages and disadvantages
+                    4. Industry trends the competitors point to
+                    Use the search tool only to fill gaps the research leaves open.
+
+                    PER-COMPETITOR RESEARCH
+                    {merge_section(inputs['competitor_briefs'])}{self.research_section(inputs)}"""
+
     def create_icp_report_crew(self, inputs):
         """Create crew for ICP (Ideal Customer Profile) report"""
         try:
@@ -554,7 +956,8 @@ Format the report in clear, professional markdown with appropriate headers, bull
                 goal='Create comprehensive ICP analysis report',
                 backstory="Specialized in creating detailed customer profile reports.",
                 tools=[self.write_file_tool],
-                verbose=True
+                verbose=True,
+                **self.writer_llm_options()
             )
             
             tasks = [
@@ -565,7 +968,7 @@ Format the report in clear, professional markdown with appropriate headers, bull
                     2. Behavioral patterns
                     3. Pain points and needs
                     4. Decision-making process
-                    5. Value drivers""",
+                    5. Value drivers{self.research_section(inputs)}""",
                     expected_output="""A comprehensive ICP analysis including:
                     - Detailed customer segments
                     - Behavioral analysis
@@ -644,7 +1047,8 @@ Format the report in clear, professional markdown with appropriate headers, bull
                 goal='Create comprehensive gap analysis report',
                 backstory="Specialized in writing detailed gap analysis reports.",
                 tools=[self.write_file_tool],
-                verbose=True
+                verbose=True,
+                **self.writer_llm_options()
             )
             
             tasks = [
@@ -655,7 +1059,7 @@ Format the report in clear, professional markdown with appropriate headers, bull
                     2. Competitor capabilities
                     3. Customer needs vs offerings
                     4. Performance metrics
-                    5. Growth opportunities""",
+                    5. Growth opportunities{self.research_section(inputs)}""",
                     expected_output="""A comprehensive gap analysis including:
                     - Market position gaps
                     - Performance gaps
@@ -731,7 +1135,8 @@ Format the report in clear, professional markdown with appropriate headers, bull
                 goal='Create comprehensive market assessment report',
                 backstory="Specialized in market assessment documentation.",
                 tools=[self.write_file_tool],
-                verbose=True
+                verbose=True,
+                **self.writer_llm_options()
             )
             
             tasks = [
@@ -742,7 +1147,7 @@ Format the report in clear, professional markdown with appropriate headers, bull
                     2. Market segments
                     3. Entry barriers
                     4. Market dynamics
-                    5. Growth potential""",
+                    5. Growth potential{self.research_section(inputs)}""",
                     expected_output="""A comprehensive market assessment including:
                     - Market size analysis
                     - Segment analysis
@@ -818,7 +1223,8 @@ Format the report in clear, professional markdown with appropriate headers, bull
                 goal='Create comprehensive impact assessment report',
                 backstory="Specialized in impact assessment documentation.",
                 tools=[self.write_file_tool],
-                verbose=True
+                verbose=True,
+                **self.writer_llm_options()
             )
             
             tasks = [
@@ -829,7 +1235,7 @@ Format the report in clear, professional markdown with appropriate headers, bull
                     2. Industry impact
                     3. Competitive effect
                     4. Growth influence
-                    5. Future potential""",
+                    5. Future potential{self.research_section(inputs)}""",
                     expected_output="""A comprehensive impact assessment including:
                     - Market influence analysis
                     - Industry impact evaluation
@@ -949,13 +1355,25 @@ Format the report in clear, professional markdown with appropriate headers, bull
                 'detail_level': context.get('detail_level', 'quick'),
                 'report_type': report_type,
                 'time_period': '2024',  # Default value
-                'answers': context.get('answers', {})
+                'answers': context.get('answers', {}),
+                'website_profile': coerce_profile(context.get('website_profile'))
             }
 
             # Validate required fields
             if not analysis_inputs['company_name'] or not analysis_inputs['industry']:
                 raise ValueError("Missing required fields: company_name and industry are required")
 
+            if report_type == 'competitor_analysis':
+                # Named competitors from the request, else the ones the website profile suggests
+                requested = company_info.get('competitors') or []
+                if isinstance(requested, str):
+                    requested = [name.strip() for name in requested.split(',')]
+                self.website_context(analysis_inputs)
+                analysis_inputs['competitors'] = competitor_list(
+                    {'competitors': requested, 'company_name': analysis_inputs['company_name']},
+                    analysis_inputs['website_profile']
+                )
+
             # Log analysis data
             print("\n=== DATA PASSED TO AGENTS ===")
             print("\n1. Basic Information:")
@@ -993,15 +1411,63 @@ Format the report in clear, professional markdown with appropriate headers, bull
             if report_type not in crew_creators:
                 raise ValueError(f"Invalid report type: {report_type}")
 
+            # Run the research plan up front so the analyst needs fewer tool iterations,
+            # unless stored research will stand in for the analyst entirely
+            reuse_research = research_reuse_enabled(context)
+            prefetch = None
+            fanout = None
+            if not (reuse_research and self.research_store.get(analysis_inputs)):
+                prefetch = self.prefetch_research(analysis_inputs)
+                fanout = self.research_competitors(analysis_inputs)
+
             # Create and run crew
             crew = crew_creators[report_type](analysis_inputs)
             if not crew:
                 raise ValueError(f"Failed to create crew for {report_type}")
 
             print(f"\nStarting {report_type} analysis...")
-            result = crew.kickoff()
+            # Detailed reports are written section by section instead of by the writer agent
+            section_mode = section_writing_enabled(context, report_type)
+            if section_mode:
+                crew = self.research_only_crew(crew)
+
+            all_tasks = list(crew.tasks)
+            crew, result = self.resume_crew(crew, analysis_inputs, reuse_research)
+            self.search_calls = 0
+            if result is None:
+                self.attach_progress(crew)
+                result = crew.kickoff()
+            self.store_research(analysis_inputs, all_tasks)
+
+            section_stats = None
+            if section_mode:
+                result, section_stats = self.write_report_sections(analysis_inputs, report_type)
             print("Analysis completed successfully")
 
+            self.run_stats = {
+                'agent_search_calls': self.search_calls,
+                'resumed_tasks': self.resumed_tasks,
+                'reused_research': self.reused_research
+            }
+            if section_stats:
+                self.run_stats['section_writer'] = section_stats
+            if fanout:
+                self.run_stats.update({
+                    'competitors_researched': fanout['researched'],
+                    'competitors_reused': fanout['reused'],
+                    'competitor_fanout_seconds': fanout['elapsed'],
+                    'competitor_errors': fanout['errors']
+                })
+            if prefetch:
+                # Counts only; whether the agents searched less shows in agent_search_calls across runs
+                self.run_stats.update({
+                    'prefetched_searches': prefetch['completed'],
+                    'prefetch_seconds': prefetch['elapsed'],
+                    'prefetch_reused': bool(prefetch.get('reused'))
+                })
+                print(f"Prefetched {prefetch['completed']} searches; "
+                      f"the agents made {self.search_calls} searches of their own")
+
             return result
 
         except Exception as e:
@@ -1010,51 +1476,9 @@ Format the report in clear, professional markdown with appropriate headers, bull
 
     def infer_company_data(self, website_content):
         """Infer company data from website content using AI"""
-        try:
-            prompt = f"""Analyze the following website content and extract key business information.
-            Return the data in JSON format with these fields:
-            - industry: Primary industry of the company
-            - business_model: B2B or B2C or both
-            - target_market: Target market description
-            - competitors: List of likely competitors
-            - focus_areas: List of main business focus areas
-            
-            Website Content:
-            {website_content[:3000]}
-            """
-            
-            response = self.question_generator.predict(prompt)
-            
-            # Clean and parse the response
-            response = response.strip()
-            if response.startswith('```') and response.endswith('```'):
-                response = response[3:-3].strip()
-            if response.startswith('json'):
-                response = response[4:].strip()
-                
-            inferred_data = json.loads(response)
-            
-            # Set default values for any missing fields
-            default_data = {
-                'industry': 'Technology',
-                'business_model': 'B2B',
-                'target_market': 'Global',
-                'competitors': [],
-                'focus_areas': ['Market Size', 'Competition', 'Growth Trends']
-            }
-            
-            return {**default_data, **inferred_data}
-        except Exception as e:
-            print(f"Error inferring company data: {e}")
-            return {
-                'industry': 'Technology',
-                'business_model': 'B2B',
-                'target_market': 'Global',
-                'competitors': [],
-                'focus_areas': ['Market Size', 'Competition', 'Growth Trends']
-            }
+        return self.build_website_profile(website_content).company_data()
 
-    def generate_personalized_questions(self, website_content, report_type, detail_level='quick'):
+    def generate_personalized_questions(self, website_content, report_type, detail_level='quick', website_profile=None):
         """Generate questions based on detail level and website content"""
         if detail_level == 'quick':
             prompt = f"""Generate 2-3 essential questions for a quick {report_type} report.
@@ -1062,7 +1486,7 @@ Format the report in clear, professional markdown with appropriate headers, bull
             Make questions specific to the company's industry and services.
 
             Website Content:
-            {website_content[:1000]}
+            {self.question_context(website_content, website_profile, 1000)}
 
             Return response in this exact JSON format:
             {{
@@ -1077,7 +1501,7 @@ Format the report in clear, professional markdown with appropriate headers, bull
             Questions should cover multiple aspects of the business.
 
             Website Content:
-            {website_content[:2000]}
+            {self.question_context(website_content, website_profile, 2000)}
 
             Return response in this exact JSON format:
             {{
@@ -1172,59 +1596,7 @@ Format the report in clear, professional markdown with appropriate headers, bull
 
     def analyze_website_content(self, website_data, company_name):
         """Analyze website content using GPT to detect industry and other details"""
-        try:
-            if not website_data:
-                return {
-                    "industry": "Technology",
-                    "business_model": "B2B",
-                    "target_market": "General",
-                    "products": ["Unknown"],
-                    "market_focus": "Global"
-                }
-
-            print("Analyzing website content with AI...")
-            
-            prompt = f"""Analyze this website content for {company_name} and provide key business information.
-            
-            Website Content:
-            {website_data[:2000]}
-            
-            Return ONLY a JSON object with this exact format:
-            {{
-                "industry": "main industry category",
-                "business_model": "B2B or B2C",
-                "target_market": "target market description",
-                "products": ["main product/service 1", "product/service 2"],
-                "market_focus": "geographic focus"
-            }}
-            """
-            
-            # Use the question generator (ChatGPT) to analyze
-            response = self.question_generator.invoke(prompt).content
-            
-            # Clean the response
-            response = response.strip()
-            if response.startswith('```json'):
-                response = response[7:]
-            if response.endswith('```'):
-                response = response[:-3]
-            
-            # Parse JSON response
-            analysis = json.loads(response.strip())
-            print("Website analysis completed successfully")
-            
-            return analysis
-            
-        except Exception as e:
-            print(f"Error analyzing website: {str(e)}")
-            # Return default values if analysis fails
-            return {
-                "industry": "Technology",
-                "business_model": "B2B",
-                "target_market": "General",
-                "products": ["Unknown"],
-                "market_focus": "Global"
-            }
+        return self.build_website_profile(website_data, company_name).analysis()
 
     def generate_questions(self, context):
         """Generate questions based on company context and detail level"""
@@ -1233,6 +1605,7 @@ Format the report in clear, professional markdown with appropriate headers, bull
             industry = context['company_info']['industry']
             detail_level = context.get('detail_level', 'quick')
             website_data = context.get('website_data', '')
+            website_profile = context.get('website_profile')
             report_type = context.get('report_type', 'market_analysis')
 
             print(f"Generating {detail_level} questions for {report_type}...")
@@ -1242,7 +1615,7 @@ Format the report in clear, professional markdown with appropriate headers, bull
                 Focus on core business metrics and market position.
                 
                 Context:
-                {website_data[:1000]}
+                {self.question_context(website_data, website_profile, 1000)}
                 
                 Return ONLY a JSON object with this exact format:
                 {{
@@ -1263,7 +1636,7 @@ Format the report in clear, professional markdown with appropriate headers, bull
                 - Business model
                 
                 Context:
-                {website_data[:1500]}
+                {self.question_context(website_data, website_profile, 1500)}
                 
                 Return ONLY a JSON object with this exact format:
                 {{
@@ -1341,8 +1714,8 @@ Format the report in clear, professional markdown with appropriate headers, bull
                     }
                 ]
 
-def create_reports(result, context, report_type):
-    """Create validation and report files"""
+def create_reports(result, context, report_type, files=None):
+    """Create validation and report files, plus any files the agents wrote"""
     try:
         # Extract company info from context
         company_info = context.get('company_info', {})
@@ -1359,30 +1732,58 @@ def create_reports(result, context, report_type):
         report_file = f"{base_name}_report.md"
 
         # Create validation report
-        with open(validation_file, 'w') as f:
-            f.write(f"Validation Report for {company_name}\n")
-            f.write(f"Report Type: {report_type}\n")
-            f.write(f"Generated on: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            
-            f.write("=== Input Parameters ===\n")
-            f.write(f"Company Name: {company_name}\n")
-            f.write(f"Industry: {company_info.get('industry', 'N/A')}\n")
-            f.write(f"Website: {company_info.get('website', 'N/A')}\n")
-            f.write(f"Detail Level: {context.get('detail_level', 'quick')}\n\n")
-            
-            f.write("=== User Responses ===\n")
-            for qid, answer in context.get('answers', {}).items():
-                f.write(f"Q{qid}: {answer}\n")
-            
-            f.write("\n=== Analysis Result ===\n")
-            f.write(str(result))
-
-        # Create main report
-        with open(report_file, 'w') as f:
-            if isinstance(result, str):
-                f.write(result)
-            else:
-                f.write(str(result))
+        validation = [
+            f"Validation Report for {company_name}\n",
+            f"Report Type: {report_type}\n",
+            f"Generated on: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n",
+            "=== Input Parameters ===\n",
+            f"Company Name: {company_name}\n",
+            f"Industry: {company_info.get('industry', 'N/A')}\n",
+            f"Website: {company_info.get('website', 'N/A')}\n",
+            f"Detail Level: {context.get('detail_level', 'quick')}\n\n",
+            "=== User Responses ===\n"
+        ]
+        for qid, answer in context.get('answers', {}).items():
+            validation.append(f"Q{qid}: {answer}\n")
+
+        if files is not None and len(files):
+            validation.append("\n=== Agent Files ===\n")
+            for path in files.list():
+                validation.append(f"{base_name}_files/{path}\n")
+
+        report_text = result if isinstance(result, str) else str(result)
+        ref = get_report_store().put(
+            report_text, chain=(company_name, report_type), report_path=os.path.abspath(report_file)
+        ) if store_enabled() else None
+
+        # The body is stored once; the validation file only references it
+        validation.append("\n=== Analysis Result ===\n")
+        validation.append(validation_reference(ref, report_file) if ref else report_text)
+        atomic_write(validation_file, ''.join(validation))
+
+        # Create main report; stored bodies are already compressed for downloads
+        if ref is None or keep_markdown():
+            atomic_write(report_file, report_text)
+        if ref is None:
+            precompress(report_file)
+
+        # Files the writer agents saved through the Write File tool
+        if files is not None and len(files):
+            files.persist(f"{base_name}_files")
+
+        try:
+            get_report_catalog().add(
+                company_name, report_type, os.path.abspath(report_file), os.path.abspath(validation_file),
+                detail_level=context.get('detail_level', 'quick'), industry=company_info.get('industry'),
+                content_ref=ref, report_size=len(report_text.encode('utf-8'))
+            )
+        except Exception as e:
+            print(f"Could not add {report_file} to the report catalog: {str(e)}")
+
+        try:
+            get_report_search().add(os.path.abspath(report_file), report_text, company_name, report_type)
+        except Exception as e:
+            print(f"Could not add {report_file} to the search index: {str(e)}")
 
         return validation_file, report_file
         
@@ -1390,6 +1791,49 @@ def create_reports(result, context, report_type):
         print(f"Error creating report files: {str(e)}")
         raise
 
+def run_report_job(report_type, context, emitter=None, checkpoint_id=None):
+    """Generate a report and its files; returns plain data for the job API.
+
+    Finished tasks are checkpointed under checkpoint_id (a new ID when none is
+    given). A failed attempt is retried up to REPORT_RETRIES times, skipping
+    the tasks that already finished, and a later run with the same ID resumes
+    the same way.
+    """
+    checkpoint_id = checkpoint_id or uuid.uuid4().hex
+    checkpoints = get_checkpoint_store()
+    checkpoints.start(checkpoint_id, report_type, context)
+    retries = int(os.getenv('REPORT_RETRIES', '1'))
+
+    for attempt in range(retries + 1):
+        generator = ReportGenerator(emitter=emitter, checkpoint_id=checkpoint_id)
+        try:
+            result = generator.generate_report(report_type, context)
+            break
+        except Exception as e:
+            if attempt == retries:
+                raise
+            print(f"Report attempt {attempt + 1} failed ({str(e)}); retrying from checkpoint")
+
+    validation_file, report_file = create_reports(result, context, report_type, files=generator.files)
+    checkpoints.clear(checkpoint_id)
+    return {
+        'report_content': str(result),
+        'report_file': report_file,
+        'validation_file': validation_file,
+        'report_url': f"/api/reports/{os.path.basename(report_file)}/raw",
+        'stats': generator.run_stats
+    }
+
+def run_streaming_report_job(report_type, context, emitter):
+    """Run a report job, ending the event stream with the result or the error"""
+    try:
+        result = run_report_job(report_type, context, emitter=emitter)
+        emitter.emit('report', **result)
+    except Exception as e:
+        emitter.emit('error', message=str(e))
+    finally:
+        emitter.close()
+
 def get_report_generator():
     return ReportGenerator()
 
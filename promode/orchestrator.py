@@ -0,0 +1,72 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from content_digest import website_digest
+import asyncio
+import os
+import time
+
+
+async def run_concurrently(stages: Dict[str, Callable[[], Awaitable[Any]]],
+                           max_concurrency: Optional[int] = None) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """Run independent async stages at once, at most max_concurrency at a time.
+
+    Returns each stage's result and how long it took in seconds.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or int(os.getenv('LLM_CONCURRENCY', '4')))
+    timings: Dict[str, float] = {}
+
+    async def run(name, stage):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                return await stage()
+            finally:
+                timings[name] = round(time.perf_counter() - start, 3)
+
+    results = await asyncio.gather(*(run(name, stage) for name, stage in stages.items()))
+    return dict(zip(stages, results)), timings
+
+
+async def prepare_analysis(generator, company_name: str, industry: str, report_type: str, detail_level: str,
+                           website_url: Optional[str] = None, website_data: Optional[str] = None,
+                           max_concurrency: Optional[int] = None, crawl: bool = False) -> Dict[str, Any]:
+    """Scrape the website, then build its profile and the questions concurrently.
+
+    The interactive preparation phase takes as long as its slowest LLM call
+    rather than the sum of them; 'timings' holds the per-stage breakdown.
+    """
+    # Imported here because main imports this module for run_analysis
+    from main import aget_questions_by_report_type
+
+    start = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    if website_url and not website_data:
+        scrape_start = time.perf_counter()
+        if crawl:
+            website_data = await generator.acrawl_company_website(website_url)
+        else:
+            website_data = await asyncio.to_thread(generator.scrape_company_website, website_url)
+        timings['scrape'] = round(time.perf_counter() - scrape_start, 3)
+
+    if website_data:
+        # Both stages below prompt with the digest; build it once so they read it from the cache
+        digest_start = time.perf_counter()
+        await asyncio.to_thread(website_digest, website_data, company_name)
+        timings['digest'] = round(time.perf_counter() - digest_start, 3)
+
+    results, stage_timings = await run_concurrently({
+        'website_profile': lambda: generator.abuild_website_profile(website_data, company_name, industry),
+        'questions': lambda: aget_questions_by_report_type(
+            report_type, detail_level, company_name, industry, website_data
+        )
+    }, max_concurrency)
+
+    timings.update(stage_timings)
+    timings['total'] = round(time.perf_counter() - start, 3)
+
+    return {
+        'website_data': website_data,
+        'website_profile': results['website_profile'],
+        'questions': results['questions'],
+        'timings': timings
+    }
@@ -0,0 +1,55 @@
+from langchain.callbacks.base import BaseCallbackHandler
+from typing import Any, AsyncIterator, Dict, Optional
+import asyncio
+import json
+import time
+
+_CLOSED = object()
+
+
+class ProgressEmitter:
+    """Thread-safe bridge from crew callbacks to an asyncio consumer.
+
+    Crews run in worker threads; emit() may be called from any of them and
+    events are delivered in order to the event loop that created the emitter.
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop or asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+
+    def emit(self, event: str, **data: Any) -> None:
+        if self.closed:
+            return
+        payload = {'event': event, 'timestamp': time.time(), **data}
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, payload)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, _CLOSED)
+
+    async def events(self) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            item = await self.queue.get()
+            if item is _CLOSED:
+                return
+            yield item
+
+
+def format_sse(payload: Dict[str, Any]) -> bytes:
+    """Encode an event as a Server-Sent Events frame"""
+    return f"event: {payload['event']}\ndata: {json.dumps(payload, default=str)}\n\n".encode('utf-8')
+
+
+class TokenStreamHandler(BaseCallbackHandler):
+    """LangChain callback that forwards each generated token to an emitter"""
+
+    def __init__(self, emitter: ProgressEmitter, agent: str):
+        self.emitter = emitter
+        self.agent = agent
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token:
+            self.emitter.emit('token', agent=self.agent, token=token)
@@ -0,0 +1,327 @@
+from disk_cache import CACHE_DIR
+from report_store import get_report_store, parse_reference, validation_reference
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Report types whose files may already be on disk; used to split legacy filenames
+KNOWN_REPORT_TYPES = (
+    'competitor_tracking', 'competitor_analysis', 'market_analysis', 'market_assessment',
+    'impact_assessment', 'gap_analysis', 'icp_report'
+)
+
+SORT_COLUMNS = {
+    'created_at': 'created_at',
+    'timestamp': 'created_at',
+    'company_name': 'company_key',
+    'report_type': 'report_type',
+    'size': 'report_size'
+}
+
+_FILENAME = re.compile(r'^(?P<stem>.+)_(?P<date>\d{8})_(?P<time>\d{6})_report\.md$')
+
+_shared_catalog = None
+_shared_catalog_lock = threading.Lock()
+
+
+def parse_report_filename(filename: str) -> Optional[Dict[str, Any]]:
+    """Company, report type and timestamp from '<company>_<report_type>_<YYYYmmdd>_<HHMMSS>_report.md'.
+
+    The report type is matched against KNOWN_REPORT_TYPES, so company names
+    that contain underscores survive.
+    """
+    match = _FILENAME.match(filename)
+    if not match:
+        return None
+    stem = match.group('stem')
+    company, report_type = stem, 'unknown'
+    for known in KNOWN_REPORT_TYPES:
+        if stem.endswith(f"_{known}"):
+            company, report_type = stem[:-len(known) - 1], known
+            break
+    try:
+        created_at = time.mktime(time.strptime(match.group('date') + match.group('time'), '%Y%m%d%H%M%S'))
+    except ValueError:
+        return None
+    return {
+        'company_name': company.replace('_', ' '),
+        'report_type': report_type,
+        'created_at': created_at,
+        'timestamp': f"{match.group('date')}_{match.group('time')}"
+    }
+
+
+class ReportCatalog:
+    """SQLite index of generated reports.
+
+    create_reports adds a row for every report it writes, and /api/reports
+    answers from indexed queries instead of scanning directories, so listing
+    cost doesn't grow with the number of reports on disk.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            Path(CACHE_DIR).mkdir(parents=True, exist_ok=True)
+            path = os.getenv('REPORT_CATALOG_PATH') or os.path.join(CACHE_DIR, 'report_catalog.sqlite3')
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS reports (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                company_name TEXT NOT NULL,
+                company_key TEXT NOT NULL,
+                report_type TEXT NOT NULL,
+                detail_level TEXT,
+                industry TEXT,
+                created_at REAL NOT NULL,
+                report_path TEXT NOT NULL UNIQUE,
+                filename TEXT,
+                content_ref TEXT,
+                validation_path TEXT,
+                report_size INTEGER,
+                validation_size INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_reports_created ON reports (created_at);
+            CREATE INDEX IF NOT EXISTS idx_reports_company ON reports (company_key, created_at);
+            CREATE INDEX IF NOT EXISTS idx_reports_type ON reports (report_type, created_at);
+            CREATE INDEX IF NOT EXISTS idx_reports_detail ON reports (detail_level, created_at);
+            CREATE INDEX IF NOT EXISTS idx_reports_filename ON reports (filename, created_at);
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def _size(path: Optional[str]) -> Optional[int]:
+        try:
+            return os.path.getsize(path) if path else None
+        except OSError:
+            return None
+
+    def add(self, company_name: str, report_type: str, report_path: str, validation_path: Optional[str] = None,
+            detail_level: Optional[str] = None, industry: Optional[str] = None,
+            created_at: Optional[float] = None, content_ref: Optional[str] = None,
+            report_size: Optional[int] = None) -> int:
+        """Record a written report; re-adding the same report_path updates its row.
+
+        content_ref points at the body in the report store; report_size is
+        then the uncompressed size, since the markdown file may not exist.
+        """
+        with self._lock:
+            cursor = self._conn.execute("""
+                INSERT INTO reports (company_name, company_key, report_type, detail_level, industry,
+                                     created_at, report_path, filename, content_ref, validation_path,
+                                     report_size, validation_size)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(report_path) DO UPDATE SET
+                    company_name = excluded.company_name, company_key = excluded.company_key,
+                    report_type = excluded.report_type, detail_level = excluded.detail_level,
+                    industry = excluded.industry, created_at = excluded.created_at,
+                    filename = excluded.filename, content_ref = excluded.content_ref, validation_path = excluded.validation_path, report_size = excluded.report_size,
+                    validation_size = excluded.validation_size
+            """, (
+                company_name, company_name.strip().lower(), report_type, detail_level, industry,
+                created_at or time.time(), str(report_path), os.path.basename(str(report_path)), content_ref,
+                validation_path and str(validation_path),
+                report_size if report_size is not None else self._size(report_path), self._size(validation_path)
+            ))
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def query(self, company: Optional[str] = None, report_type: Optional[str] = None,
+              detail_level: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+              sort: str = 'created_at', order: str = 'desc', limit: Optional[int] = 20,
+              offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of reports matching the filters (all of them when limit is None), and how many match"""
+        where, params = [], []
+        if company:
+            where.append('company_key = ?')
+            params.append(company.strip().lower())
+        if report_type:
+            where.append('report_type = ?')
+            params.append(report_type)
+        if detail_level:
+            where.append('detail_level = ?')
+            params.append(detail_level)
+        if since is not None:
+            where.append('created_at >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('created_at <= ?')
+            params.append(until)
+        clause = f"WHERE {' AND '.join(where)}" if where else ''
+        column = SORT_COLUMNS.get(sort, 'created_at')
+        direction = 'ASC' if str(order).lower() == 'asc' else 'DESC'
+
+        with self._lock:
+            total = self._conn.execute(f'SELECT COUNT(*) FROM reports {clause}', params).fetchone()[0]
+            rows = self._conn.execute(
+                f'SELECT * FROM reports {clause} ORDER BY {column} {direction}, id {direction} LIMIT ? OFFSET ?',
+                params + [-1 if limit is None else limit, offset]
+            ).fetchall()
+        return [self._to_dict(row) for row in rows], total
+
+    def get(self, report_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM reports WHERE id = ?', (report_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def find(self, filename: str) -> Optional[Dict[str, Any]]:
+        """The newest catalogued report with this filename, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT * FROM reports WHERE filename = ? ORDER BY created_at DESC LIMIT 1', (filename,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def path_for(self, filename: str) -> Optional[str]:
+        """Where a catalogued report, or its validation file, is on disk"""
+        if filename.endswith('_validation.txt'):
+            report = self.find(filename[:-len('_validation.txt')] + '_report.md')
+            return report['validation_path'] if report else None
+        report = self.find(filename)
+        return report['report_path'] if report else None
+
+    def set_content_ref(self, report_path: str, content_ref: str, report_size: Optional[int] = None):
+        with self._lock:
+            self._conn.execute(
+                'UPDATE reports SET content_ref = ?, report_size = COALESCE(?, report_size) WHERE report_path = ?',
+                (content_ref, report_size, str(report_path))
+            )
+            self._conn.commit()
+
+    def read_report(self, filename: str) -> Optional[str]:
+        """Text of a catalogued report or validation file, from disk or else from the report store"""
+        report = self.find(filename[:-len('_validation.txt')] + '_report.md'
+                           if filename.endswith('_validation.txt') else filename)
+        if not report:
+            return None
+        path = report['validation_path'] if filename.endswith('_validation.txt') else report['report_path']
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        elif report.get('content_ref') and not filename.endswith('_validation.txt'):
+            return get_report_store().read(report['content_ref'])
+        else:
+            return None
+        ref = report.get('content_ref')
+        if filename.endswith('_validation.txt') and ref and parse_reference(text) == ref:
+            # The body was replaced by a reference; put it back for readers
+            text = text.replace(validation_reference(ref, report['report_path']), get_report_store().read(ref))
+        return text
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM reports').fetchone()[0]
+
+    def backfill(self, directories: Iterable[str]) -> int:
+        """Add reports already on disk that the catalog doesn't know about; returns how many"""
+        added = 0
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if name.endswith('_validation.txt'):
+                        # Stored reports whose markdown file wasn't kept
+                        name = name[:-len('_validation.txt')] + '_report.md'
+                        if os.path.exists(os.path.join(directory, name)):
+                            continue
+                    meta = parse_report_filename(name)
+                    if not meta or not entry.is_file():
+                        continue
+                    report_path = os.path.abspath(os.path.join(directory, name))
+                    with self._lock:
+                        known = self._conn.execute(
+                            'SELECT 1 FROM reports WHERE report_path = ?', (report_path,)
+                        ).fetchone()
+                    if known:
+                        continue
+                    validation_path = report_path[:-len('_report.md')] + '_validation.txt'
+                    ref = None
+                    if os.path.exists(validation_path):
+                        with open(validation_path, 'r', encoding='utf-8', errors='replace') as f:
+                            ref = parse_reference(f.read())
+                    else:
+                        validation_path = None
+                    if ref is None and not os.path.exists(report_path):
+                        continue
+                    self.add(meta['company_name'], meta['report_type'], report_path, validation_path,
+                             created_at=meta['created_at'], content_ref=ref)
+                    added += 1
+        if added:
+            logger.info(f"Report catalog backfilled {added} reports")
+        return added
+
+    def startup_backfill(self, directories: Iterable[str]) -> int:
+        """REPORT_CATALOG_BACKFILL: 'empty' (default, only when the catalog has no rows), 'always' or 'never'"""
+        mode = os.getenv('REPORT_CATALOG_BACKFILL', 'empty').lower()
+        if mode == 'never' or (mode == 'empty' and self.count()):
+            return 0
+        return self.backfill(directories)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'path': self.path, 'reports': self.count()}
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        report = dict(row)
+        report.pop('company_key', None)
+        report['timestamp'] = time.strftime('%Y%m%d_%H%M%S', time.localtime(report['created_at']))
+        return report
+
+
+def list_reports(catalog: ReportCatalog, args) -> Dict[str, Any]:
+    """Answer a /api/reports request from its query string (page or offset, limit, filters, sort, order).
+
+    Without limit or page every matching report is returned, as /api/reports
+    always did; page alone uses pages of 50.
+    """
+    limit = None
+    if args.get('limit') is not None or args.get('page') is not None:
+        limit = max(1, min(int(args.get('limit', 50)), int(os.getenv('REPORT_CATALOG_MAX_PAGE', '500'))))
+    if args.get('offset') is not None:
+        offset = max(0, int(args['offset']))
+    elif limit is not None:
+        offset = (max(1, int(args.get('page', 1))) - 1) * limit
+    else:
+        offset = 0
+    since, until = args.get('since'), args.get('until')
+    reports, total = catalog.query(
+        company=args.get('company') or args.get('company_name'),
+        report_type=args.get('report_type'),
+        detail_level=args.get('detail_level'),
+        since=float(since) if since else None,
+        until=float(until) if until else None,
+        sort=args.get('sort', 'created_at'),
+        order=args.get('order', 'desc'),
+        limit=limit,
+        offset=offset
+    )
+    return {
+        'reports': reports,
+        'total': total,
+        'limit': limit,
+        'offset': offset,
+        'page': offset // limit + 1 if limit else 1,
+        'has_more': offset + len(reports) < total
+    }
+
+
+def get_report_catalog() -> ReportCatalog:
+    """Report catalog shared by the whole process"""
+    global _shared_catalog
+    with _shared_catalog_lock:
+        if _shared_catalog is None:
+            _shared_catalog = ReportCatalog()
+        return _shared_catalog
@@ -0,0 +1,287 @@
+from dataclasses import dataclass, field
+from job_files import atomic_write
+from report_store import open_object
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import gzip
+import hashlib
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:  # optional; without it only gzip variants are written
+    brotli = None
+
+CHUNK_SIZE = int(os.getenv('REPORT_CHUNK_SIZE', str(64 * 1024)))
+
+# Pre-compressed variants written next to each report, in order of preference
+VARIANTS = (('br', '.br'), ('gzip', '.gz'))
+
+CONTENT_TYPES = {
+    '.md': 'text/markdown; charset=utf-8',
+    '.txt': 'text/plain; charset=utf-8'
+}
+
+_etags: Dict[Tuple[str, int, int], str] = {}
+_etags_lock = threading.Lock()
+_ETAG_CACHE_SIZE = 4096
+
+
+def precompress(path: str) -> List[str]:
+    """Write gzip (and, when brotli is installed, br) copies of a report; returns their paths"""
+    if os.getenv('REPORT_PRECOMPRESS', 'true').lower() not in ('1', 'true', 'yes'):
+        return []
+    with open(path, 'rb') as f:
+        data = f.read()
+    written = []
+    for encoding, suffix in VARIANTS:
+        if encoding == 'br':
+            if brotli is None:
+                continue
+            compressed = brotli.compress(data, quality=11)
+        else:
+            # mtime=0 keeps the bytes, and so the ETag, stable for the same report
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        atomic_write(path + suffix, compressed)
+        written.append(path + suffix)
+    return written
+
+
+def content_etag(path: str, st: Optional[os.stat_result] = None) -> str:
+    """SHA-256 of the file's bytes, remembered until the file's mtime or size change"""
+    st = st or os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _etags_lock:
+        if key in _etags:
+            return _etags[key]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    etag = digest.hexdigest()[:32]
+    with _etags_lock:
+        if len(_etags) >= _ETAG_CACHE_SIZE:
+            _etags.clear()
+        _etags[key] = etag
+    return etag
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    return accepted
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return etag in (tag.strip().replace('W/', '', 1) for tag in header.split(','))
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) inclusive for a single 'bytes=' range; None when it can't be satisfied
+
+    Raises ValueError for a header that isn't a single byte range, which
+    callers answer with the whole file.
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        raise ValueError(header)
+    first, _, last = spec.strip().partition('-')
+    if not first:
+        length = int(last)
+        if length <= 0:
+            return None
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size:
+        return None
+    if start > end:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+
+@dataclass
+class Delivery:
+    """What to send for a report request: status, headers and which bytes of which file"""
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    path: Optional[str] = None
+    start: int = 0
+    length: int = 0
+    codec: Optional[str] = None
+    # In-memory body, for reports rebuilt from the version store
+    data: Optional[bytes] = None
+
+    @property
+    def has_body(self) -> bool:
+        return (self.path is not None or self.data is not None) and self.length > 0
+
+
+def _plan(etag: str, size: int, identity: Tuple[Optional[str], Optional[str]], variants: List[Tuple[str, str, int]],
+          request_headers, filename: str) -> Delivery:
+    """Shared by plan_delivery and plan_stored_delivery.
+
+    identity is the (path, codec) holding the uncompressed bytes, codec None
+    for a plain file and path None for a body the caller holds in memory; variants are (encoding, path, size) already-compressed
+    copies in order of preference, path None again when held in memory.
+    """
+    headers = {
+        'Content-Type': CONTENT_TYPES.get(os.path.splitext(filename)[1], 'application/octet-stream'),
+        'Content-Disposition': f'inline; filename="{filename}"',
+        'Accept-Ranges': 'bytes',
+        'Vary': 'Accept-Encoding',
+        'Cache-Control': 'no-cache'
+    }
+
+    range_header = request_headers.get('Range')
+    if range_header and request_headers.get('If-Range') and request_headers.get('If-Range').strip() != f'"{etag}"':
+        range_header = None
+
+    encoding, source, source_size = None, identity[0], size
+    if not range_header:
+        accepted = _accepted_encodings(request_headers.get('Accept-Encoding', ''))
+        for name, variant_path, variant_size in variants:
+            if accepted.get(name, accepted.get('*', 0)) > 0:
+                encoding, source, source_size = name, variant_path, variant_size
+                break
+
+    tag = f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+    headers['ETag'] = tag
+    if _etag_matches(request_headers.get('If-None-Match', ''), tag):
+        return Delivery(304, headers)
+
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        headers['Content-Length'] = str(source_size)
+        return Delivery(200, headers, source, 0, source_size)
+
+    if range_header:
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            byte_range = (0, size - 1)
+            range_header = None
+        if byte_range is None:
+            headers['Content-Range'] = f'bytes */{size}'
+            headers['Content-Length'] = '0'
+            return Delivery(416, headers)
+        if range_header:
+            start, end = byte_range
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+            headers['Content-Length'] = str(end - start + 1)
+            return Delivery(206, headers, identity[0], start, end - start + 1, identity[1])
+
+    headers['Content-Length'] = str(size)
+    return Delivery(200, headers, identity[0], 0, size, identity[1])
+
+
+def plan_delivery(path: str, request_headers, filename: Optional[str] = None) -> Delivery:
+    """Answer a GET for a report file from its request headers.
+
+    The ETag is the content hash (suffixed per encoding), so If-None-Match
+    gets a 304 however the file was copied. Range requests are served from
+    the uncompressed file; whole-file requests get the best pre-compressed
+    variant the client accepts.
+    """
+    st = os.stat(path)
+    variants = []
+    for name, suffix in VARIANTS:
+        try:
+            variant = os.stat(path + suffix)
+        except OSError:
+            continue
+        # A variant older than the report is stale
+        if variant.st_mtime_ns >= st.st_mtime_ns:
+            variants.append((name, path + suffix, variant.st_size))
+    return _plan(content_etag(path, st), st.st_size, (path, None), variants, request_headers,
+                 filename or os.path.basename(path))
+
+
+def plan_stored_delivery(store, ref: str, size: Optional[int], request_headers, filename: str,
+                         markdown_path: Optional[str] = None) -> Delivery:
+    """Like plan_delivery, for a body in the report store.
+
+    The stored object is itself the compressed variant, sent as-is to
+    clients that accept its codec; others get it decompressed on the fly.
+    An older report version has no object: it is streamed from its kept
+    markdown_path when that still exists, else rebuilt from the version
+    store and sent from memory.
+    """
+    located = store.locate(ref)
+    if not located:
+        if markdown_path and os.path.exists(markdown_path):
+            return plan_delivery(markdown_path, request_headers, filename)
+        with store.open(ref) as f:
+            data = f.read()
+        # Gzip in memory rather than send the rebuilt body uncompressed
+        variants = []
+        accepts_gzip = _accepted_encodings(request_headers.get('Accept-Encoding', '')).get('gzip', 0) > 0
+        if accepts_gzip and not request_headers.get('Range'):
+            compressed = gzip.compress(data, compresslevel=6, mtime=0)
+            variants.append(('gzip', None, len(compressed)))
+        delivery = _plan(ref.split(':', 1)[1][:32], len(data), (None, None), variants, request_headers, filename)
+        if delivery.status in (200, 206):
+            delivery.data = compressed if delivery.headers.get('Content-Encoding') == 'gzip' else data
+        return delivery
+    path, codec = str(located[0]), located[1]
+    if size is None:
+        with open_object(path, codec) as f:
+            size = sum(len(chunk) for chunk in iter(lambda: f.read(CHUNK_SIZE), b''))
+    # Same digest content_etag gives the plain file, so ETags survive moving a report onto the store
+    return _plan(ref.split(':', 1)[1][:32], size, (path, codec), [(codec, path, os.path.getsize(path))],
+                 request_headers, filename)
+
+
+def delivery_body(delivery: Delivery):
+    """Response body for a planned delivery: streamed from its file, sliced from memory, or empty"""
+    if not delivery.has_body:
+        return b''
+    if delivery.data is not None:
+        return delivery.data[delivery.start:delivery.start + delivery.length]
+    return stream_file(delivery.path, delivery.start, delivery.length, codec=delivery.codec)
+
+
+async def stream_file(path: str, start: int = 0, length: Optional[int] = None,
+                      chunk_size: int = CHUNK_SIZE, codec: Optional[str] = None) -> AsyncIterator[bytes]:
+    """Yield a byte range of a file in chunks, reading off the event loop; codec decompresses a stored object"""
+    loop = asyncio.get_running_loop()
+    if codec:
+        f = await loop.run_in_executor(None, open_object, path, codec)
+    else:
+        f = await loop.run_in_executor(None, open, path, 'rb')
+    try:
+        if codec:
+            # Decompressed streams only seek forwards by reading
+            skip = start
+            while skip > 0:
+                skipped = await loop.run_in_executor(None, f.read, min(chunk_size, skip))
+                if not skipped:
+                    break
+                skip -= len(skipped)
+        else:
+            await loop.run_in_executor(None, f.seek, start)
+        remaining = length if length is not None else os.fstat(f.fileno()).st_size - start
+        while remaining > 0:
+            chunk = await loop.run_in_executor(None, f.read, min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
@@ -0,0 +1,202 @@
+from job_files import atomic_write
+from report_versions import get_report_versions, versions_enabled
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional, Tuple, Union
+import gzip
+import hashlib
+import io
+import os
+import re
+import threading
+
+try:
+    import zstandard
+except ImportError:  # optional; without it bodies are gzip-compressed
+    zstandard = None
+
+# File suffix and HTTP Content-Encoding of each codec
+CODECS = {'zstd': '.zst', 'gzip': '.gz'}
+
+# Line in a validation file that points at the stored report body
+REF_LINE = 'Report Body: '
+
+# Where the body starts in validation files written before the store, per app
+_BODY_MARKERS = ('=== Analysis Result ===\n', '\n\n')
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def store_enabled() -> bool:
+    """REPORT_STORE (default true) stores bodies once, compressed; false writes plain files as before"""
+    return os.getenv('REPORT_STORE', 'true').lower() in ('1', 'true', 'yes')
+
+
+def keep_markdown() -> bool:
+    """REPORT_KEEP_MARKDOWN (default true) also writes the plain *_report.md next to the stored body"""
+    return os.getenv('REPORT_KEEP_MARKDOWN', 'true').lower() in ('1', 'true', 'yes')
+
+
+def content_ref(data: bytes) -> str:
+    return 'sha256:' + hashlib.sha256(data).hexdigest()
+
+
+def validation_reference(ref: str, report_file: str) -> str:
+    """What a validation file holds in place of the report body"""
+    return f"{REF_LINE}{ref}\nReport File: {os.path.basename(str(report_file))}\n"
+
+
+def parse_reference(validation_text: str) -> Optional[str]:
+    match = re.search(rf'^{re.escape(REF_LINE)}(sha256:[0-9a-f]{{64}})$', validation_text, re.MULTILINE)
+    return match.group(1) if match else None
+
+
+class ReportStore:
+    """Report bodies stored once under their SHA-256, compressed.
+
+    Objects live at <root>/<2 hex chars>/<hash><.zst|.gz>, so identical
+    bodies (a validation file and its report, or a re-run that produced the
+    same text) cost one compressed copy. Reads decompress as they go.
+    Older versions of a versioned body (see put) have no object of their
+    own and are rebuilt from the version store instead.
+    """
+
+    def __init__(self, root: Optional[str] = None, codec: Optional[str] = None):
+        self.root = Path(root or os.getenv('REPORT_STORE_DIR', 'report_objects'))
+        codec = codec or os.getenv('REPORT_STORE_CODEC') or ('zstd' if zstandard else 'gzip')
+        if codec == 'zstd' and zstandard is None:
+            codec = 'gzip'
+        self.codec = codec
+        self.level = int(os.getenv('REPORT_STORE_LEVEL', '19' if codec == 'zstd' else '9'))
+
+    def _object_path(self, ref: str, codec: str) -> Path:
+        digest = ref.split(':', 1)[1]
+        return self.root / digest[:2] / f"{digest}{CODECS[codec]}"
+
+    def locate(self, ref: str) -> Optional[Tuple[Path, str]]:
+        """The object file holding ref and its codec, or None"""
+        for codec in (self.codec,) + tuple(c for c in CODECS if c != self.codec):
+            path = self._object_path(ref, codec)
+            if path.exists():
+                return path, codec
+        return None
+
+    def put(self, body: Union[str, bytes], chain: Optional[Tuple[str, str]] = None,
+            report_path: Optional[str] = None) -> str:
+        """Store a body unless it is already there; returns its reference.
+
+        With chain, a (company, report type), and REPORT_VERSIONS on, the
+        body also becomes the chain's next version in the version store,
+        unless it is the chain's newest version already. That is decided by
+        the chain alone, not by whether the object exists.
+        Only the newest version keeps its object, so it downloads as stored;
+        the object of the version it replaces is dropped, leaving that one
+        as a delta in the chain.
+        """
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        ref = content_ref(data)
+        added = None
+        if chain and versions_enabled():
+            versions = get_report_versions()
+            added = versions.add(chain[0], chain[1], data.decode('utf-8'), ref, report_path)
+        if not self.locate(ref):
+            if self.codec == 'zstd':
+                compressed = zstandard.ZstdCompressor(level=self.level).compress(data)
+            else:
+                # mtime=0 so the object is the same bytes whenever the body is
+                compressed = gzip.compress(data, compresslevel=self.level, mtime=0)
+            atomic_write(self._object_path(ref, self.codec), compressed)
+        previous = added and added['previous_ref']
+        if previous and previous != ref and not versions.is_latest(previous):
+            self._discard(previous)
+        return ref
+
+    def _discard(self, ref: str):
+        """Delete ref's object; only for bodies the version store can rebuild"""
+        for codec in CODECS:
+            try:
+                os.remove(self._object_path(ref, codec))
+            except FileNotFoundError:
+                pass
+
+    def open(self, ref: str) -> BinaryIO:
+        """Readable binary stream of the decompressed body"""
+        located = self.locate(ref)
+        if located:
+            return open_object(*located)
+        text = get_report_versions().text_for_ref(ref)
+        if text is None:
+            raise FileNotFoundError(ref)
+        return io.BytesIO(text.encode('utf-8'))
+
+    def read(self, ref: str) -> str:
+        with self.open(ref) as f:
+            return f.read().decode('utf-8')
+
+    def compact(self, validation_path: str, report_path: str) -> Optional[str]:
+        """Move an existing validation/report pair onto the store; returns the body's ref, or None if they don't share one"""
+        with open(validation_path, 'r', encoding='utf-8') as f:
+            validation = f.read()
+        if parse_reference(validation):
+            return None
+        with open(report_path, 'r', encoding='utf-8') as f:
+            report = f.read()
+        for marker in _BODY_MARKERS:
+            head, found, body = validation.partition(marker)
+            if found and body and report.endswith(body):
+                break
+        else:
+            return None
+        ref = self.put(report)
+        atomic_write(validation_path, head + found + validation_reference(ref, report_path))
+        if not keep_markdown():
+            os.remove(report_path)
+        return ref
+
+    def stats(self) -> Dict[str, Any]:
+        objects, size = 0, 0
+        if self.root.exists():
+            for path in self.root.glob('*/*'):
+                objects += 1
+                size += path.stat().st_size
+        return {'root': str(self.root), 'codec': self.codec, 'objects': objects, 'bytes': size}
+
+
+def open_object(path: Union[str, Path], codec: str) -> BinaryIO:
+    """Decompressing reader over a stored object"""
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('zstandard is required to read .zst report objects')
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+    return gzip.open(path, 'rb')
+
+
+def get_report_store() -> ReportStore:
+    """Report store shared by the whole process"""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = ReportStore()
+        return _shared_store
+
+
+if __name__ == '__main__':
+    # python report_store.py <dir>...: move existing report pairs onto the store
+    import sys
+    from report_catalog import get_report_catalog
+    store, catalog = get_report_store(), get_report_catalog()
+    directories = sys.argv[1:] or ['.']
+    # Catalogue the pairs first, while every *_report.md is still on disk
+    catalog.backfill(directories)
+    moved = 0
+    for directory in directories:
+        for report_path in sorted(Path(directory).resolve().glob('*_report.md')):
+            validation_path = str(report_path)[:-len('_report.md')] + '_validation.txt'
+            if not os.path.exists(validation_path):
+                continue
+            size = report_path.stat().st_size
+            ref = store.compact(validation_path, str(report_path))
+            if ref:
+                catalog.set_content_ref(str(report_path), ref, size)
+                moved += 1
+    print(f"Compacted {moved} report pairs into {store.root}")
@@ -0,0 +1,237 @@
+from collections import OrderedDict
+from difflib import SequenceMatcher, unified_diff
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+_shared_versions = None
+_shared_versions_lock = threading.Lock()
+
+
+def versions_enabled() -> bool:
+    """REPORT_VERSIONS (default true) keeps repeated reports as delta chains instead of full copies"""
+    return os.getenv('REPORT_VERSIONS', 'true').lower() in ('1', 'true', 'yes')
+
+
+def make_delta(old: str, new: str) -> List[list]:
+    """Line ops rebuilding new from old: ['c', i, j] copies old lines i..j, ['i', lines] inserts lines"""
+    old_lines, new_lines = old.splitlines(keepends=True), new.splitlines(keepends=True)
+    ops = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_opcodes():
+        if tag == 'equal':
+            ops.append(['c', i1, i2])
+        elif j2 > j1:
+            ops.append(['i', new_lines[j1:j2]])
+    return ops
+
+
+def apply_delta(old: str, ops: List[list]) -> str:
+    old_lines = old.splitlines(keepends=True)
+    out = []
+    for op in ops:
+        if op[0] == 'c':
+            out.extend(old_lines[op[1]:op[2]])
+        else:
+            out.extend(op[1])
+    return ''.join(out)
+
+
+class ReportVersions:
+    """Successive versions of a report for one (company, report type), as delta chains.
+
+    Each version is stored as a zlib-compressed line delta against the one
+    before it, or as a full snapshot every SNAPSHOT_EVERY versions (and
+    whenever the delta wouldn't be smaller). Rebuilding a version applies at
+    most SNAPSHOT_EVERY - 1 deltas to the nearest snapshot.
+    """
+
+    def __init__(self, path: Optional[str] = None, snapshot_every: Optional[int] = None):
+        if path is None:
+            root = Path(os.getenv('REPORT_STORE_DIR', 'report_objects'))
+            root.mkdir(parents=True, exist_ok=True)
+            path = os.getenv('REPORT_VERSIONS_PATH') or str(root / 'versions.sqlite3')
+        self.path = path
+        self.snapshot_every = snapshot_every or int(os.getenv('REPORT_VERSION_SNAPSHOT_EVERY', '8'))
+        self._lock = threading.Lock()
+        self._texts: 'OrderedDict[Tuple[str, str, int], str]' = OrderedDict()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS report_versions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                company_key TEXT NOT NULL,
+                report_type TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                content_ref TEXT,
+                report_path TEXT,
+                kind TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                UNIQUE (company_key, report_type, version)
+            );
+            CREATE INDEX IF NOT EXISTS idx_versions_ref ON report_versions (content_ref);
+        """)
+
+    @staticmethod
+    def _chain(company: str, report_type: str) -> Tuple[str, str]:
+        return (company or '').strip().lower(), report_type
+
+    def _remember(self, key: Tuple[str, str, int], text: str):
+        self._texts[key] = text
+        self._texts.move_to_end(key)
+        while len(self._texts) > 32:
+            self._texts.popitem(last=False)
+
+    def _rebuild(self, company_key: str, report_type: str, version: int) -> Optional[str]:
+        """Text of a version: nearest snapshot at or below it, then the deltas after it. Call with the lock held."""
+        key = (company_key, report_type, version)
+        if key in self._texts:
+            self._texts.move_to_end(key)
+            return self._texts[key]
+        rows = self._conn.execute("""
+            SELECT version, kind, payload FROM report_versions
+            WHERE company_key = ? AND report_type = ? AND version <= ? AND version >= (
+                SELECT MAX(version) FROM report_versions
+                WHERE company_key = ? AND report_type = ? AND version <= ? AND kind = 'snapshot'
+            )
+            ORDER BY version
+        """, (company_key, report_type, version, company_key, report_type, version)).fetchall()
+        if not rows or rows[-1]['version'] != version:
+            return None
+        text = ''
+        for row in rows:
+            data = zlib.decompress(row['payload']).decode('utf-8')
+            text = data if row['kind'] == 'snapshot' else apply_delta(text, json.loads(data))
+        self._remember(key, text)
+        return text
+
+    def add(self, company: str, report_type: str, text: str, content_ref: Optional[str] = None,
+            report_path: Optional[str] = None) -> Dict[str, Any]:
+        """Append text as the chain's next version; returns its metadata.
+
+        A content_ref equal to the newest version's adds nothing: that
+        version's metadata comes back with added False.
+        """
+        company_key, report_type = self._chain(company, report_type)
+        snapshot = zlib.compress(text.encode('utf-8'), 9)
+        with self._lock:
+            # IMMEDIATE so another process can't take the same version number
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    'SELECT version, content_ref, kind, size, stored_size FROM report_versions '
+                    'WHERE company_key = ? AND report_type = ? ORDER BY version DESC LIMIT 1',
+                    (company_key, report_type)
+                ).fetchone()
+                if row and content_ref and row['content_ref'] == content_ref:
+                    self._conn.execute('COMMIT')
+                    return {'company': company_key, 'report_type': report_type, 'version': row['version'],
+                            'kind': row['kind'], 'size': row['size'], 'stored_size': row['stored_size'],
+                            'previous_ref': None, 'added': False}
+                latest, previous_ref = (row['version'], row['content_ref']) if row else (0, None)
+                version = latest + 1
+                kind, payload = 'snapshot', snapshot
+                if latest and (version - 1) % self.snapshot_every:
+                    previous = self._rebuild(company_key, report_type, latest)
+                    delta = zlib.compress(json.dumps(make_delta(previous, text)).encode('utf-8'), 9)
+                    if len(delta) < len(snapshot):
+                        kind, payload = 'delta', delta
+                self._conn.execute("""
+                    INSERT INTO report_versions (company_key, report_type, version, content_ref, report_path,
+                                                 kind, payload, size, stored_size, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (company_key, report_type, version, content_ref, report_path and str(report_path),
+                      kind, payload, len(text.encode('utf-8')), len(payload), time.time()))
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._remember((company_key, report_type, version), text)
+        return {'company': company_key, 'report_type': report_type, 'version': version, 'kind': kind,
+                'size': len(text.encode('utf-8')), 'stored_size': len(payload), 'previous_ref': previous_ref,
+                'added': True}
+
+    def versions(self, company: str, report_type: str) -> List[Dict[str, Any]]:
+        company_key, report_type = self._chain(company, report_type)
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT version, kind, content_ref, report_path, size, stored_size, created_at
+                FROM report_versions WHERE company_key = ? AND report_type = ? ORDER BY version
+            """, (company_key, report_type)).fetchall()
+        versions = []
+        for row in rows:
+            version = dict(row)
+            version['filename'] = os.path.basename(version.pop('report_path') or '') or None
+            versions.append(version)
+        return versions
+
+    def text(self, company: str, report_type: str, version: int) -> Optional[str]:
+        company_key, report_type = self._chain(company, report_type)
+        with self._lock:
+            return self._rebuild(company_key, report_type, version)
+
+    def text_for_ref(self, content_ref: str) -> Optional[str]:
+        """Text of the newest version with this content hash"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT company_key, report_type, version FROM report_versions '
+                'WHERE content_ref = ? ORDER BY id DESC LIMIT 1', (content_ref,)
+            ).fetchone()
+            return self._rebuild(row['company_key'], row['report_type'], row['version']) if row else None
+
+    def is_latest(self, content_ref: str) -> bool:
+        """Whether content_ref is the newest version of any chain"""
+        with self._lock:
+            return self._conn.execute("""
+                SELECT 1 FROM report_versions AS v
+                WHERE content_ref = ? AND version = (
+                    SELECT MAX(version) FROM report_versions
+                    WHERE company_key = v.company_key AND report_type = v.report_type
+                )
+                LIMIT 1
+            """, (content_ref,)).fetchone() is not None
+
+    def diff(self, company: str, report_type: str, old_version: int, new_version: int,
+             context: int = 3) -> Optional[Dict[str, Any]]:
+        """Unified diff between two versions, with added/removed line counts; None if either is missing"""
+        old, new = self.text(company, report_type, old_version), self.text(company, report_type, new_version)
+        if old is None or new is None:
+            return None
+        lines = list(unified_diff(
+            old.splitlines(keepends=True), new.splitlines(keepends=True),
+            fromfile=f"v{old_version}", tofile=f"v{new_version}", n=context
+        ))
+        return {
+            'from': old_version,
+            'to': new_version,
+            'added': sum(1 for line in lines if line.startswith('+') and not line.startswith('+++')),
+            'removed': sum(1 for line in lines if line.startswith('-') and not line.startswith('---')),
+            'diff': ''.join(lines)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute("""
+                SELECT COUNT(*) AS versions, COUNT(DISTINCT company_key || '/' || report_type) AS chains,
+                       COALESCE(SUM(size), 0) AS size, COALESCE(SUM(stored_size), 0) AS stored_size
+                FROM report_versions
+            """).fetchone()
+        return dict(row)
+
+
+def get_report_versions() -> ReportVersions:
+    """Version store shared by the whole process"""
+    global _shared_versions
+    with _shared_versions_lock:
+        if _shared_versions is None:
+            _shared_versions = ReportVersions()
+        return _shared_versions
@@ -0,0 +1,129 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Searches an analyst would otherwise discover one ReAct step at a time
+QUERY_TEMPLATES = {
+    'market_analysis': [
+        "{company} market share {year}",
+        "{industry} market size {year}",
+        "{industry} market growth forecast",
+        "{company} competitors",
+        "{industry} industry trends {year}"
+    ],
+    'competitor_analysis': [
+        "{company} competitors",
+        "{company} market position {year}",
+        "{industry} competitive landscape {year}",
+        "{company} vs {competitor}",
+        "{competitor} strategy {year}"
+    ],
+    'icp_report': [
+        "{company} customers",
+        "{company} target audience",
+        "{industry} buyer persona",
+        "{industry} customer pain points",
+        "{industry} purchasing decision process"
+    ],
+    'gap_analysis': [
+        "{company} weaknesses",
+        "{company} customer complaints",
+        "{industry} unmet customer needs",
+        "{industry} market gaps {year}",
+        "{company} competitors features"
+    ],
+    'market_assessment': [
+        "{industry} market size {year}",
+        "{industry} market segments",
+        "{industry} barriers to entry",
+        "{industry} growth projections",
+        "{company} market opportunity"
+    ],
+    'impact_assessment': [
+        "{company} industry impact",
+        "{company} market influence {year}",
+        "{industry} disruption {year}",
+        "{company} growth {year}",
+        "{industry} future outlook"
+    ]
+}
+
+
+def prefetch_enabled(report_type: str) -> bool:
+    """RESEARCH_PREFETCH_TYPES: comma separated report types, 'all' (default) or 'none'"""
+    setting = os.getenv('RESEARCH_PREFETCH_TYPES', 'all').strip().lower()
+    if setting in ('', 'none', 'off'):
+        return False
+    if setting == 'all':
+        return report_type in QUERY_TEMPLATES
+    return report_type in [t.strip() for t in setting.split(',')]
+
+
+class ResearchPrefetcher:
+    """Runs a report type's search plan in parallel before the crew starts"""
+
+    def __init__(self, search, max_workers: Optional[int] = None, max_chars_per_result: int = 800,
+                 max_competitors: int = 3):
+        self.search = search
+        self.max_workers = max_workers or int(os.getenv('RESEARCH_PREFETCH_WORKERS', '5'))
+        self.max_chars_per_result = max_chars_per_result
+        self.max_competitors = max_competitors
+
+    def plan_queries(self, inputs: Dict[str, Any]) -> List[str]:
+        """Expand the report type's templates with the company, industry and competitors"""
+        values = {
+            'company': inputs.get('company_name') or '',
+            'industry': inputs.get('industry') or '',
+            'year': inputs.get('time_period') or '2024'
+        }
+        competitors = [c for c in (inputs.get('competitors') or []) if c and 'identified through' not in c]
+
+        queries = []
+        for template in QUERY_TEMPLATES.get(inputs.get('report_type'), []):
+            if '{competitor}' in template:
+                for competitor in competitors[:self.max_competitors]:
+                    queries.append(template.format(competitor=competitor, **values))
+            else:
+                queries.append(template.format(**values))
+
+        # Keep plan order but drop duplicates
+        return list(dict.fromkeys(q.strip() for q in queries if q.strip()))
+
+    def _search(self, query: str) -> Optional[str]:
+        try:
+            return self.search.run(query)
+        except Exception as e:
+            logger.warning(f"Prefetch search failed for '{query}': {e}")
+            return None
+
+    def prefetch(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the query plan concurrently; returns the compacted brief and stats"""
+        start = time.perf_counter()
+        queries = self.plan_queries(inputs)
+        if not queries:
+            return {'brief': '', 'queries': [], 'completed': 0, 'elapsed': 0.0}
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(queries))) as pool:
+            results = list(pool.map(self._search, queries))
+
+        completed = [(query, result) for query, result in zip(queries, results) if result]
+        return {
+            'brief': self.compact(completed),
+            'queries': queries,
+            'completed': len(completed),
+            'elapsed': round(time.perf_counter() - start, 3)
+        }
+
+    def compact(self, results) -> str:
+        """Trim each result so the brief fits comfortably in a task description"""
+        sections = []
+        for query, result in results:
+            text = ' '.join(str(result).split())
+            if len(text) > self.max_chars_per_result:
+                text = text[:self.max_chars_per_result].rsplit(' ', 1)[0] + '...'
+            sections.append(f"Search: {query}\n{text}")
+        return '\n\n'.join(sections)
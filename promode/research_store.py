@@ -0,0 +1,74 @@
+from disk_cache import DiskCache
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Bump when the analyst tasks change enough that old research shouldn't be reused
+RESEARCH_VERSION = 1
+
+# The inputs the research tasks depend on (plus any named competitors); answers and formatting only reach the writer
+RESEARCH_KEY_FIELDS = ('company_name', 'industry', 'report_type', 'time_period')
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def research_key(inputs: Dict[str, Any]) -> str:
+    """Cache key for a report's research, from RESEARCH_KEY_FIELDS and any named competitors"""
+    values = {field: ' '.join(str(inputs.get(field) or '').split()).lower() for field in RESEARCH_KEY_FIELDS}
+    values['version'] = RESEARCH_VERSION
+    # Competitor reports research each named competitor, so the names are part of the key
+    competitors = sorted(str(c).strip().lower() for c in inputs.get('competitors') or []
+                         if c and 'identified through' not in str(c))
+    if competitors:
+        values['competitors'] = competitors
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def research_reuse_enabled(context: Dict[str, Any]) -> bool:
+    """Requests can pass refresh_research to force new research; RESEARCH_REUSE sets the default"""
+    if context.get('refresh_research'):
+        return False
+    default = os.getenv('RESEARCH_REUSE', 'true').lower() in ('1', 'true', 'yes')
+    return bool(context.get('reuse_research', default))
+
+
+class ResearchStore:
+    """Research task outputs shared by every report over the same company, industry, type and period.
+
+    Changing an answer or asking for a different format then only re-runs
+    the writer, instead of the whole crew.
+    """
+
+    def __init__(self, cache: Optional[DiskCache] = None):
+        self.cache = cache or DiskCache(
+            'research_outputs',
+            ttl=float(os.getenv('RESEARCH_STORE_TTL', str(24 * 3600))),
+            max_entries=int(os.getenv('RESEARCH_STORE_MAX_ENTRIES', '2000'))
+        )
+
+    def get(self, inputs: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        entry = self.cache.get(research_key(inputs))
+        return entry['outputs'] if entry else None
+
+    def set(self, inputs: Dict[str, Any], outputs: List[Dict[str, Any]]):
+        self.cache.set(research_key(inputs), {
+            'inputs': {field: inputs.get(field) for field in RESEARCH_KEY_FIELDS},
+            'outputs': outputs,
+            'stored_at': time.time()
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+def get_research_store() -> ResearchStore:
+    """Research store shared by every ReportGenerator in this process"""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = ResearchStore()
+        return _shared_store
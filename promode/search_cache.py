@@ -0,0 +1,68 @@
+from langchain_community.utilities import GoogleSerperAPIWrapper
+from disk_cache import DiskCache
+from typing import Any, Dict, Optional
+import os
+import re
+import threading
+
+# enhanced_search wraps queries as "<q> analysis OR <q> insights <year>"
+_EXPANSION = re.compile(r'^(?P<query>.+?) analysis or (?P=query) insights \d{4}$')
+
+_shared_search = None
+_shared_search_lock = threading.Lock()
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a search query used as its cache key"""
+    query = ' '.join(str(query).split()).lower().strip('"\' ')
+    match = _EXPANSION.match(query)
+    if match:
+        query = match.group('query')
+    return query
+
+
+class CachedSearch:
+    """Search backend that answers repeated queries from a shared on-disk cache.
+
+    Lookups are keyed on the normalised query; misses go to Serper with the
+    original query text.
+    """
+
+    def __init__(self, backend: Optional[Any] = None, cache: Optional[DiskCache] = None):
+        self._backend = backend
+        self._backend_lock = threading.Lock()
+        self.cache = cache or DiskCache(
+            'search_results',
+            ttl=float(os.getenv('SEARCH_CACHE_TTL', str(24 * 3600))),
+            max_entries=int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '20000'))
+        )
+
+    @property
+    def backend(self) -> Any:
+        # Created lazily so importing this module doesn't require SERPER_API_KEY
+        with self._backend_lock:
+            if self._backend is None:
+                self._backend = GoogleSerperAPIWrapper()
+            return self._backend
+
+    def run(self, query: str) -> str:
+        key = normalize_query(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        result = self.backend.run(query)
+        if result:
+            self.cache.set(key, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+def get_shared_search() -> CachedSearch:
+    """Search backend shared by every ReportGenerator in this process"""
+    global _shared_search
+    with _shared_search_lock:
+        if _shared_search is None:
+            _shared_search = CachedSearch()
+        return _shared_search
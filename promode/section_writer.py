@@ -0,0 +1,167 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import os
+import time
+
+# Body sections of each report, in the order they are assembled, with what each should cover.
+# They mirror the writer task descriptions; the executive summary is written last, from these.
+REPORT_SECTIONS = {
+    'market_analysis': [
+        ('Market Overview', 'current market size and growth trends, market segmentation, industry structure and dynamics'),
+        ('Competitive Analysis', 'key competitors and market shares, competitive advantages and disadvantages, strategic positioning'),
+        ('Market Drivers and Inhibitors', 'growth drivers and opportunities, challenges and threats, regulatory and economic factors'),
+        ('Strategic Recommendations', 'market entry or expansion strategies, competitive positioning recommendations'),
+        ('Risk Analysis', 'key risks and mitigation strategies')
+    ],
+    'competitor_analysis': [
+        ('Competitor Profiles', 'each significant competitor: offering, positioning, strengths and weaknesses'),
+        ('Comparative Analysis', 'side-by-side comparison of the company against its competitors, with supporting data'),
+        ('Strategic Recommendations', 'how the company should respond to its competitive landscape')
+    ],
+    'icp_report': [
+        ('Customer Segment Profiles', 'the ideal customer segments, firmographics and demographics'),
+        ('Needs Analysis', 'pain points, needs and value drivers of each segment'),
+        ('Buying Behavior', 'decision process, buying criteria and acquisition channels'),
+        ('Recommendations', 'how to target and win the ideal customers')
+    ],
+    'gap_analysis': [
+        ('Current State Analysis', 'where the company stands today, capabilities and limitations'),
+        ('Desired State Analysis', 'where the company should be and what the market rewards'),
+        ('Gap Identification', 'the gaps between current and desired state, prioritised'),
+        ('Recommendations', 'actions and resources needed to close the gaps')
+    ],
+    'market_assessment': [
+        ('Market Overview', 'market size, segments, growth rate and trends'),
+        ('Opportunity Analysis', 'the most attractive opportunities and their potential'),
+        ('Risk Assessment', 'market barriers, risks and how to mitigate them'),
+        ('Recommendations', 'where and how to play in this market')
+    ],
+    'impact_assessment': [
+        ('Impact Analysis', 'the company\'s measurable impact and key performance indicators'),
+        ('Market Influence', 'how the company shapes its market and stakeholders'),
+        ('Future Scenarios', 'plausible future scenarios and long-term projections'),
+        ('Recommendations', 'how to grow and optimise the company\'s impact')
+    ]
+}
+
+SECTION_PROMPT = """You are a professional business report writer working on a {report_title} for {company}.
+Write ONLY the "{section}" section of the report, covering: {guidance}.
+
+Rules:
+- Start with the heading "## {section}" and use ### for any subsections
+- Use professional markdown: bullet points for key findings, tables or lists for data
+- Base every claim on the research below and cite its figures; do not invent data
+- Do not write an introduction, executive summary or any other section
+- {length}
+
+RESEARCH:
+{research}
+{answers}"""
+
+SUMMARY_PROMPT = """You are a professional business report writer finishing a {report_title} for {company}.
+Write the "Executive Summary" section from the finished report sections below: the key findings,
+the most important numbers and the top recommendations.
+
+Rules:
+- Start with the heading "## Executive Summary"
+- At most {words} words, in professional markdown with bullet points for key findings
+- Only summarise what the sections say
+
+REPORT SECTIONS:
+{sections}"""
+
+DETAIL_LENGTH = {
+    'quick': 'Keep it under 250 words',
+    'detailed': 'Be thorough: 400-700 words with specific metrics'
+}
+
+
+def section_writing_enabled(context: Dict[str, Any], report_type: str) -> bool:
+    """SECTION_WRITER: 'auto' (default, detailed reports only), 'always' or 'never'; requests may pass section_writer"""
+    if report_type not in REPORT_SECTIONS:
+        return False
+    if 'section_writer' in context:
+        return bool(context['section_writer'])
+    mode = os.getenv('SECTION_WRITER', 'auto').lower()
+    if mode == 'auto':
+        return context.get('detail_level') == 'detailed'
+    return mode == 'always'
+
+
+class SectionWriter:
+    """Writes a report's body sections concurrently, then the executive summary from them.
+
+    `llm_for(section)` returns the chat model to use for a section, so each
+    section can stream its tokens under its own name. The assembled report
+    always has the same section order, whatever order the calls finish in.
+    """
+
+    def __init__(self, llm_for: Callable[[str], Any], max_workers: Optional[int] = None):
+        self.llm_for = llm_for
+        self.max_workers = max_workers or int(os.getenv('SECTION_WRITER_CONCURRENCY', '5'))
+
+    def _write(self, section: str, prompt: str) -> str:
+        text = self.llm_for(section).invoke(prompt).content.strip()
+        # Guarantee the heading even if the model dropped it
+        if not text.lstrip('#').strip().lower().startswith(section.lower()):
+            text = f"## {section}\n\n{text}"
+        return text
+
+    def write(self, report_type: str, company: str, research: str, answers: str = '',
+              detail_level: str = 'quick', known: Optional[Dict[str, str]] = None,
+              on_done: Optional[Callable[[str, str], None]] = None) -> Tuple[str, Dict[str, Any]]:
+        """Return the assembled markdown report and timings; sections in known are not rewritten"""
+        start = time.perf_counter()
+        report_title = f"{report_type.replace('_', ' ')} report"
+        sections: List[Tuple[str, str]] = REPORT_SECTIONS[report_type]
+        written = {title: known[title] for title, _ in sections if known and known.get(title)}
+        pending = [(title, guidance) for title, guidance in sections if title not in written]
+
+        prompts = {
+            title: SECTION_PROMPT.format(
+                report_title=report_title, company=company, section=title, guidance=guidance,
+                length=DETAIL_LENGTH.get(detail_level, DETAIL_LENGTH['quick']),
+                research=research, answers=f"\n{answers}" if answers else ''
+            )
+            for title, guidance in pending
+        }
+
+        if pending:
+            errors = []
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as pool:
+                futures = {pool.submit(self._write, title, prompt): title for title, prompt in prompts.items()}
+                for future in as_completed(futures):
+                    title = futures[future]
+                    try:
+                        written[title] = future.result()
+                    except Exception as e:
+                        errors.append((title, e))
+                        continue
+                    if on_done:
+                        on_done(title, written[title])
+            if errors:
+                # Finished sections were already handed to on_done, so a retry only rewrites these
+                title, error = errors[0]
+                raise RuntimeError(f"Writing section '{title}' failed: {error}")
+        sections_done = time.perf_counter()
+
+        body = [written[title] for title, _ in sections]
+        summary = (known or {}).get('Executive Summary')
+        if not summary:
+            summary = self._write('Executive Summary', SUMMARY_PROMPT.format(
+                report_title=report_title, company=company,
+                words=150 if detail_level == 'quick' else 300,
+                sections='\n\n'.join(body)
+            ))
+            if on_done:
+                on_done('Executive Summary', summary)
+
+        name = report_type.replace('_', ' ').title().replace('Icp', 'ICP')
+        title = f"# {company} {name if name.endswith('Report') else name + ' Report'}"
+        report = '\n\n'.join([title, summary] + body) + '\n'
+        return report, {
+            'sections': len(sections) + 1,
+            'rewritten': len(pending) + (0 if (known or {}).get('Executive Summary') else 1),
+            'sections_seconds': round(sections_done - start, 3),
+            'total_seconds': round(time.perf_counter() - start, 3)
+        }
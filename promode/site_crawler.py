@@ -0,0 +1,167 @@
+from dataclasses import dataclass
+from urllib.parse import urldefrag, urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+from http_client import USER_AGENT, get_scrape_client
+from typing import Any, Dict, Iterable, List, Optional
+import asyncio
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Path keywords that usually mark the pages worth reading, with their priority
+PAGE_PRIORITIES = [
+    ('about', 10),
+    ('pricing', 9),
+    ('product', 8),
+    ('customer', 7),
+    ('case-stud', 6),
+    ('solution', 6),
+    ('feature', 5),
+    ('platform', 5),
+    ('company', 4),
+    ('enterprise', 3),
+    ('team', 2)
+]
+
+SKIPPED_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.zip', '.mp4', '.css', '.js', '.xml')
+
+
+@dataclass
+class CrawledPage:
+    url: str
+    text: str
+    size: int
+    priority: int
+
+
+def link_priority(url: str) -> int:
+    """Score a same-site link by how likely it is to describe the business"""
+    path = urlparse(url).path.lower()
+    score = max((weight for keyword, weight in PAGE_PRIORITIES if keyword in path), default=0)
+    # Prefer top-level pages such as /about over /blog/2023/about-our-party
+    depth = len([part for part in path.split('/') if part])
+    return score - max(depth - 1, 0) * 2
+
+
+def discover_links(hrefs: Iterable[str], base_url: str) -> List[str]:
+    """Same-domain page links among a page's hrefs, best candidates first"""
+    base_host = urlparse(base_url).netloc.lower()
+    seen = {urldefrag(base_url)[0].rstrip('/')}
+    links = []
+
+    for href in hrefs:
+        if href.startswith(('mailto:', 'tel:', 'javascript:')):
+            continue
+        url = urldefrag(urljoin(base_url, href))[0].rstrip('/')
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or parsed.netloc.lower() != base_host:
+            continue
+        if parsed.path.lower().endswith(SKIPPED_EXTENSIONS) or url in seen:
+            continue
+        seen.add(url)
+        links.append(url)
+
+    return sorted(links, key=link_priority, reverse=True)
+
+
+class SiteCrawler:
+    """Fetches a company's landing page plus its most useful same-site pages concurrently.
+
+    Crawls stay within max_pages, a total byte budget and a wall-clock budget,
+    honour robots.txt, and go through the shared ScrapeClient so per-host
+    limits apply. Pages are streamed: each one reads at most its share of the
+    bytes left in the budget, and the landing page's links come from the same
+    pass that reads its text.
+    """
+
+    def __init__(self, client=None, max_pages: Optional[int] = None, max_bytes: int = 3_000_000,
+                 time_budget: Optional[float] = None, concurrency: int = 4, max_chars: int = 5000,
+                 ranked: bool = True):
+        self.client = client or get_scrape_client()
+        self.max_pages = max_pages or int(os.getenv('SITE_CRAWL_MAX_PAGES', '5'))
+        self.max_bytes = max_bytes
+        self.time_budget = time_budget or float(os.getenv('SITE_CRAWL_TIME_BUDGET', '10'))
+        self.concurrency = concurrency
+        self.max_chars = max_chars
+        self.ranked = ranked
+
+    def _robots(self, url: str) -> Optional[RobotFileParser]:
+        parsed = urlparse(url)
+        robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+        try:
+            result = self.client.fetch(robots_url)
+        except Exception:
+            # No readable robots.txt means no restrictions
+            return None
+        parser = RobotFileParser(robots_url)
+        parser.parse(result.text.splitlines())
+        return parser
+
+    def _fetch(self, url: str, max_bytes: int, stop: threading.Event, links: bool = False) -> Dict[str, Any]:
+        return self.client.fetch_visible_page(url, max_chars=self.max_chars, max_bytes=max_bytes,
+                                              ranked=self.ranked, links=links, stop=stop)
+
+    def _page(self, url: str, priority: int, max_bytes: int, stop: threading.Event) -> CrawledPage:
+        entry = self._fetch(url, max_bytes, stop)
+        return CrawledPage(url=url, text=entry['text'], size=entry.get('bytes_read', 0), priority=priority)
+
+    async def crawl(self, url: str) -> List[CrawledPage]:
+        start = time.perf_counter()
+        # Set when the time budget runs out, so fetches still running in threads stop downloading
+        stop = threading.Event()
+        entry = await asyncio.to_thread(
+            self._fetch, url, max(self.max_bytes // self.max_pages, 1), stop, self.max_pages > 1
+        )
+        landing = CrawledPage(url=url, text=entry['text'], size=entry.get('bytes_read', 0), priority=100)
+        pages = [landing]
+        if self.max_pages <= 1:
+            return pages
+
+        final_url = entry.get('final_url') or url
+        robots = await asyncio.to_thread(self._robots, final_url)
+        candidates = [
+            link for link in discover_links(entry.get('links', []), final_url)
+            if robots is None or robots.can_fetch(USER_AGENT, link)
+        ][:self.max_pages - 1]
+        # Each remaining page may read an equal share of what the landing page left
+        per_page = (self.max_bytes - landing.size) // max(len(candidates), 1)
+        if per_page <= 0:
+            candidates = []
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(link):
+            async with semaphore:
+                return await asyncio.to_thread(self._page, link, link_priority(link), per_page, stop)
+
+        tasks = [asyncio.ensure_future(fetch(link)) for link in candidates]
+        remaining = self.time_budget - (time.perf_counter() - start)
+        done, pending = await asyncio.wait(tasks, timeout=max(remaining, 0)) if tasks else (set(), set())
+        stop.set()
+        for task in pending:
+            task.cancel()
+
+        total_bytes = landing.size
+        for task in sorted(done, key=lambda t: tasks.index(t)):
+            if task.cancelled() or task.exception():
+                if not task.cancelled():
+                    logger.warning(f"Crawl fetch failed: {task.exception()}")
+                continue
+            page = task.result()
+            total_bytes += page.size
+            pages.append(page)
+
+        logger.info(f"Crawled {len(pages)} pages ({total_bytes} bytes) from {url} in {time.perf_counter() - start:.2f}s")
+        return pages
+
+
+def combine_pages(pages: List[CrawledPage], per_page_chars: int = 1500) -> str:
+    """Join crawled pages into one labelled text block for the website analysis"""
+    sections = []
+    for page in pages:
+        path = urlparse(page.url).path or '/'
+        sections.append(f"[Page: {path}]\n{page.text[:per_page_chars]}")
+    return '\n\n'.join(sections)
@@ -0,0 +1,24 @@
+"""request_key: which request fields make two report requests the same job"""
+from coalesce import request_key
+
+REQUEST = {
+    'company_info': {'company_name': 'OpenAI', 'industry': 'AI'},
+    'report_type': 'market_analysis',
+    'detail_level': 'standard',
+    'answers': {'1': 'Enterprise buyers'}
+}
+
+
+def test_formatting_and_timestamps_do_not_change_the_key():
+    same = dict(REQUEST, company_info={'industry': 'AI ', 'company_name': 'OpenAI'}, timestamp=123)
+    assert request_key(same) == request_key(REQUEST)
+
+
+def test_research_flags_change_the_key():
+    assert request_key(dict(REQUEST, refresh_research=True)) != request_key(REQUEST)
+    assert request_key(dict(REQUEST, reuse_research=False)) != request_key(REQUEST)
+
+
+def test_section_writer_changes_the_key():
+    assert request_key(dict(REQUEST, section_writer=True)) != request_key(REQUEST)
+    assert request_key(dict(REQUEST, section_writer=True)) != request_key(dict(REQUEST, section_writer=False))
@@ -0,0 +1,23 @@
+"""CompetitorFanout accounting of reused, researched and failed competitors"""
+from competitor_fanout import CompetitorFanout
+
+
+class Crew:
+    def __init__(self, name):
+        self.name = name
+
+    def kickoff(self):
+        if self.name == 'Broken':
+            raise RuntimeError('search quota exceeded')
+        return f"Brief on {self.name}"
+
+
+def test_failures_are_recorded_not_counted_as_researched():
+    fanout = CompetitorFanout(Crew, max_workers=3).run(
+        ['Acme', 'Broken', 'Globex', 'Initech'], known={'Initech': 'Saved brief'}
+    )
+    assert list(fanout['briefs']) == ['Acme', 'Globex', 'Initech']
+    assert fanout['briefs']['Initech'] == 'Saved brief'
+    assert fanout['researched'] == 2
+    assert fanout['reused'] == 1
+    assert fanout['errors'] == {'Broken': 'search quota exceeded'}
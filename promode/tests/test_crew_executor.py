@@ -0,0 +1,20 @@
+"""Process pool warm-up"""
+from crew_executor import create_executor, prewarm
+
+
+def test_prewarm_starts_every_worker():
+    executor = create_executor('process', pool_size=3, warm_modules=())
+    try:
+        pids = prewarm(executor, timeout=60)
+        assert len(pids) == 3
+        assert set(executor._processes) == pids
+    finally:
+        executor.shutdown()
+
+
+def test_prewarm_skips_thread_pools():
+    executor = create_executor('thread', pool_size=2)
+    try:
+        assert prewarm(executor) == set()
+    finally:
+        executor.shutdown()
@@ -0,0 +1,166 @@
+"""ScrapeClient and SiteCrawler against a local http.server"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import threading
+
+import pytest
+
+from disk_cache import DiskCache
+from http_client import ScrapeClient
+from site_crawler import SiteCrawler
+
+LAST_MODIFIED = 'Wed, 01 Jan 2025 00:00:00 GMT'
+
+PAGES = {
+    '/': '<html><body><h1>Acme</h1><p>Acme builds widgets.</p>'
+         '<a href="/about">About</a> <a href="/private/pricing">Pricing</a></body></html>',
+    '/about': '<html><body><p>About Acme and its team.</p></body></html>',
+    '/private/pricing': '<html><body><p>Internal price list.</p></body></html>',
+    '/etag': '<html><body><p>Tagged page.</p></body></html>',
+    '/dated': '<html><body><p>Dated page.</p></body></html>',
+    '/robots.txt': 'User-agent: *\nDisallow: /private\n',
+    # No charset in the Content-Type: the client has to find the page's own
+    '/visible': '<html><head><meta charset="utf-8"><style>p {}</style></head>'
+                '<body><p>Caf\u00e9 culture, na\u00efve pricing.</p></body></html>',
+    '/big': '<html><body><p>' + '\u00e9' * 50000 + '</p></body></html>',
+    '/products': '<html><body><p>Acme products.</p><a href="/big">Product catalogue</a></body></html>'
+}
+
+# ETag of each tagged page; /dated and /visible also send LAST_MODIFIED
+ETAGS = {'/visible': '"v2"', '/etag': '"v1"'}
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        Handler.requests.append((self.path, dict(self.headers)))
+        body = PAGES.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = ETAGS.get(self.path)
+        if etag and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        if self.path == '/dated' and self.headers.get('If-Modified-Since') == LAST_MODIFIED:
+            self.send_response(304)
+            self.end_headers()
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        if self.path.endswith('.txt'):
+            content_type = 'text/plain'
+        elif self.path == '/visible':
+            content_type = 'text/html'
+        else:
+            content_type = 'text/html; charset=utf-8'
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        if etag:
+            self.send_header('ETag', etag)
+        if self.path in ('/dated', '/visible'):
+            self.send_header('Last-Modified', LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def requests_seen():
+    Handler.requests.clear()
+    return Handler.requests
+
+
+def make_client(tmp_path, freshness):
+    return ScrapeClient(freshness=freshness, cache=DiskCache('http_pages', path=str(tmp_path / 'pages.sqlite3')))
+
+
+def test_fresh_page_is_a_cache_hit(server, requests_seen, tmp_path):
+    client = make_client(tmp_path, freshness=3600)
+    first = client.fetch(f"{server}/about")
+    second = client.fetch(f"{server}/about")
+    assert not first.from_cache
+    assert second.from_cache and not second.revalidated
+    assert second.text == first.text
+    assert [path for path, _ in requests_seen] == ['/about']
+
+
+def test_stale_page_revalidates_with_etag(server, requests_seen, tmp_path):
+    client = make_client(tmp_path, freshness=0)
+    first = client.fetch(f"{server}/etag")
+    second = client.fetch(f"{server}/etag")
+    assert second.revalidated and second.text == first.text
+    assert requests_seen[1][1].get('If-None-Match') == '"v1"'
+
+
+def test_stale_page_revalidates_with_last_modified(server, requests_seen, tmp_path):
+    client = make_client(tmp_path, freshness=0)
+    first = client.fetch(f"{server}/dated")
+    second = client.fetch(f"{server}/dated")
+    assert second.revalidated and second.text == first.text
+    assert requests_seen[1][1].get('If-Modified-Since') == LAST_MODIFIED
+
+
+def test_crawl_honours_robots_txt(server, requests_seen, tmp_path):
+    crawler = SiteCrawler(client=make_client(tmp_path, freshness=3600), max_pages=5)
+    pages = asyncio.run(crawler.crawl(f"{server}/"))
+    paths = [path for path, _ in requests_seen]
+    assert [page.url for page in pages] == [f"{server}/", f"{server}/about"]
+    assert '/robots.txt' in paths
+    assert '/private/pricing' not in paths
+
+
+def test_crawl_splits_the_byte_budget(server, tmp_path):
+    crawler = SiteCrawler(client=make_client(tmp_path, freshness=3600), max_pages=2, max_bytes=8192)
+    pages = asyncio.run(crawler.crawl(f"{server}/products"))
+    assert [page.url for page in pages] == [f"{server}/products", f"{server}/big"]
+    # The landing page is small, so the catalogue page gets the rest of the budget and no more
+    assert pages[1].size == 8192 - pages[0].size
+
+
+def test_visible_text_finds_the_page_charset(server, tmp_path):
+    client = make_client(tmp_path, freshness=3600)
+    assert client.fetch_visible_text(f"{server}/visible") == 'Caf\u00e9 culture, na\u00efve pricing.'
+
+
+def test_visible_text_revalidates_with_both_validators(server, requests_seen, tmp_path):
+    client = make_client(tmp_path, freshness=0)
+    first = client.fetch_visible_text(f"{server}/visible")
+    second = client.fetch_visible_text(f"{server}/visible")
+    assert second == first
+    headers = requests_seen[1][1]
+    assert headers.get('If-None-Match') == '"v2"'
+    assert headers.get('If-Modified-Since') == LAST_MODIFIED
+
+
+def test_visible_text_byte_cap_counts_bytes(server, tmp_path):
+    client = make_client(tmp_path, freshness=3600)
+    text = client.fetch_visible_text(f"{server}/big", max_chars=100000, max_bytes=4096, chunk_size=1024)
+    entry = client.cache.get(f"visible_text:100000:{server}/big")
+    # Two bytes per character on the wire, so the cap stops at about 2048 characters
+    assert 4096 <= entry['bytes_read'] < 4096 + 1024
+    assert len(text) < 2600
+
+
+def test_stopped_page_is_not_cached(server, tmp_path):
+    client = make_client(tmp_path, freshness=3600)
+    stop = threading.Event()
+    stop.set()
+    entry = client.fetch_visible_page(f"{server}/about", stop=stop)
+    assert entry['bytes_read'] == 0
+    assert client.cache.get(f"visible_text:5000:{server}/about") is None
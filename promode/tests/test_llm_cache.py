@@ -0,0 +1,55 @@
+"""CachedChatModel's async paths"""
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip('langchain')
+
+from disk_cache import DiskCache
+from llm_cache import CachedChatModel
+
+
+class FakeLLM:
+    model_name = 'fake'
+    temperature = 0
+
+    def __init__(self):
+        self.calls = 0
+
+    async def apredict(self, prompt):
+        self.calls += 1
+        return f"answer to {prompt}"
+
+
+class RecordingCache(DiskCache):
+    """DiskCache that notes which threads read and write it"""
+
+    def __init__(self, path):
+        super().__init__('llm_responses', path=path)
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return super().get(key)
+
+    def set(self, key, value):
+        self.threads.add(threading.get_ident())
+        return super().set(key, value)
+
+
+def test_apredict_caches_off_the_event_loop(tmp_path):
+    llm = FakeLLM()
+    cache = RecordingCache(str(tmp_path / 'llm.sqlite3'))
+    model = CachedChatModel(llm, cache=cache, bypass=False)
+
+    async def run():
+        loop_thread = threading.get_ident()
+        first = await model.apredict('hello')
+        second = await model.apredict('hello')
+        return loop_thread, first, second
+
+    loop_thread, first, second = asyncio.run(run())
+    assert first == second == 'answer to hello'
+    assert llm.calls == 1
+    assert cache.threads and loop_thread not in cache.threads
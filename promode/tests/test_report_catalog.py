@@ -0,0 +1,26 @@
+"""ReportCatalog listing through list_reports"""
+from report_catalog import ReportCatalog, list_reports
+
+
+def make_catalog(tmp_path, count):
+    catalog = ReportCatalog(path=str(tmp_path / 'catalog.sqlite3'))
+    for i in range(count):
+        catalog.add('OpenAI', 'market_analysis', str(tmp_path / f'openai_market_analysis_{i:03d}_report.md'),
+                    created_at=1_700_000_000 + i)
+    return catalog
+
+
+def test_without_limit_every_report_is_listed(tmp_path):
+    page = list_reports(make_catalog(tmp_path, 60), {})
+    assert len(page['reports']) == page['total'] == 60
+    assert page['limit'] is None and not page['has_more']
+
+
+def test_limit_and_page(tmp_path):
+    catalog = make_catalog(tmp_path, 60)
+    page = list_reports(catalog, {'limit': '25', 'page': '3'})
+    assert [report['filename'] for report in page['reports']] == [
+        f'openai_market_analysis_{i:03d}_report.md' for i in range(9, -1, -1)
+    ]
+    assert page['offset'] == 50 and not page['has_more']
+    assert len(list_reports(catalog, {'page': '1'})['reports']) == 50
@@ -0,0 +1,49 @@
+"""ReportSearchIndex ranking and filters"""
+from report_search import ReportSearchIndex
+
+REPORT = """# Openai Market Analysis Report
+
+## Pricing Strategy
+
+Usage-based pricing for the API, seat pricing for enterprise plans.
+"""
+
+TRACKING = """# Acme Competitor Report
+
+## Pricing
+
+Acme undercuts on seat pricing.
+"""
+
+
+def make_index(tmp_path):
+    index = ReportSearchIndex(path=str(tmp_path / 'search.sqlite3'))
+    index.add('openai_market_analysis_report.md', REPORT, 'OpenAI', 'market_analysis')
+    index.add('acme_competitor_tracking_report.md', TRACKING, 'Acme Corp', 'competitor_tracking')
+    return index
+
+
+def test_query_words_do_not_match_filter_tokens(tmp_path):
+    index = make_index(tmp_path)
+    assert index.search('tracking') == []
+    assert index.search('corp') == []
+    assert [hit['filename'] for hit in index.search('analysis')] == ['openai_market_analysis_report.md']
+
+
+def test_filters_narrow_the_match(tmp_path):
+    index = make_index(tmp_path)
+    hits = index.search('pricing', report_type='competitor_tracking')
+    assert [hit['filename'] for hit in hits] == ['acme_competitor_tracking_report.md']
+    hits = index.search('pricing', company='openai', report_type='market_analysis')
+    assert [hit['filename'] for hit in hits] == ['openai_market_analysis_report.md']
+    assert index.search('pricing', company='acme corp', report_type='market_analysis') == []
+
+
+def test_broad_queries_report_truncation(tmp_path, monkeypatch):
+    index = make_index(tmp_path)
+    monkeypatch.setattr('report_search.MAX_CANDIDATES', 1)
+    hits, truncated = index.query('pricing')
+    assert truncated and [hit['filename'] for hit in hits] == ['acme_competitor_tracking_report.md']
+    hits, truncated = index.query('pricing', exhaustive=True)
+    assert not truncated and len(hits) == 2
+    assert index.query('usage')[1] is False
@@ -0,0 +1,69 @@
+"""/api/reports/search through the Quart test client"""
+import asyncio
+import importlib
+import os
+
+import pytest
+
+pytest.importorskip('quart')
+pytest.importorskip('quart_cors')
+pytest.importorskip('crewai')
+
+REPORT = """# Openai Market Analysis Report
+
+## Pricing Strategy
+
+Usage-based pricing for the API, seat pricing for enterprise plans.
+
+## Market Overview
+
+Demand for hosted models keeps growing.
+"""
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    root = tmp_path_factory.mktemp('app')
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(root)
+        mp.setenv('CACHE_DIR', str(root / '.cache'))
+        mp.setenv('REPORT_STORE_DIR', str(root / 'report_objects'))
+        mp.setenv('REPORT_SEARCH_BACKFILL', 'false')
+        mp.setenv('OPENAI_API_KEY', os.getenv('OPENAI_API_KEY', 'test'))
+        mp.setenv('SERPER_API_KEY', os.getenv('SERPER_API_KEY', 'test'))
+        app = importlib.import_module('app')
+        app.report_search.add(str(root / 'openai_market_analysis_20250101_000000_report.md'), REPORT,
+                              'OpenAI', 'market_analysis')
+        yield app
+
+
+def get(app_module, url):
+    async def request():
+        response = await app_module.app.test_client().get(url)
+        return response.status_code, await response.get_json()
+    return asyncio.run(request())
+
+
+def test_search_with_filters(app_module):
+    # Filters are read in the handler; the search itself runs in an executor thread
+    status, body = get(app_module, '/api/reports/search?q=pricing&company=openai&report_type=market_analysis')
+    assert status == 200
+    assert [hit['filename'] for hit in body['hits']] == ['openai_market_analysis_20250101_000000_report.md']
+    assert body['hits'][0]['sections'][0]['heading'].endswith('Pricing Strategy')
+
+
+def test_search_filter_excludes_other_companies(app_module):
+    status, body = get(app_module, '/api/reports/search?q=pricing&company=google')
+    assert status == 200
+    assert body['hits'] == []
+
+
+def test_search_requires_query(app_module):
+    status, _ = get(app_module, '/api/reports/search')
+    assert status == 400
+
+
+def test_search_reports_truncation(app_module):
+    status, body = get(app_module, '/api/reports/search?q=pricing&exhaustive=true')
+    assert status == 200
+    assert body['truncated'] is False
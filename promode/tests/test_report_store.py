@@ -0,0 +1,55 @@
+"""ReportStore.put and the version chain"""
+import pytest
+
+import report_store
+from report_store import ReportStore
+from report_versions import ReportVersions
+
+CHAIN = ('OpenAI', 'market_analysis')
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    versions = ReportVersions(path=str(tmp_path / 'versions.sqlite3'))
+    monkeypatch.setattr(report_store, 'get_report_versions', lambda: versions)
+    monkeypatch.setenv('REPORT_VERSIONS', 'true')
+    store = ReportStore(root=str(tmp_path / 'objects'), codec='gzip')
+    store.versions = versions
+    return store
+
+
+def chain_refs(store):
+    return [version['content_ref'] for version in store.versions.versions(*CHAIN)]
+
+
+def test_rerun_of_the_newest_body_adds_no_version(store):
+    first = store.put('# Report\n\nVersion one.\n', chain=CHAIN)
+    assert store.put('# Report\n\nVersion one.\n', chain=CHAIN) == first
+    assert chain_refs(store) == [first]
+    assert store.read(first) == '# Report\n\nVersion one.\n'
+
+
+def test_older_body_comes_back_as_a_new_version(store):
+    one = store.put('# Report\n\nVersion one.\n', chain=CHAIN)
+    two = store.put('# Report\n\nVersion two.\n', chain=CHAIN)
+    assert store.locate(one) is None
+    # Whether or not one's object still exists, returning to it is a new version
+    assert store.put('# Report\n\nVersion one.\n', chain=CHAIN) == one
+    assert chain_refs(store) == [one, two, one]
+    assert store.locate(one) is not None and store.locate(two) is None
+    assert store.read(two) == '# Report\n\nVersion two.\n'
+
+
+def test_existing_object_does_not_stop_a_new_version(store):
+    # Stored before (no chain, or by another chain), but new to this chain
+    ref = store.put('# Report\n\nShared text.\n')
+    assert store.put('# Report\n\nShared text.\n', chain=CHAIN) == ref
+    assert chain_refs(store) == [ref]
+
+
+def test_missing_object_of_the_newest_version_is_rewritten_not_re_added(store):
+    ref = store.put('# Report\n\nVersion one.\n', chain=CHAIN)
+    store._discard(ref)
+    store.put('# Report\n\nVersion one.\n', chain=CHAIN)
+    assert chain_refs(store) == [ref]
+    assert store.locate(ref) is not None
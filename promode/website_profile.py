@@ -0,0 +1,192 @@
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Dict, List, Optional, get_origin
+import json
+
+# Sections of the prose website analysis handed to the crews
+ANALYSIS_SECTIONS = [
+    'Company Overview',
+    'Products/Services',
+    'Target Market',
+    'Value Proposition',
+    'Key Technologies/Solutions',
+    'Market Position'
+]
+
+DEFAULT_FOCUS_AREAS = ['Market Size', 'Competition', 'Growth Trends']
+
+PROFILE_PROMPT = """Analyze this website content for {company_name} and extract everything needed for market research in one pass.
+
+Website Content:
+{content}
+
+Return ONLY a JSON object with this exact format:
+{{
+    "industry": "main industry category",
+    "business_model": "B2B or B2C or both",
+    "target_market": "target market description",
+    "products": ["main product/service 1", "product/service 2"],
+    "market_focus": "geographic focus",
+    "competitors": ["likely competitor 1", "likely competitor 2"],
+    "focus_areas": ["main business focus area 1", "focus area 2"],
+    "analysis": {{
+        "Company Overview": "main business focus, core offerings, company positioning",
+        "Products/Services": "key offerings, features/capabilities, target solutions",
+        "Target Market": "primary audience, market segments, geographic focus",
+        "Value Proposition": "key differentiators, main benefits, unique advantages",
+        "Key Technologies/Solutions": "core technologies, technical capabilities, platform features",
+        "Market Position": "industry focus, competitive stance, market approach"
+    }}
+}}
+"""
+
+
+@dataclass
+class WebsiteProfile:
+    """Everything the report flow derives from one scraped website"""
+
+    company_name: str = ''
+    industry: str = 'Technology'
+    business_model: str = 'B2B'
+    target_market: str = 'General'
+    products: List[str] = field(default_factory=lambda: ['Unknown'])
+    market_focus: str = 'Global'
+    competitors: List[str] = field(default_factory=list)
+    focus_areas: List[str] = field(default_factory=lambda: list(DEFAULT_FOCUS_AREAS))
+    sections: Dict[str, str] = field(default_factory=dict)
+    source_length: int = 0
+
+    @classmethod
+    def from_llm_response(cls, response: str, company_name: str, source_length: int) -> 'WebsiteProfile':
+        """Parse the JSON produced by PROFILE_PROMPT, keeping defaults for missing fields"""
+        response = response.strip()
+        if response.startswith('```json'):
+            response = response[7:]
+        elif response.startswith('```'):
+            response = response[3:]
+        if response.endswith('```'):
+            response = response[:-3]
+
+        data = json.loads(response.strip())
+        if not isinstance(data, dict):
+            raise ValueError("Website profile must be a JSON object")
+
+        data['sections'] = data.pop('analysis', {}) or {}
+        return cls.from_dict({**data, 'company_name': company_name, 'source_length': source_length})
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'WebsiteProfile':
+        """Build a profile from client- or LLM-supplied data, keeping defaults for unknown or unusable values"""
+        profile = cls()
+        for f in fields(cls):
+            value = _coerce_field(f.type, data.get(f.name))
+            if value not in (None, '', [], {}):
+                setattr(profile, f.name, value)
+        return profile
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def analysis(self) -> Dict[str, Any]:
+        """Short business profile, as returned by analyze_website_content"""
+        return {
+            'industry': self.industry,
+            'business_model': self.business_model,
+            'target_market': self.target_market,
+            'products': self.products,
+            'market_focus': self.market_focus
+        }
+
+    def company_data(self) -> Dict[str, Any]:
+        """Inferred company data, as returned by infer_company_data"""
+        return {
+            'industry': self.industry,
+            'business_model': self.business_model,
+            'target_market': self.target_market,
+            'competitors': self.competitors,
+            'focus_areas': self.focus_areas
+        }
+
+    def structured_analysis(self) -> str:
+        """Six-section prose analysis, as returned by format_website_data"""
+        if not self.source_length and not self.sections:
+            return """
+                No website content available for analysis.
+                Using basic company information and user inputs for analysis.
+                """
+
+        if not self.sections:
+            return f"""
+            1. Company Overview
+            Based on available information, the company operates in the {self.industry} sector.
+
+            2. Products/Services
+            Analysis will be based on user inputs and market research.
+
+            3. Target Market
+            Market analysis will be conducted using industry standards and user responses.
+
+            4. Value Proposition
+            Will be derived from market research and competitive analysis.
+
+            5. Key Technologies/Solutions
+            Technology assessment will be based on industry trends and company focus.
+
+            6. Market Position
+            Position analysis will use market research and competitive intelligence.
+            """
+
+        lines = []
+        for number, title in enumerate(ANALYSIS_SECTIONS, 1):
+            body = self.sections.get(title) or 'Not identified from website content.'
+            if isinstance(body, list):
+                body = '\n'.join(f"- {item}" for item in body)
+            lines.append(f"{number}. {title}\n{body}")
+        return '\n\n'.join(lines)
+
+    def summary(self) -> str:
+        """Compact context for question generation prompts"""
+        return '\n'.join([
+            f"Industry: {self.industry}",
+            f"Business Model: {self.business_model}",
+            f"Target Market: {self.target_market}",
+            f"Products/Services: {', '.join(self.products)}",
+            f"Market Focus: {self.market_focus}",
+            f"Overview: {self.sections.get('Company Overview', 'Not available')}",
+            f"Value Proposition: {self.sections.get('Value Proposition', 'Not available')}"
+        ])
+
+
+def _coerce_field(kind: Any, value: Any) -> Any:
+    """value as the field's type, or None when it can't be read as one"""
+    if value is None:
+        return None
+    origin = get_origin(kind)
+    if origin is list:
+        if isinstance(value, str):
+            value = value.split(',')
+        if not isinstance(value, (list, tuple)):
+            return None
+        return [str(item).strip() for item in value if isinstance(item, (str, int, float)) and str(item).strip()]
+    if origin is dict:
+        if not isinstance(value, dict):
+            return None
+        return {str(key): item for key, item in value.items() if isinstance(item, (str, list))}
+    if kind is int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    if isinstance(value, (list, tuple)):
+        return ', '.join(str(item) for item in value)
+    if isinstance(value, (str, int, float)):
+        return str(value).strip()
+    return None
+
+
+def coerce_profile(value: Optional[Any]) -> Optional[WebsiteProfile]:
+    """Accept a WebsiteProfile or its dict form (e.g. echoed back by the frontend)"""
+    if value is None or isinstance(value, WebsiteProfile):
+        return value
+    if isinstance(value, dict):
+        return WebsiteProfile.from_dict(value)
+    return None
@@ -0,0 +1,104 @@
+from disk_cache import DiskCache
+from typing import Any, Dict, Optional
+import hashlib
+import os
+import threading
+import time
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def content_hash(website_data: str) -> str:
+    """Fingerprint of scraped text; whitespace-only differences hash the same"""
+    normalized = ' '.join(str(website_data).split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:24]
+
+
+class WebsiteStore:
+    """Scraped website text and its derived analyses, keyed by content hash.
+
+    analyze-website hands clients the hash as `website_ref`; later requests
+    can send the ref instead of the text, and a page whose content hasn't
+    changed is never profiled twice for the same company.
+    """
+
+    def __init__(self, cache: Optional[DiskCache] = None):
+        self.cache = cache or DiskCache(
+            'website_analyses',
+            ttl=float(os.getenv('WEBSITE_STORE_TTL', str(7 * 24 * 3600))),
+            max_entries=int(os.getenv('WEBSITE_STORE_MAX_ENTRIES', '5000'))
+        )
+        self._lock = threading.Lock()
+
+    def put(self, website_data: str, url: Optional[str] = None) -> str:
+        """Store website_data (if new) and return its ref"""
+        ref = content_hash(website_data)
+        with self._lock:
+            entry = self.cache.get(ref)
+            if entry is None:
+                entry = {'website_data': website_data, 'url': url, 'profiles': {}, 'stored_at': time.time()}
+                self.cache.set(ref, entry)
+            elif url and not entry.get('url'):
+                entry['url'] = url
+                self.cache.set(ref, entry)
+        return ref
+
+    def get(self, ref: str) -> Optional[Dict[str, Any]]:
+        return self.cache.get(ref) if ref else None
+
+    def website_data(self, ref: str) -> Optional[str]:
+        entry = self.get(ref)
+        return entry['website_data'] if entry else None
+
+    def profile(self, ref: str, company_name: str = '') -> Optional[Dict[str, Any]]:
+        """The stored WebsiteProfile dict for this content and company, if any"""
+        entry = self.get(ref)
+        if not entry:
+            return None
+        return entry['profiles'].get(self._profile_key(company_name))
+
+    def set_profile(self, ref: str, company_name: str, profile: Dict[str, Any]):
+        with self._lock:
+            entry = self.cache.get(ref)
+            if entry is None:
+                return
+            entry['profiles'][self._profile_key(company_name)] = profile
+            self.cache.set(ref, entry)
+
+    def resolve(self, data: Dict[str, Any]) -> bool:
+        """Fill website_data (and website_profile) in a request from its website_ref.
+
+        Returns False when the ref is unknown or has expired; requests that
+        carry website_data themselves are left untouched.
+        """
+        ref = data.get('website_ref')
+        if not ref or data.get('website_data'):
+            return True
+        entry = self.get(ref)
+        if not entry:
+            return False
+
+        data['website_data'] = entry['website_data']
+        if not data.get('website_profile'):
+            company_name = data.get('company_name') or (data.get('company_info') or {}).get('company_name') or ''
+            profile = entry['profiles'].get(self._profile_key(company_name))
+            if profile:
+                data['website_profile'] = profile
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+    @staticmethod
+    def _profile_key(company_name: str) -> str:
+        return (company_name or '').strip().lower()
+
+
+def get_website_store() -> WebsiteStore:
+    """Website store shared by every ReportGenerator in this process"""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = WebsiteStore()
+        return _shared_store
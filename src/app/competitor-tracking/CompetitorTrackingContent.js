@@ -4,6 +4,7 @@ import { useState, useEffect } from 'react';
 import Link from 'next/link';
 import SimpleMarkdown from 'simple-markdown';
 import jsPDF from 'jspdf';
+import { MINIMODE_API_BASE_URL, runReportJob } from '@/utils/apiService';
 
 export default function CompetitorTrackingContent() {
   const [isAnalyzing, setIsAnalyzing] = useState(false);
@@ -168,21 +169,8 @@ export default function CompetitorTrackingContent() {
         }
       };
 
-      const response = await fetch('http://127.0.0.1:5002/api/generate-report', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'Accept': 'application/json'
-        },
-        body: JSON.stringify(requestData)
-      });
-
-      if (!response.ok) {
-        const errorData = await response.json();
-        throw new Error(errorData.message || `HTTP error! status: ${response.status}`);
-      }
-
-      const data = await response.json();
+      // The report is generated as a background job; this polls it until it's ready
+      const data = await runReportJob(requestData, MINIMODE_API_BASE_URL);
       
       if (data.status === 'error') {
         throw new Error(data.message);
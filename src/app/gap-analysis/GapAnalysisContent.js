@@ -4,6 +4,7 @@ import { useState, useEffect } from 'react';
 import Link from 'next/link';
 import jsPDF from 'jspdf';
 import { marked } from 'marked';
+import { MINIMODE_API_BASE_URL, runReportJob } from '@/utils/apiService';
 
 export default function GapAnalysisContent() {
   const [isAnalyzing, setIsAnalyzing] = useState(false);
@@ -132,21 +133,14 @@ export default function GapAnalysisContent() {
         await new Promise(resolve => setTimeout(resolve, AI_GENERATION_STEPS[i].duration));
       }
 
-      const response = await fetch('http://127.0.0.1:5002/api/generate-report', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          report_type: 'gap_analysis',
-          inputs: {
-            ...userInputs,
-            analysis_type: 'gap'
-          }
-        })
-      });
-
-      const data = await response.json();
+      // The report is generated as a background job; this polls it until it's ready
+      const data = await runReportJob({
+        report_type: 'gap_analysis',
+        inputs: {
+          ...userInputs,
+          analysis_type: 'gap'
+        }
+      }, MINIMODE_API_BASE_URL);
       
       if (data.status === 'error') {
         throw new Error(data.message);
@@ -6,6 +6,7 @@ import SimpleMarkdown from 'simple-markdown';
 import html2canvas from 'html2canvas';
 import jsPDF from 'jspdf';
 import { marked } from 'marked';
+import { MINIMODE_API_BASE_URL, runReportJob } from '@/utils/apiService';
 
 export default function ICPCreationContent() {
   const [isAnalyzing, setIsAnalyzing] = useState(false);
@@ -128,26 +129,14 @@ export default function ICPCreationContent() {
         await new Promise(resolve => setTimeout(resolve, AI_GENERATION_STEPS[i].duration));
       }
 
-      const response = await fetch('http://127.0.0.1:5002/api/generate-report', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          report_type: 'icp_report',
-          inputs: {
-            ...userInputs,
-            analysis_type: 'icp'
-          }
-        })
-      });
-
-      if (!response.ok) {
-        const errorData = await response.json();
-        throw new Error(errorData.message || 'Failed to generate report');
-      }
-
-      const data = await response.json();
+      // The report is generated as a background job; this polls it until it's ready
+      const data = await runReportJob({
+        report_type: 'icp_report',
+        inputs: {
+          ...userInputs,
+          analysis_type: 'icp'
+        }
+      }, MINIMODE_API_BASE_URL);
       
       if (data.status === 'error') {
         throw new Error(data.message);
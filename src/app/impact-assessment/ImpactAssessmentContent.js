@@ -4,6 +4,7 @@ import { useState, useEffect } from 'react';
 import Link from 'next/link';
 import jsPDF from 'jspdf';
 import { marked } from 'marked';
+import { MINIMODE_API_BASE_URL, runReportJob } from '@/utils/apiService';
 
 export default function ImpactAssessmentContent() {
   const [viewMode, setViewMode] = useState('form');
@@ -183,26 +184,14 @@ export default function ImpactAssessmentContent() {
         await new Promise(resolve => setTimeout(resolve, AI_GENERATION_STEPS[i].duration));
       }
 
-      const response = await fetch('http://127.0.0.1:5002/api/generate-report', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          report_type: 'impact_assessment',
-          inputs: {
-            ...impactInputs,
-            analysis_type: 'impact'
-          }
-        })
-      });
-
-      if (!response.ok) {
-        const errorData = await response.json();
-        throw new Error(errorData.message || 'Failed to generate report');
-      }
-
-      const data = await response.json();
+      // The report is generated as a background job; this polls it until it's ready
+      const data = await runReportJob({
+        report_type: 'impact_assessment',
+        inputs: {
+          ...impactInputs,
+          analysis_type: 'impact'
+        }
+      }, MINIMODE_API_BASE_URL);
       setAnalysisResult(data);
       fetchAllReports();
       setViewMode('results');
@@ -5,6 +5,7 @@ import Link from 'next/link';
 import { FaChartLine, FaHistory, FaImpact, FaArrowRight } from 'react-icons/fa';
 import jsPDF from 'jspdf';
 import { marked } from 'marked';
+import { MINIMODE_API_BASE_URL, runReportJob } from '@/utils/apiService';
 
 export default function MarketAssessmentContent() {
   const [viewMode, setViewMode] = useState('form');
@@ -174,21 +175,14 @@ export default function MarketAssessmentContent() {
         await new Promise(resolve => setTimeout(resolve, AI_GENERATION_STEPS[i].duration));
       }
 
-      const response = await fetch('http://127.0.0.1:5002/api/generate-report', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          report_type: 'market_assessment',
-          inputs: {
-            ...marketInputs,
-            analysis_type: 'market_assessment'
-          }
-        })
-      });
-
-      const data = await response.json();
+      // The report is generated as a background job; this polls it until it's ready
+      const data = await runReportJob({
+        report_type: 'market_assessment',
+        inputs: {
+          ...marketInputs,
+          analysis_type: 'market_assessment'
+        }
+      }, MINIMODE_API_BASE_URL);
       
       // Save to localStorage
       const newReport = {
@@ -4,6 +4,7 @@ import { useState, useCallback, memo, useRef, useEffect } from 'react';
 import { motion } from 'framer-motion';
 import jsPDF from 'jspdf';
 import html2canvas from 'html2canvas';
+import { runReportJob } from '@/utils/apiService';
 
 const API_PORTS = [5001];
 const API_BASE_URL = API_PORTS.map(port => `http://127.0.0.1:${port}/api`);
@@ -94,6 +95,13 @@ export default function ProModeContent() {
     const [answers, setAnswers] = useState({});
     const [report, setReport] = useState(null);
 
+    // The server keeps scraped text by content hash; send the short ref instead of re-uploading it
+    const websitePayload = () => (
+        websiteAnalysis?.website_ref
+            ? { website_ref: websiteAnalysis.website_ref }
+            : { website_data: websiteAnalysis?.website_data }
+    );
+
     // Handle input changes with debounce
     const handleInputChange = (e) => {
         const { name, value } = e.target;
@@ -350,7 +358,7 @@ export default function ProModeContent() {
                         detail_level: detailLevel,
                         company_name: formData.company_name,
                         industry: formData.industry,
-                        website_data: websiteAnalysis.website_data
+                        ...websitePayload()
                     })
                 });
 
@@ -421,19 +429,15 @@ export default function ProModeContent() {
             setError(null);
 
             try {
-                const response = await fetch(`${API_BASE_URL}/generate-report`, {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({
-                        company_info: formData,
-                        report_type: reportType,
-                        detail_level: detailLevel,
-                        answers: answers,
-                        website_data: websiteAnalysis?.website_data
-                    })
-                });
+                // The report is generated as a background job; this polls it until it's ready
+                const data = await runReportJob({
+                    company_info: formData,
+                    report_type: reportType,
+                    detail_level: detailLevel,
+                    answers: answers,
+                    ...websitePayload()
+                }, API_BASE_URL[0]);
 
-                const data = await response.json();
                 if (data.status === 'success') {
                     setReport(data.data);
                     setStep(6);
@@ -1,22 +1,43 @@
 const API_BASE_URL = 'http://127.0.0.1:5001/api';
+export const MINIMODE_API_BASE_URL = 'http://127.0.0.1:5002/api';
 
-export const generateReport = async (reportType, inputs) => {
+const JOB_POLL_INTERVAL = 3000; // 3 seconds
+const JOB_TIMEOUT = 30 * 60 * 1000; // 30 minutes
+
+const wait = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+const pollJobResult = async (jobId, baseUrl = API_BASE_URL) => {
+    const deadline = Date.now() + JOB_TIMEOUT;
+
+    while (Date.now() < deadline) {
+        const response = await fetch(`${baseUrl}/jobs/${jobId}/result`);
+        const payload = await response.json().catch(() => ({}));
+
+        if (response.status === 202) {
+            await wait(JOB_POLL_INTERVAL);
+            continue;
+        }
+        if (!response.ok) {
+            throw new Error(payload.message || `HTTP error! status: ${response.status}`);
+        }
+        return payload;
+    }
+
+    throw new Error('Report generation timed out - please try again');
+};
+
+// Submit a /generate-report request body and poll its job until the report is ready
+export const runReportJob = async (body, baseUrl = API_BASE_URL) => {
     try {
         const controller = new AbortController();
         const timeoutId = setTimeout(() => controller.abort(), 30000); // 30 second timeout
 
-        const response = await fetch(`${API_BASE_URL}/generate-report`, {
+        const response = await fetch(`${baseUrl}/generate-report`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({
-                report_type: reportType,
-                inputs: {
-                    ...inputs,
-                    timestamp: new Date().toISOString()
-                }
-            }),
+            body: JSON.stringify(body),
             signal: controller.signal
         });
 
@@ -27,7 +48,13 @@ export const generateReport = async (reportType, inputs) => {
             throw new Error(errorData.message || `HTTP error! status: ${response.status}`);
         }
 
-        return await response.json();
+        // The server queues the report and returns a job to poll
+        const submitted = await response.json();
+        const job = submitted.job || submitted.data;
+        if (!job || !job.job_id) {
+            return submitted;
+        }
+        return await pollJobResult(job.job_id, baseUrl);
     } catch (error) {
         if (error.name === 'AbortError') {
             throw new Error('Request timeout - please try again');
@@ -40,6 +67,14 @@ export const generateReport = async (reportType, inputs) => {
     }
 };
 
+export const generateReport = async (reportType, inputs) => runReportJob({
+    report_type: reportType,
+    inputs: {
+        ...inputs,
+        timestamp: new Date().toISOString()
+    }
+});
+
 export const fetchReports = async () => {
     try {
         const response = await fetch(`${API_BASE_URL}/reports`);